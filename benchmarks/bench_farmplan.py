@@ -0,0 +1,46 @@
+"""Benchmark the farm schedule planner on large synthetic rosters."""
+
+import random
+import timeit
+
+from src.ocular.planner import plan_farm
+
+ROSTER_SIZES = (8, 24, 48)
+MOUNT_COUNTS = (100, 300, 600)
+RUNS_PER_WEEK = 10
+WEEKS = 8
+REPEATS = 20
+
+
+def random_need_masks(
+    members: int,
+    mounts: int,
+    rng: random.Random,
+) -> dict[tuple[str, str], int]:
+    """Build need bitmasks where each member needs half of the mounts."""
+    return {
+        (f"expansion{i % 6}", f"mount{i}"): rng.getrandbits(members)
+        for i in range(mounts)
+    }
+
+
+def main() -> None:
+    """Print the mean planning time for each roster and catalog size."""
+    rng = random.Random(0)
+    print(f"{'members':>8} {'mounts':>8} {'ms/plan':>10}")
+    for members in ROSTER_SIZES:
+        for mounts in MOUNT_COUNTS:
+            need_masks = random_need_masks(members, mounts, rng)
+            seconds = timeit.timeit(
+                lambda need_masks=need_masks: plan_farm(
+                    need_masks,
+                    runs_per_week=RUNS_PER_WEEK,
+                    weeks=WEEKS,
+                ),
+                number=REPEATS,
+            )
+            print(f"{members:>8} {mounts:>8} {seconds / REPEATS * 1000:>10.3f}")
+
+
+if __name__ == "__main__":
+    main()
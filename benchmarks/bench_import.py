@@ -0,0 +1,48 @@
+"""Benchmark bulk imports of users' mount collections."""
+
+import asyncio
+import csv
+import random
+import tempfile
+import time
+from pathlib import Path
+
+from src.ocular.importer import iter_collection_rows
+from src.ocular.operations import DataBase
+
+USER_COUNTS = (1000, 10000)
+MOUNTS_PER_USER = 20
+
+
+def write_users_csv(path: Path, n_users: int, mount_names: list[str]) -> None:
+    """Write a CSV of users owning random mounts."""
+    rng = random.Random(n_users)
+    with path.open("w", newline="") as file:
+        writer = csv.writer(file)
+        for discord_id in range(n_users):
+            mounts = rng.sample(mount_names, k=min(MOUNTS_PER_USER, len(mount_names)))
+            writer.writerow([discord_id, f"user{discord_id}", *mounts])
+
+
+async def run_import(tmp_dir: str, n_users: int) -> float:
+    """Time importing a CSV of random collections into a new database."""
+    database = DataBase()
+    database.db_path = Path(tmp_dir, f"bench-{n_users}.db")
+    await database.init_tables()
+    path = Path(tmp_dir, f"users-{n_users}.csv")
+    write_users_csv(path, n_users, await database.list_item_names())
+    start = time.perf_counter()
+    await database.import_collections(iter_collection_rows(path), actor=0)
+    return time.perf_counter() - start
+
+
+def main() -> None:
+    """Print the import time for each number of users."""
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        for n_users in USER_COUNTS:
+            seconds = asyncio.run(run_import(tmp_dir, n_users))
+            print(f"{n_users:>6} users: {seconds:6.2f} s")
+
+
+if __name__ == "__main__":
+    main()
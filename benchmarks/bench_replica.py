@@ -0,0 +1,67 @@
+"""Benchmark read latency from disk against the in-memory read replica."""
+
+import asyncio
+import tempfile
+import time
+from pathlib import Path
+
+from src.ocular.operations import DataBase
+
+USER_COUNTS = (100, 1000)
+REPEATS = 50
+
+
+async def time_reads(database: DataBase, n_users: int) -> dict[str, float]:
+    """Time the mean latency in ms of common read-only operations."""
+    reads = {
+        "get_user_from_discord_id": lambda: database.get_user_from_discord_id(
+            n_users // 2,
+        ),
+        "check_user_exists": lambda: database.check_user_exists("user_name", "user1"),
+        "list_user_items": lambda: database.list_user_items(
+            n_users // 2,
+            "has",
+            "a realm reborn",
+        ),
+        "summarize_needed_mounts": database.summarize_needed_mounts,
+    }
+    timings = {}
+    for name, read in reads.items():
+        start = time.perf_counter()
+        for _ in range(REPEATS):
+            await read()
+        timings[name] = (time.perf_counter() - start) / REPEATS * 1000
+    return timings
+
+
+async def run_reads(tmp_dir: str, n_users: int) -> None:
+    """Print read latencies for a database of random collections."""
+    database = DataBase()
+    database.db_path = Path(tmp_dir, f"bench-{n_users}.db")
+    await database.init_tables()
+    mount_names = await database.list_item_names()
+    rows = (
+        (discord_id, f"user{discord_id}", mount_names[discord_id % 3 :: 3])
+        for discord_id in range(n_users)
+    )
+    await database.import_collections(rows, actor=0)
+    disk = await time_reads(database, n_users)
+    await database.open_replica()
+    memory = await time_reads(database, n_users)
+    await database.close_replica()
+    for name in disk:
+        print(
+            f"{n_users:>6} {name:>26} {disk[name]:>10.3f} {memory[name]:>10.3f}",
+        )
+
+
+def main() -> None:
+    """Print disk and replica read latencies for each number of users."""
+    print(f"{'users':>6} {'read':>26} {'disk ms':>10} {'replica ms':>10}")
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        for n_users in USER_COUNTS:
+            asyncio.run(run_reads(tmp_dir, n_users))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,75 @@
+"""Benchmark cold start of the bot up to its first command response.
+
+Each run happens in a fresh interpreter so import costs are measured
+cold. The bot is loaded with all cogs, the database is initialized as
+on startup, and a first autocomplete-style query is answered. Runs are
+made against a new database and against an existing one, where the
+catalog sync is skipped.
+"""
+
+import json
+import subprocess
+import sys
+import tempfile
+from pathlib import Path
+
+CHILD = """
+import asyncio, json, sys, time
+start = time.perf_counter()
+import bot
+from src.ocular.operations import DataBase
+for cog in ["general", "adminonly", "dataedit", "maintenance"]:
+    bot.bot.load_extension(f"src.ocular.{cog}")
+imported = time.perf_counter()
+
+async def first_response():
+    database = DataBase()
+    database.db_path = sys.argv[1]
+    await database.init_tables()
+    initialized = time.perf_counter()
+    expansions = await database.list_expansions()
+    await database.list_item_names(expansions[0])
+    return initialized, time.perf_counter()
+
+initialized, responded = asyncio.run(first_response())
+print(json.dumps({
+    "import": imported - start,
+    "init": initialized - imported,
+    "first response": responded - initialized,
+    "total": responded - start,
+    "polars loaded": "polars.dataframe" in sys.modules,
+}))
+"""
+REPEATS = 5
+
+
+def run_child(db_path: Path) -> dict:
+    """Time one cold start in a fresh interpreter."""
+    result = subprocess.run(  # noqa: S603
+        [sys.executable, "-c", CHILD, str(db_path)],
+        capture_output=True,
+        check=True,
+        text=True,
+    )
+    return json.loads(result.stdout.splitlines()[-1])
+
+
+def main() -> None:
+    """Print mean phase timings for new and existing databases."""
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        for label in ("new database", "existing database"):
+            runs = []
+            for i in range(REPEATS):
+                db_path = Path(tmp_dir, f"{label}-{i}.db")
+                if label == "existing database":
+                    db_path = Path(tmp_dir, "existing.db")
+                runs.append(run_child(db_path))
+            print(f"{label}:")
+            for phase in ("import", "init", "first response", "total"):
+                mean = sum(run[phase] for run in runs) / len(runs)
+                print(f"  {phase:>15}: {mean * 1000:8.1f} ms")
+            print(f"  {'polars loaded':>15}: {runs[-1]['polars loaded']}")
+
+
+if __name__ == "__main__":
+    main()
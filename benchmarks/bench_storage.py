@@ -0,0 +1,67 @@
+"""Benchmark the storage backends against each other."""
+
+import asyncio
+import importlib.util
+import tempfile
+import time
+from pathlib import Path
+
+from src.ocular.storage import Storage, StorageBackend, open_storage
+
+N_USERS = 300
+PARTY = [f"user{i}" for i in range(8)]
+REPEATS = 20
+
+
+async def fill_storage(storage: Storage) -> float:
+    """Add users owning every third mount and return the time taken in s."""
+    mount_names = await storage.list_item_names()
+    start = time.perf_counter()
+    for discord_id in range(N_USERS):
+        await storage.append_new_user(name=f"user{discord_id}", discord_id=discord_id)
+        await storage.append_new_status(discord_id=discord_id)
+        for name in mount_names[discord_id % 3 :: 3][:5]:
+            await storage.update_user_items("add", discord_id, name)
+    return time.perf_counter() - start
+
+
+async def run_backend(tmp_dir: str, backend: StorageBackend) -> None:
+    """Print write and read timings of a backend."""
+    storage = open_storage(backend)
+    if backend != "memory":
+        storage.db_path = Path(tmp_dir, f"bench.{backend}")
+    await storage.init_tables()
+    fill_seconds = await fill_storage(storage)
+    reads = {
+        "list_user_items": lambda: storage.list_user_items(1, "has", "a realm reborn"),
+        "party_need_masks": lambda: storage.get_party_need_masks(PARTY),
+        "summarize_needed": storage.summarize_needed_mounts,
+    }
+    timings = []
+    for read in reads.values():
+        start = time.perf_counter()
+        for _ in range(REPEATS):
+            await read()
+        timings.append((time.perf_counter() - start) / REPEATS * 1000)
+    print(
+        f"{backend:>8} {fill_seconds:>8.2f}",
+        *(f"{ms:>17.3f}" for ms in timings),
+    )
+
+
+def main() -> None:
+    """Print timings of every installed backend."""
+    print(
+        f"{'backend':>8} {'fill s':>8} {'list_user_items':>17}",
+        f"{'party_need_masks':>17} {'summarize_needed':>17}",
+    )
+    backends = ["sqlite", "memory"]
+    if importlib.util.find_spec("duckdb") is not None:
+        backends.append("duckdb")
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        for backend in backends:
+            asyncio.run(run_backend(tmp_dir, backend))
+
+
+if __name__ == "__main__":
+    main()
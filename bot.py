@@ -1,48 +1,110 @@
 """Ocular bot - Discord bot for tracking FFXIV mount progress."""
 
+import asyncio
+import contextlib
 import logging
 import os
+import signal
+from concurrent.futures import ThreadPoolExecutor
 from logging.handlers import RotatingFileHandler
 
-import discord
 from dotenv import load_dotenv
 
+from src.ocular.config import ConfigStore, get_config
+from src.ocular.lifecycle import OcularBot
 from src.ocular.operations import DataBase
+from src.ocular.storage import get_storage
 
 logger = logging.getLogger("discord")
-logger.setLevel(logging.INFO)
-formatter = logging.Formatter(
-    "{asctime} | {levelname} | {funcName}: {message}",
-    style="{",
-)
-handler = RotatingFileHandler(
-    filename="bot.log",
-    encoding="utf-8",
-    maxBytes=5 * 1024 * 1024,
-    backupCount=2,
-)
-handler.setFormatter(formatter)
-logger.addHandler(handler)
-
-bot = discord.Bot()
-
-
-@bot.event
-async def on_ready() -> None:
-    """Create DB and print status message when bot comes online."""
-    database = DataBase()
+background_tasks: set[asyncio.Task] = set()
+
+
+def setup_logging() -> RotatingFileHandler:
+    """Log to a rotating file, returning its handler.
+
+    Called from `main` rather than at import, as card render workers
+    import this module again and would each open the log file too.
+    """
+    logger.setLevel(logging.INFO)
+    formatter = logging.Formatter(
+        "{asctime} | {levelname} | {funcName}: {message}",
+        style="{",
+    )
+    handler = RotatingFileHandler(
+        filename="bot.log",
+        encoding="utf-8",
+        maxBytes=5 * 1024 * 1024,
+        backupCount=2,
+    )
+    handler.setFormatter(formatter)
+    logger.addHandler(handler)
+    return handler
+
+
+def create_bot() -> OcularBot:
+    """Create the bot and register its event handlers."""
+    bot = OcularBot()
+
+    @bot.event
+    async def on_ready() -> None:
+        """Print status message when bot comes online."""
+        logger.info("%s is online!", bot.user)
+
+    return bot
+
+
+async def startup(bot: OcularBot) -> None:
+    """Prepare the database before logging in.
+
+    Schema checks and the mount catalog sync run once here, rather than
+    on every gateway reconnect. Caches used by autocomplete are then
+    warmed in the background while the bot logs in.
+    """
+    database = get_storage()
     await database.init_tables()
-    logger.info("%s is online!", bot.user)
+    if isinstance(database, DataBase) and get_config().database.read_replica:
+        await database.open_replica()
+    warm_up = bot.loop.create_task(database.warm_caches())
+    background_tasks.add(warm_up)
+    warm_up.add_done_callback(background_tasks.discard)
+
+
+def reload_config() -> None:
+    """Reload the configuration file on SIGHUP."""
+    try:
+        ConfigStore.reload()
+    except Exception:  # noqa: BLE001
+        # Already logged, the bot keeps running on the current configuration
+        return
 
 
 def main() -> None:
     """Run program."""
+    handler = setup_logging()
     logger.info("Launching Ocular")
     load_dotenv()
-    cog_list = ["general", "adminonly", "dataedit"]
+    config = ConfigStore.load()
+    handler.maxBytes = config.log.max_bytes
+    handler.backupCount = config.log.backup_count
+    bot = create_bot()
+    bot.loop.set_default_executor(
+        ThreadPoolExecutor(max_workers=config.executor_workers),
+    )
+    if hasattr(signal, "SIGHUP"):
+        bot.loop.add_signal_handler(signal.SIGHUP, reload_config)
+    cog_list = ["general", "adminonly", "dataedit", "maintenance"]
     for cog in cog_list:
         bot.load_extension(f"src.ocular.{cog}")
-    bot.run(os.getenv("TOKEN"))
+    bot.loop.run_until_complete(startup(bot))
+    for stop_signal in (signal.SIGINT, signal.SIGTERM):
+        # Not supported by Windows event loops, which stop on KeyboardInterrupt
+        with contextlib.suppress(NotImplementedError):
+            bot.loop.add_signal_handler(stop_signal, bot.request_shutdown)
+    try:
+        bot.loop.run_until_complete(bot.serve(os.getenv("TOKEN")))
+    finally:
+        bot.loop.run_until_complete(bot.loop.shutdown_default_executor())
+        bot.loop.close()
 
 
 if __name__ == "__main__":
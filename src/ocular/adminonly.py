@@ -4,16 +4,20 @@ import logging
 from typing import Self
 
 import discord
+import yaml
 from discord.ext import commands
 
-from src.ocular.operations import DataBase
+from src.ocular import metrics
+from src.ocular.checks import is_admin
+from src.ocular.config import ConfigStore
+from src.ocular.storage import get_storage
 
 logger = logging.getLogger("discord")
 
 
 async def get_mount_names(ctx: discord.AutocompleteContext) -> list[str]:
     """Fetch list of mount names for autocomplete."""
-    database = DataBase()
+    database = get_storage()
     mounts = await database.list_item_names(
         expansion=ctx.options["expansion"],
     )
@@ -22,7 +26,7 @@ async def get_mount_names(ctx: discord.AutocompleteContext) -> list[str]:
 
 async def get_expansion_names(ctx: discord.AutocompleteContext) -> list[str]:  # noqa: ARG001
     """Fetch list of mount names for autocomplete."""
-    database = DataBase()
+    database = get_storage()
     expansions = await database.list_expansions()
     return expansions  # noqa: RET504
 
@@ -38,7 +42,7 @@ class AdminOnly(commands.Cog):
         name="adminaddmount",
         description="(Admin only) Add mounts for a user",
     )
-    @commands.has_role(547835267394830348)
+    @is_admin()
     @discord.option(
         "expansion",
         type=str,
@@ -75,31 +79,31 @@ class AdminOnly(commands.Cog):
 
         """
         logger.info("/adminaddmount invoked by %s", ctx.author.name)
-        database = DataBase()
+        database = get_storage()
         user_did = await database.get_user_discord_id(user_name)
-        item_names = await database.list_item_names(expansion)
         if len(user_did) == 0:
             logger.warning("User %s not found, cancelling", user_name)
-            await ctx.send_response(
+            await ctx.respond(
                 content=f"I don't have a user named `{user_name}` in my database.",
                 ephemeral=True,
                 delete_after=90,
             )
-        elif mount_name not in item_names:
+        elif not await database.update_user_items(
+            action="add",
+            user=user_did[0],
+            item_names=mount_name,
+            actor=ctx.author.id,
+            expansion=expansion,
+        ):
             logger.warning("Mount %s not found, cancelling", mount_name)
-            await ctx.send_response(
+            await ctx.respond(
                 content=f"I don't have a `{expansion}` mount named `{mount_name}` in my database.",  # noqa: E501
                 ephemeral=True,
                 delete_after=90,
             )
         else:
-            logger.info("Adding mount %s for user %s", mount_name, user_name)
-            await database.update_user_items(
-                action="add",
-                user=user_did[0],
-                item_names=mount_name,
-            )
-            await ctx.send_response(
+            logger.info("Added mount %s for user %s", mount_name, user_name)
+            await ctx.respond(
                 content=f"Added `{expansion}` mount `{mount_name}` for `{user_name}`",
                 ephemeral=True,
                 delete_after=90,
@@ -110,7 +114,7 @@ class AdminOnly(commands.Cog):
         name="adminremovemount",
         description="(Admin only) Remove mounts from a user",
     )
-    @commands.has_role(547835267394830348)
+    @is_admin()
     @discord.option(
         "expansion",
         type=str,
@@ -147,42 +151,262 @@ class AdminOnly(commands.Cog):
 
         """
         logger.info("/adminremovemount invoked by %s", ctx.author.name)
-        database = DataBase()
+        database = get_storage()
         user_did = await database.get_user_discord_id(user_name)
-        item_names = await database.list_item_names(expansion)
         if len(user_did) == 0:
             logger.warning("User %s not found, cancelling", user_name)
-            await ctx.send_response(
+            await ctx.respond(
                 content=f"I don't have a user named `{user_name}` in my database.",
                 ephemeral=True,
                 delete_after=90,
             )
-        elif mount_name not in item_names:
+        elif not await database.update_user_items(
+            action="remove",
+            user=user_did[0],
+            item_names=mount_name,
+            actor=ctx.author.id,
+            expansion=expansion,
+        ):
             logger.warning("Mount %s not found, cancelling", mount_name)
-            await ctx.send_response(
+            await ctx.respond(
                 content=f"I don't have a `{expansion}` mount named `{mount_name}` in my database.",  # noqa: E501
                 ephemeral=True,
                 delete_after=90,
             )
         else:
-            logger.info("Removing mount %s from user %s", mount_name, user_name)
-            await database.update_user_items(
-                action="remove",
-                user=user_did[0],
-                item_names=mount_name,
-            )
-            await ctx.send_response(
+            logger.info("Removed mount %s from user %s", mount_name, user_name)
+            await ctx.respond(
                 content=f"Removed `{expansion}` mount `{mount_name}` from `{user_name}`",  # noqa: E501
                 ephemeral=True,
                 delete_after=90,
             )
         logger.info("/adminremovemount OK")
 
+    @discord.slash_command(
+        name="adminpartymount",
+        description="(Admin only) Add or remove a mount for several users",
+    )
+    @is_admin()
+    @discord.option(
+        "action",
+        type=str,
+        choices=["add", "remove"],
+        description="Whether to add or remove the mount",
+    )
+    @discord.option(
+        "expansion",
+        type=str,
+        autocomplete=discord.utils.basic_autocomplete(get_expansion_names),
+        description="Mount expansion",
+    )
+    @discord.option(
+        "mount_name",
+        type=str,
+        autocomplete=discord.utils.basic_autocomplete(get_mount_names),
+        description="Mount name",
+    )
+    @discord.option(
+        "user_names",
+        type=str,
+        description="Comma-separated names of users to update",
+        required=False,
+        default=None,
+    )
+    @discord.option(
+        "role",
+        type=discord.Role,
+        description="Role whose members to update",
+        required=False,
+        default=None,
+    )
+    @discord.option(
+        "channel",
+        type=discord.VoiceChannel,
+        description="Voice channel whose members to update",
+        required=False,
+        default=None,
+    )
+    async def adminpartymount(  # noqa: PLR0913, PLR0917
+        self: Self,
+        ctx: discord.ApplicationContext,
+        action: str,
+        expansion: str,
+        mount_name: str,
+        user_names: None | str,
+        role: None | discord.Role,
+        channel: None | discord.VoiceChannel,
+    ) -> None:
+        """Add or remove a mount for several users at once.
+
+        Users are given by name, or as the members of a role or voice
+        channel, and all of them are updated in one transaction. Role
+        and channel members are read from the member cache, which the
+        bot fills through the privileged members intent.
+
+        Parameters
+        ----------
+        ctx : discord.ApplicationContext
+            Discord context. Used for interacting with the command
+            invoker.
+        action : str
+            Whether to `add` or `remove` the mount.
+        expansion : str
+            Name of the FFXIV expansion of the mount.
+        mount_name : str
+            Name of the mount to update.
+        user_names : None | str
+            Comma-separated names of the users to update.
+        role : None | discord.Role
+            Role whose members are updated.
+        channel : None | discord.VoiceChannel
+            Voice channel whose members are updated.
+
+        """
+        logger.info("/adminpartymount invoked by %s", ctx.author.name)
+        database = get_storage()
+        names = [x.strip() for x in (user_names or "").split(",")]
+        names = list(dict.fromkeys(name for name in names if len(name) != 0))
+        members = [
+            *(role.members if role is not None else []),
+            *(channel.members if channel is not None else []),
+        ]
+        discord_ids = list(dict.fromkeys(m.id for m in members if not m.bot))
+        item_id = await database.get_item_id(mount_name, expansion)
+        users = await database.resolve_users(names, discord_ids)
+        missing = sorted(set(names) - {user.user_name for user in users})
+        if len(names) == 0 and len(discord_ids) == 0:
+            logger.warning("No users given, cancelling")
+            content = "Give me user names, a role or a voice channel with members."
+            if role is not None or channel is not None:
+                content = "That role or voice channel has no members I can see."
+            await ctx.respond(content=content, ephemeral=True, delete_after=90)
+        elif len(item_id) == 0:
+            logger.warning("Mount %s not found, cancelling", mount_name)
+            await ctx.respond(
+                content=f"I don't have a `{expansion}` mount named `{mount_name}` in my database.",  # noqa: E501
+                ephemeral=True,
+                delete_after=90,
+            )
+        elif len(missing) != 0:
+            logger.warning("Users %s not found, cancelling", missing)
+            await ctx.respond(
+                content=f"I don't have users named `{'`, `'.join(missing)}` in my database.",  # noqa: E501
+                ephemeral=True,
+                delete_after=90,
+            )
+        elif len(users) == 0:
+            logger.warning("No registered users among members, cancelling")
+            await ctx.respond(
+                content="None of those members are in my database.",
+                ephemeral=True,
+                delete_after=90,
+            )
+        else:
+            changed = await database.update_users_item(
+                action="add" if action == "add" else "remove",
+                users=users,
+                item_id=item_id[0],
+                actor=ctx.author.id,
+            )
+            logger.info(
+                "Updated mount %s for %s of %s users",
+                mount_name,
+                changed,
+                len(users),
+            )
+            done = "Added" if action == "add" else "Removed"
+            # Members without a user are skipped rather than cancelling
+            unregistered = len(set(discord_ids) - {u.user_discord_id for u in users})
+            content = f"{done} `{expansion}` mount `{mount_name}` for {changed} of {len(users)} users."  # noqa: E501
+            if unregistered != 0:
+                content += f" {unregistered} members aren't in my database."
+            await ctx.respond(content=content, ephemeral=True, delete_after=90)
+        logger.info("/adminpartymount OK")
+
+    @discord.slash_command(
+        name="adminsetexpansion",
+        description="(Admin only) Add or remove every mount of an expansion",
+    )
+    @is_admin()
+    @discord.option(
+        "action",
+        type=str,
+        choices=["add", "clear"],
+        description="Whether to add or remove the mounts",
+    )
+    @discord.option(
+        "expansion",
+        type=str,
+        autocomplete=discord.utils.basic_autocomplete(get_expansion_names),
+        description="Mount expansion",
+    )
+    @discord.option("user_name", type=str, description="User to update mounts for")
+    async def adminsetexpansion(
+        self: Self,
+        ctx: discord.ApplicationContext,
+        action: str,
+        expansion: str,
+        user_name: str,
+    ) -> None:
+        """Add or remove every mount of an expansion for another user.
+
+        Parameters
+        ----------
+        ctx : discord.ApplicationContext
+            Discord context. Used for interacting with the command
+            invoker.
+        action : str
+            Whether to `add` or `clear` the mounts.
+        expansion : str
+            Name of the FFXIV expansion to update mounts from.
+        user_name : str
+            Name of the user to update mounts for.
+
+        """
+        logger.info("/adminsetexpansion invoked by %s", ctx.author.name)
+        database = get_storage()
+        user_did = await database.get_user_discord_id(user_name)
+        if len(user_did) == 0:
+            logger.warning("User %s not found, cancelling", user_name)
+            await ctx.respond(
+                content=f"I don't have a user named `{user_name}` in my database.",
+                ephemeral=True,
+                delete_after=90,
+            )
+        elif expansion not in await database.list_expansions():
+            logger.warning("Expansion %s not found, cancelling", expansion)
+            await ctx.respond(
+                content=f"I don't have an expansion named `{expansion}` in my database.",  # noqa: E501
+                ephemeral=True,
+                delete_after=90,
+            )
+        else:
+            changed = await database.update_user_expansion(
+                action="add" if action == "add" else "remove",
+                user=user_did[0],
+                expansion=expansion,
+                actor=ctx.author.id,
+            )
+            done = "Added" if action == "add" else "Removed"
+            logger.info(
+                "%s %s %s mounts for user %s",
+                done,
+                changed,
+                expansion,
+                user_name,
+            )
+            await ctx.respond(
+                content=f"{done} {changed} `{expansion}` mounts for `{user_name}`",
+                ephemeral=True,
+                delete_after=90,
+            )
+        logger.info("/adminsetexpansion OK")
+
     @discord.slash_command(
         name="adminusermounts",
         description="(Admin only) View another users mounts",
     )
-    @commands.has_role(547835267394830348)
+    @is_admin()
     @discord.option("user_name", type=str, description="User to check mounts for")
     @discord.option(
         "expansion",
@@ -210,11 +434,11 @@ class AdminOnly(commands.Cog):
 
         """
         logger.info("/adminusermounts invoked by %s", ctx.author.name)
-        database = DataBase()
+        database = get_storage()
         user_did = await database.get_user_discord_id(user_name)
         if len(user_did) == 0:
             logger.warning("User %s not found, cancelling", user_name)
-            await ctx.send_response(
+            await ctx.respond(
                 content=f"I don't have a user named `{user_name}` in my database.",
                 ephemeral=True,
                 delete_after=90,
@@ -245,9 +469,69 @@ class AdminOnly(commands.Cog):
                 value=f" - {'\n - '.join(needs_mounts)}",
                 inline=True,
             )
-            await ctx.send_response(embed=embed, ephemeral=True)
+            await ctx.respond(embed=embed, ephemeral=True)
         logger.info("/adminusermounts OK")
 
+    @discord.slash_command(
+        name="adminreloadconfig",
+        description="(Admin only) Reload the bot configuration file",
+    )
+    @is_admin()
+    async def adminreloadconfig(self: Self, ctx: discord.ApplicationContext) -> None:
+        """Reload config.yml without restarting the bot.
+
+        Database and log file paths, the read replica and the executor
+        size are only read at startup, other settings apply to the next
+        command run.
+
+        Parameters
+        ----------
+        ctx : discord.ApplicationContext
+            Discord context. Used for interacting with the command
+            invoker.
+
+        """
+        logger.info("/adminreloadconfig invoked by %s", ctx.author.name)
+        try:
+            ConfigStore.reload()
+        except (OSError, yaml.YAMLError, TypeError, ValueError) as error:
+            logger.warning("Configuration reload failed, keeping the current one")
+            content = f"Could not reload the configuration: {error}"
+        else:
+            content = "Configuration reloaded."
+        await ctx.respond(content=content, ephemeral=True, delete_after=90)
+        logger.info("/adminreloadconfig OK")
+
+    @discord.slash_command(
+        name="adminmetrics",
+        description="(Admin only) Show how commands have been handled",
+    )
+    @is_admin()
+    async def adminmetrics(self: Self, ctx: discord.ApplicationContext) -> None:
+        """Show per command counts of deferred, cancelled and rejected commands.
+
+        Counts start from zero when the bot starts.
+
+        Parameters
+        ----------
+        ctx : discord.ApplicationContext
+            Discord context. Used for interacting with the command
+            invoker.
+
+        """
+        logger.info("/adminmetrics invoked by %s", ctx.author.name)
+        embed = discord.Embed(title="Command metrics", color=discord.Colour.blue())
+        for metric, counts in sorted(metrics.snapshot().items()):
+            lines = [
+                f"{command}: {count}"
+                for command, count in sorted(counts.items(), key=lambda x: -x[1])
+            ]
+            embed.add_field(name=metric, value="\n".join(lines[:20]), inline=True)
+        if len(embed.fields) == 0:
+            embed.description = "Nothing recorded yet."
+        await ctx.respond(embed=embed, ephemeral=True)
+        logger.info("/adminmetrics OK")
+
 
 def setup(bot: discord.Bot) -> None:
     """Allow the bot to use this cog."""
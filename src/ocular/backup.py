@@ -0,0 +1,129 @@
+"""Online backups of the bot database with rotation."""
+
+import asyncio
+import sqlite3
+from collections.abc import Callable
+from datetime import UTC, datetime
+from pathlib import Path
+
+import aiosqlite
+
+from src.ocular.config import get_config
+
+
+def copy_database(
+    db_path: Path,
+    backup_path: Path,
+    pages: int,
+    progress: Callable[[int, int, int], object],
+) -> None:
+    """Copy a live database with the SQLite online backup API.
+
+    The copy is made `pages` pages at a time, calling `progress` after
+    every step. In WAL mode the copy reads from one snapshot held open
+    for its whole length, so writes made meanwhile neither block it nor
+    restart it, and the backup cannot be starved by a busy bot.
+    """
+    source = sqlite3.connect(db_path, isolation_level=None)
+    target = sqlite3.connect(backup_path)
+    try:
+        if source.execute("PRAGMA journal_mode").fetchone()[0] == "wal":
+            source.execute("BEGIN")
+            source.execute("SELECT COUNT(*) FROM sqlite_master").fetchone()
+        source.backup(target, pages=pages, progress=progress)
+    finally:
+        target.close()
+        source.close()
+
+
+async def check_integrity(path: Path) -> list[str]:
+    """Return the problems found by an integrity check of a database.
+
+    An empty list means the database passed the check.
+    """
+    async with aiosqlite.connect(path) as db:
+        cs = await db.execute("PRAGMA integrity_check")
+        rows = await cs.fetchall()
+    return [row[0] for row in rows if row[0] != "ok"]
+
+
+def rotate_backups(backup_dir: Path, retain: int) -> list[Path]:
+    """Delete all but the newest `retain` backups and return the deleted."""
+    backups = sorted(backup_dir.glob("bot-*.db"), reverse=True)
+    for path in backups[retain:]:
+        path.unlink()
+    return backups[retain:]
+
+
+async def backup_database(
+    db_path: Path,
+    backup_dir: None | Path = None,
+    *,
+    pages: None | int = None,
+    pause: None | float = None,
+    retain: None | int = None,
+) -> Path:
+    """Back up a live database into a rotating retention directory.
+
+    The copy runs in a worker thread a few pages at a time, pausing on
+    the event loop between steps, so commands keep being served while it
+    is made. It is written under a temporary name and
+    only kept if it passes an integrity check, after which backups beyond
+    the newest `retain` are deleted.
+
+    Parameters
+    ----------
+    db_path : Path
+        Database to back up.
+    backup_dir : None | Path
+        Directory to keep backups in. If none, a `backups` directory next
+        to the database.
+    pages : None | int
+        Number of pages copied per backup step. If none, the configured
+        backup pages.
+    pause : None | float
+        Seconds to wait on the event loop between backup steps. If none,
+        the configured backup pause.
+    retain : None | int
+        Number of backups to keep. If none, the configured backup
+        retention.
+
+    Returns
+    -------
+    backup_path : Path
+        Path of the new backup.
+
+    Raises
+    ------
+    sqlite3.DatabaseError
+        If the backup fails its integrity check.
+
+    """
+    config = get_config().batch
+    pages = config.backup_pages if pages is None else pages
+    pause = config.backup_pause if pause is None else pause
+    retain = config.backup_retain if retain is None else retain
+    db_path = Path(db_path)
+    if backup_dir is None:
+        backup_dir = db_path.parent.joinpath("backups")
+    backup_dir = Path(backup_dir)
+    backup_dir.mkdir(parents=True, exist_ok=True)
+    backup_path = backup_dir.joinpath(f"bot-{datetime.now(UTC):%Y%m%dT%H%M%S%f}.db")
+    partial_path = backup_path.with_suffix(".partial")
+    loop = asyncio.get_running_loop()
+
+    def pace(status: int, remaining: int, total: int) -> None:  # noqa: ARG001
+        # Each step waits on the event loop, which runs between steps
+        asyncio.run_coroutine_threadsafe(asyncio.sleep(pause), loop).result()
+
+    try:
+        await asyncio.to_thread(copy_database, db_path, partial_path, pages, pace)
+        problems = await check_integrity(partial_path)
+        if len(problems) != 0:
+            msg = f"Backup failed integrity check: {'; '.join(problems[:5])}"
+            raise sqlite3.DatabaseError(msg)
+        partial_path.rename(backup_path)
+    finally:
+        partial_path.unlink(missing_ok=True)
+    await asyncio.to_thread(rotate_backups, backup_dir, retain)
+    return backup_path
@@ -0,0 +1,216 @@
+"""Progress card images, rendered in worker processes and cached."""
+
+import asyncio
+import hashlib
+import importlib.util
+import json
+import logging
+import multiprocessing
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+from typing import Self
+
+from src.ocular.config import get_config
+
+logger = logging.getLogger("discord")
+
+# Bumped when the layout changes, so cards cached on disk are re-rendered
+CARD_VERSION = 1
+CARD_WIDTH = 720
+CARD_COLUMNS = 3
+PADDING = 20
+BAR_HEIGHT = 28
+CELL_HEIGHT = 34
+CELL_GAP = 6
+BACKGROUND = (43, 45, 49)
+TEXT = (242, 243, 245)
+HAVE = (59, 165, 93)
+NEED = (78, 80, 88)
+BAR_TRACK = (30, 31, 34)
+
+# Mount names of an expansion in catalog order, and whether each is owned
+type Cells = list[tuple[str, bool]]
+
+
+def cards_available() -> bool:
+    """Check if Pillow, needed to render cards, is installed."""
+    return importlib.util.find_spec("PIL") is not None
+
+
+def card_key(expansion: str, cells: Cells) -> str:
+    """Hash the ownership state a card shows, to key the card caches.
+
+    Users with the same mounts of an expansion share a card.
+    """
+    state = json.dumps([CARD_VERSION, expansion, cells])
+    return hashlib.sha256(state.encode()).hexdigest()
+
+
+def render_card(title: str, cells: Cells) -> bytes:
+    """Render a progress card as a PNG image.
+
+    The card shows a completion bar above a grid of every mount, owned
+    mounts highlighted. Run in a worker process, as drawing holds the
+    GIL.
+
+    Parameters
+    ----------
+    title : str
+        Heading of the card.
+    cells : Cells
+        Mount names in the order to draw them, and whether each is owned.
+
+    Returns
+    -------
+    card : bytes
+        PNG image of the card.
+
+    """
+    from io import BytesIO  # noqa: PLC0415
+
+    from PIL import Image, ImageDraw, ImageFont  # noqa: PLC0415
+
+    title_font = ImageFont.load_default(size=26)
+    font = ImageFont.load_default(size=15)
+    rows = -(-len(cells) // CARD_COLUMNS)
+    grid_top = PADDING * 3 + 26 + BAR_HEIGHT
+    height = grid_top + rows * (CELL_HEIGHT + CELL_GAP) + PADDING
+    image = Image.new("RGB", (CARD_WIDTH, height), BACKGROUND)
+    draw = ImageDraw.Draw(image)
+    draw.text((PADDING, PADDING), title, font=title_font, fill=TEXT)
+
+    owned = sum(has_item for _, has_item in cells)
+    bar_top = PADDING * 2 + 26
+    bar_right = CARD_WIDTH - PADDING
+    bar = (PADDING, bar_top, bar_right, bar_top + BAR_HEIGHT)
+    draw.rounded_rectangle(bar, radius=6, fill=BAR_TRACK)
+    if owned != 0:
+        filled = PADDING + (bar_right - PADDING) * owned // len(cells)
+        draw.rounded_rectangle((*bar[:2], filled, bar[3]), radius=6, fill=HAVE)
+    label = f"{owned}/{len(cells)} ({owned / max(len(cells), 1):.0%})"
+    draw.text(
+        ((PADDING + bar_right) / 2, bar_top + BAR_HEIGHT / 2),
+        label,
+        font=font,
+        fill=TEXT,
+        anchor="mm",
+    )
+
+    cell_width = (CARD_WIDTH - 2 * PADDING - (CARD_COLUMNS - 1) * CELL_GAP) // (
+        CARD_COLUMNS
+    )
+    for i, (name, has_item) in enumerate(cells):
+        left = PADDING + (i % CARD_COLUMNS) * (cell_width + CELL_GAP)
+        top = grid_top + (i // CARD_COLUMNS) * (CELL_HEIGHT + CELL_GAP)
+        cell = (left, top, left + cell_width, top + CELL_HEIGHT)
+        draw.rounded_rectangle(cell, radius=4, fill=HAVE if has_item else NEED)
+        text = name
+        while font.getlength(text) > cell_width - 16 and len(text) > 1:
+            text = text[:-2] + "…"
+        draw.text(
+            (left + 8, top + CELL_HEIGHT / 2),
+            text,
+            font=font,
+            fill=TEXT,
+            anchor="lm",
+        )
+
+    buffer = BytesIO()
+    image.save(buffer, format="PNG", optimize=True)
+    return buffer.getvalue()
+
+
+def store_card(path: Path, card: bytes, max_files: int) -> None:
+    """Write a card to the disk cache, pruning the oldest cards if full."""
+    path.parent.mkdir(parents=True, exist_ok=True)
+    partial = path.with_suffix(".part")
+    partial.write_bytes(card)
+    partial.replace(path)
+    files = sorted(path.parent.glob("*.png"), key=lambda file: file.stat().st_mtime)
+    for file in files[: max(len(files) - max_files, 0)]:
+        file.unlink(missing_ok=True)
+
+
+class CardRenderer:
+    """Renderer of progress cards, cached in memory and on disk.
+
+    Cards are keyed by a hash of the ownership state they show, so they
+    never go stale and only a change of state renders a new card.
+    Renders run in a pool of worker processes, and concurrent requests
+    for the same card share one render.
+    """
+
+    def __init__(self: Self) -> None:
+        """Create a renderer with empty caches, starting workers on first use."""
+        self.memory: OrderedDict[str, bytes] = OrderedDict()
+        self.pending: dict[str, asyncio.Future[bytes]] = {}
+        self.pool: None | ProcessPoolExecutor = None
+
+    def get_pool(self: Self) -> ProcessPoolExecutor:
+        """Get the worker pool, starting it if needed."""
+        if self.pool is None:
+            self.pool = ProcessPoolExecutor(
+                max_workers=get_config().render_workers,
+                # Forking would copy the event loop and database threads
+                mp_context=multiprocessing.get_context("spawn"),
+            )
+        return self.pool
+
+    async def get_card(self: Self, expansion: str, cells: Cells) -> bytes:
+        """Get the progress card of an expansion, rendering it if not cached.
+
+        Parameters
+        ----------
+        expansion : str
+            Name of the expansion the card is for.
+        cells : Cells
+            Mount names of the expansion in catalog order, and whether
+            the user owns each.
+
+        Returns
+        -------
+        card : bytes
+            PNG image of the card.
+
+        """
+        key = card_key(expansion, cells)
+        card = self.memory.get(key)
+        if card is not None:
+            self.memory.move_to_end(key)
+            return card
+        if key not in self.pending:
+            self.pending[key] = asyncio.ensure_future(self.load(key, expansion, cells))
+        # A cancelled command leaves the render to finish for the cache
+        return await asyncio.shield(self.pending[key])
+
+    async def load(self: Self, key: str, expansion: str, cells: Cells) -> bytes:
+        """Read a card from disk, or render and store it, then keep it in memory."""
+        config = get_config().cache
+        path = Path(config.card_dir).joinpath(f"{key}.png")
+        try:
+            try:
+                card = await asyncio.to_thread(path.read_bytes)
+            except FileNotFoundError:
+                loop = asyncio.get_running_loop()
+                title = f"{expansion.title()} mounts"
+                card = await loop.run_in_executor(
+                    self.get_pool(),
+                    render_card,
+                    title,
+                    cells,
+                )
+                await asyncio.to_thread(store_card, path, card, config.card_files)
+                logger.info("Rendered %s card %s", expansion, key[:12])
+        finally:
+            del self.pending[key]
+        self.memory[key] = card
+        while len(self.memory) > config.card_size:
+            self.memory.popitem(last=False)
+        return card
+
+    def close(self: Self) -> None:
+        """Stop the worker pool, abandoning queued renders."""
+        if self.pool is not None:
+            self.pool.shutdown(wait=False, cancel_futures=True)
+            self.pool = None
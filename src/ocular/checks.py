@@ -0,0 +1,26 @@
+"""Command checks shared by the bot's cogs."""
+
+from collections.abc import Callable
+
+import discord
+from discord.ext import commands
+
+from src.ocular.config import get_config
+
+
+def is_admin() -> Callable:
+    """Check the invoker has the configured admin role.
+
+    Unlike `commands.has_role`, the role ID is read when the command is
+    invoked, so a configuration reload applies to it immediately.
+    """
+
+    async def predicate(ctx: discord.ApplicationContext) -> bool:
+        role_id = get_config().admin_role_id
+        # Members in direct messages have no roles
+        roles = getattr(ctx.author, "roles", [])
+        if not any(role.id == role_id for role in roles):
+            raise commands.MissingRole(role_id)
+        return True
+
+    return commands.check(predicate)
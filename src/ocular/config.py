@@ -0,0 +1,346 @@
+"""Typed bot configuration loaded from config.yml."""
+
+import dataclasses
+import logging
+import re
+import types
+import typing
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Any, Self
+
+import yaml
+
+logger = logging.getLogger("discord")
+
+CONFIG_PATH = "./config.yml"
+
+
+@dataclass(frozen=True)
+class DatabaseConfig:
+    """Database location and connection tuning.
+
+    Attributes
+    ----------
+    backend : str
+        Storage backend, one of sqlite, memory or duckdb. Memory storage
+        is lost on exit, and DuckDB needs the optional duckdb
+        dependency. Read once at startup.
+    path : str
+        Path of the SQLite database, the DuckDB backend using the same
+        path with a .duckdb suffix. Read once at startup.
+    catalog_path : str
+        Path of the mount catalog file.
+    read_replica : bool
+        Whether reads are served from an in-memory copy of the database.
+        Read once at startup.
+    pragmas : dict[str, str | int]
+        Pragmas set on every new connection, such as synchronous,
+        cache_size or busy_timeout.
+    slow_query_ms : float
+        Queries taking longer than this many milliseconds are logged.
+    cached_statements : int
+        Prepared statements kept per connection, enough to hold every
+        statement in `queries` on the long-lived read replica.
+
+    """
+
+    backend: str = "sqlite"
+    path: str = "./data/bot.db"
+    catalog_path: str = "./assets/inputs/mounts.json"
+    read_replica: bool = False
+    pragmas: dict[str, str | int] = field(
+        default_factory=lambda: {"synchronous": "NORMAL", "busy_timeout": 5000},
+    )
+    slow_query_ms: float = 250
+    cached_statements: int = 256
+
+    def __post_init__(self: Self) -> None:
+        """Check the backend is known and pragmas are plain names and values.
+
+        Pragmas are not bound, so values must be one word or a signed
+        integer, such as a negative `cache_size` in KiB.
+        """
+        if self.backend not in {"sqlite", "memory", "duckdb"}:
+            msg = "backend must be one of ['sqlite', 'memory', 'duckdb']"
+            raise ValueError(msg)
+        for pragma, value in self.pragmas.items():
+            valid_value = re.fullmatch(r"-?\d+|\w+", str(value)) is not None
+            if not pragma.isidentifier() or not valid_value:
+                msg = f"Invalid pragma: {pragma} = {value}"
+                raise ValueError(msg)
+
+
+@dataclass(frozen=True)
+class CacheConfig:
+    """Cache capacities and lifetimes.
+
+    Attributes
+    ----------
+    identity_size : int
+        Maximum number of keys in the user identity cache.
+    identity_ttl : float
+        Seconds identity cache entries are trusted for, 0 keeping them
+        until evicted.
+    card_size : int
+        Maximum number of progress cards kept in memory.
+    card_dir : str
+        Directory progress cards are cached in on disk.
+    card_files : int
+        Maximum number of progress cards kept on disk.
+
+    """
+
+    identity_size: int = 4096
+    identity_ttl: float = 0
+    card_size: int = 128
+    card_dir: str = "./data/cards"
+    card_files: int = 2048
+
+
+@dataclass(frozen=True)
+class BatchConfig:
+    """Chunk sizes and pacing of bulk operations.
+
+    Attributes
+    ----------
+    import_chunk_size : int
+        Rows applied per transaction by bulk imports.
+    export_chunk_size : int
+        Rows fetched and written at a time by exports.
+    backup_pages : int
+        Pages copied per step of online backups.
+    backup_pause : float
+        Seconds between steps of online backups.
+    backup_retain : int
+        Number of backups kept.
+
+    """
+
+    import_chunk_size: int = 5000
+    export_chunk_size: int = 5000
+    backup_pages: int = 256
+    backup_pause: float = 0.01
+    backup_retain: int = 7
+
+
+@dataclass(frozen=True)
+class CommandConfig:
+    """Time budgets of commands.
+
+    Attributes
+    ----------
+    defer_after : float
+        Seconds a command may run before its response is deferred,
+        within Discord's three second window.
+    timeout : float
+        Seconds a command may run before it is cancelled, unless its
+        own budget is set.
+
+    """
+
+    defer_after: float = 2
+    timeout: float = 60
+
+
+@dataclass(frozen=True)
+class LimitConfig:
+    """Rate limits and concurrency caps on commands.
+
+    Attributes
+    ----------
+    user_rate : float
+        Commands per second a user may run once their burst is spent.
+    user_burst : int
+        Commands a user may run in quick succession.
+    guild_rate : float
+        Commands per second a guild may run once its burst is spent.
+    guild_burst : int
+        Commands a guild may run in quick succession.
+    autocomplete_rate : float
+        Autocomplete requests per second a user may make once their
+        burst is spent.
+    autocomplete_burst : int
+        Autocomplete requests a user may make in quick succession.
+    heavy_commands : list[str]
+        Commands sharing the heavy command slots.
+    heavy_concurrency : int
+        Number of heavy commands that may run at once.
+
+    """
+
+    user_rate: float = 0.5
+    user_burst: int = 5
+    guild_rate: float = 5
+    guild_burst: int = 30
+    autocomplete_rate: float = 5
+    autocomplete_burst: int = 20
+    heavy_commands: list[str] = field(
+        default_factory=lambda: [
+            "mostneeded",
+            "leaderboard",
+            "farmplan",
+            "adminsetexpansion",
+            "adminpartymount",
+            "dbcreatemount",
+            "dbdeletemount",
+            "dbrenamemount",
+            "dbrenameuser",
+            "dbdeleteuser",
+            "dbimport",
+            "dbexport",
+        ],
+    )
+    heavy_concurrency: int = 2
+
+
+@dataclass(frozen=True)
+class LogConfig:
+    """Log file rotation, read once at startup.
+
+    Attributes
+    ----------
+    max_bytes : int
+        Size of the log file before it is rotated.
+    backup_count : int
+        Number of rotated log files kept.
+
+    """
+
+    max_bytes: int = 5 * 1024 * 1024
+    backup_count: int = 2
+
+
+@dataclass(frozen=True)
+class Config:
+    """Bot configuration.
+
+    Attributes
+    ----------
+    prefix : str
+        Command prefix.
+    invite_link : str
+        Link used to invite the bot.
+    admin_role_id : int
+        ID of the role allowed to run admin commands.
+    executor_workers : int
+        Size of the thread pool running blocking work such as exports
+        and backups. Read once at startup.
+    render_workers : int
+        Number of processes rendering progress cards. Read once, when
+        the first card is rendered.
+    shutdown_timeout : float
+        Seconds running commands are given to finish on shutdown.
+    database : DatabaseConfig
+        Database location and connection tuning.
+    cache : CacheConfig
+        Cache capacities and lifetimes.
+    batch : BatchConfig
+        Chunk sizes and pacing of bulk operations.
+    commands : CommandConfig
+        Time budgets of commands.
+    limits : LimitConfig
+        Rate limits and concurrency caps on commands.
+    log : LogConfig
+        Log file rotation.
+
+    """
+
+    prefix: str = "/"
+    invite_link: str = ""
+    admin_role_id: int = 547835267394830348
+    executor_workers: int = 4
+    render_workers: int = 2
+    shutdown_timeout: float = 30
+    database: DatabaseConfig = field(default_factory=DatabaseConfig)
+    cache: CacheConfig = field(default_factory=CacheConfig)
+    batch: BatchConfig = field(default_factory=BatchConfig)
+    commands: CommandConfig = field(default_factory=CommandConfig)
+    limits: LimitConfig = field(default_factory=LimitConfig)
+    log: LogConfig = field(default_factory=LogConfig)
+
+
+def check_type(name: str, value: object, expected: Any) -> None:  # noqa: ANN401
+    """Raise a TypeError if a config value does not have its field's type."""
+    origin = typing.get_origin(expected)
+    if origin in {types.UnionType, typing.Union}:
+        allowed = typing.get_args(expected)
+    elif origin is not None:
+        allowed = (origin,)
+    elif expected is float:
+        allowed = (int, float)
+    else:
+        allowed = (expected,)
+    if isinstance(value, bool) and bool not in allowed:
+        allowed = ()
+    if not isinstance(value, allowed):
+        msg = f"Config value {name} must be of type {expected}, got {value!r}"
+        raise TypeError(msg)
+
+
+def build_section[T](cls: type[T], values: dict, prefix: str = "") -> T:
+    """Build a config dataclass from a mapping, checking keys and types."""
+    if not isinstance(values, dict):
+        msg = f"Config section {prefix or 'root'} must be a mapping"
+        raise TypeError(msg)
+    fields = {f.name: f for f in dataclasses.fields(cls)}
+    unknown = set(values) - set(fields)
+    if len(unknown) != 0:
+        keys = ", ".join(prefix + key for key in sorted(unknown))
+        msg = f"Unknown config keys: {keys}"
+        raise ValueError(msg)
+    hints = typing.get_type_hints(cls)
+    kwargs = {}
+    for name, value in values.items():
+        if dataclasses.is_dataclass(hints[name]):
+            kwargs[name] = build_section(hints[name], value, f"{prefix}{name}.")
+        else:
+            check_type(prefix + name, value, hints[name])
+            kwargs[name] = value
+    return cls(**kwargs)
+
+
+def load_config(path: str | Path = CONFIG_PATH) -> Config:
+    """Read and validate a configuration file.
+
+    Missing keys take their default values, and unknown keys or values
+    of the wrong type raise an error.
+
+    Parameters
+    ----------
+    path : str | Path
+        Path of the YAML configuration file.
+
+    """
+    with Path(path).open(encoding="utf-8") as file:
+        values = yaml.safe_load(file) or {}
+    return build_section(Config, values)
+
+
+class ConfigStore:
+    """Holder of the current configuration, swapped whole on reload."""
+
+    current: Config = Config()
+    path: str | Path = CONFIG_PATH
+
+    @classmethod
+    def load(cls: type[Self], path: str | Path = CONFIG_PATH) -> Config:
+        """Load the configuration file and make it current."""
+        cls.current = load_config(path)
+        cls.path = path
+        logger.info("Loaded configuration from %s", path)
+        return cls.current
+
+    @classmethod
+    def reload(cls: type[Self]) -> Config:
+        """Reload the configuration file, keeping the current one on error."""
+        try:
+            return cls.load(cls.path)
+        except (OSError, yaml.YAMLError, TypeError, ValueError):
+            logger.exception("Could not reload configuration, keeping the current one")
+            raise
+
+
+def get_config() -> Config:
+    """Get the current configuration."""
+    return ConfigStore.current
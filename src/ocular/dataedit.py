@@ -1,19 +1,37 @@
 """Cog storing commands for modifying the database."""
 
+import asyncio
+import csv
 import logging
+import os
+import shutil
+import tempfile
+from datetime import UTC, datetime
+from pathlib import Path
 from typing import Self
 
 import discord
 from discord.ext import commands
 
+from src.ocular.checks import is_admin
+from src.ocular.deadline import budget, defer
+from src.ocular.export import export_snapshot
+from src.ocular.importer import iter_collection_rows
+from src.ocular.lazy import lazy_import
 from src.ocular.operations import DataBase
+from src.ocular.storage import get_storage
 
 logger = logging.getLogger("discord")
+pl = lazy_import("polars")
+
+MAX_UPLOAD_BYTES = 8 * 1024 * 1024
+# Seconds imports and exports may run for
+BULK_BUDGET = 600
 
 
 async def get_mount_names(ctx: discord.AutocompleteContext) -> list[str]:
     """Fetch list of mount names for autocomplete."""
-    database = DataBase()
+    database = get_storage()
     mounts = await database.list_item_names(
         expansion=ctx.options["expansion"],
     )
@@ -22,7 +40,7 @@ async def get_mount_names(ctx: discord.AutocompleteContext) -> list[str]:
 
 async def get_expansion_names(ctx: discord.AutocompleteContext) -> list[str]:  # noqa: ARG001
     """Fetch list of mount names for autocomplete."""
-    database = DataBase()
+    database = get_storage()
     expansions = await database.list_expansions()
     return expansions  # noqa: RET504
 
@@ -38,7 +56,7 @@ class DataEdit(commands.Cog):
         name="dbcreatemount",
         description="(Admin only) Create a new mount in the database",
     )
-    @commands.has_role(547835267394830348)
+    @is_admin()
     @discord.option(
         "expansion",
         type=str,
@@ -71,24 +89,29 @@ class DataEdit(commands.Cog):
 
         """
         logger.info("/dbcreatemount invoked by %s", ctx.author.name)
-        database = DataBase()
-        item_id = await database.get_item_id(name)
+        database = get_storage()
+        item_id = await database.get_item_id(name, expansion)
         already_exists = len(item_id) != 0
+        if not already_exists:
+            logger.info("Adding expansion %s mount %s to database", expansion, name)
+            try:
+                await database.add_new_item(expansion, name)
+            except ValueError:
+                # Added by a concurrent command since the check
+                already_exists = True
         if already_exists:
             logger.warning(
                 "Expansion %s mount %s already in database, cancelling",
                 expansion,
                 name,
             )
-            await ctx.send_response(
+            await ctx.respond(
                 content=f"I already have a `{expansion}` mount named `{name}` in my database.",  # noqa: E501
                 ephemeral=True,
                 delete_after=90,
             )
         else:
-            logger.info("Adding expansion %s mount %s to database", expansion, name)
-            await database.add_new_item(expansion, name)
-            await ctx.send_response(
+            await ctx.respond(
                 content=f"Created `{expansion}` mount `{name}`",
                 ephemeral=True,
                 delete_after=90,
@@ -99,7 +122,7 @@ class DataEdit(commands.Cog):
         name="dbdeletemount",
         description="(Admin only) Delete a mount from the database",
     )
-    @commands.has_role(547835267394830348)
+    @is_admin()
     @discord.option(
         "expansion",
         type=str,
@@ -132,24 +155,21 @@ class DataEdit(commands.Cog):
 
         """
         logger.info("/dbdeletemount invoked by %s", ctx.author.name)
-        database = DataBase()
-        item_id = await database.get_item_id(name)
-        no_match = len(item_id) == 0
-        if no_match:
+        database = get_storage()
+        if not await database.delete_item(name, expansion):
             logger.warning(
                 "Expansion %s mount %s not found, cancelling",
                 expansion,
                 name,
             )
-            await ctx.send_response(
+            await ctx.respond(
                 content=f"I don't have a `{expansion}` mount named `{name}` in my database.",  # noqa: E501
                 ephemeral=True,
                 delete_after=90,
             )
         else:
-            logger.info("Deleting expansion %s mount %s", expansion, name)
-            await database.delete_item(name)
-            await ctx.send_response(
+            logger.info("Deleted expansion %s mount %s", expansion, name)
+            await ctx.respond(
                 content=f"Deleted `{expansion}` mount `{name}` from the database.",
                 ephemeral=True,
                 delete_after=90,
@@ -160,7 +180,7 @@ class DataEdit(commands.Cog):
         name="dbrenamemount",
         description="(Admin only) Rename a mount in the database",
     )
-    @commands.has_role(547835267394830348)
+    @is_admin()
     @discord.option(
         "expansion",
         type=str,
@@ -197,42 +217,48 @@ class DataEdit(commands.Cog):
 
         """
         logger.info("/dbrenamemount invoked by %s", ctx.author.name)
-        database = DataBase()
-        from_item_id = await database.get_item_id(from_name)
-        to_item_id = await database.get_item_id(to_name)
-        no_from_name_found = len(from_item_id) == 0
-        to_name_found = len(to_item_id) != 0
-        if no_from_name_found:
+        database = get_storage()
+        from_item_id = await database.get_item_id(from_name, expansion)
+        to_item_id = await database.get_item_id(to_name, expansion)
+        # Changing only the case or spacing of a name keeps the same mount
+        to_name_found = len(to_item_id) != 0 and to_item_id != from_item_id
+        renamed = False
+        if not to_name_found:
+            try:
+                renamed = await database.edit_item_name(from_name, to_name, expansion)
+            except ValueError:
+                # Taken by a concurrent command since the check
+                to_name_found = True
+        if to_name_found:
             logger.warning(
-                "Expansion %s mount %s not found, cancelling",
+                "Expansion %s mount %s already in database, cancelling",
                 expansion,
-                from_name,
+                to_name,
             )
-            await ctx.send_response(
-                content=f"I don't have a `{expansion}` mount named `{from_name}` in my database.",  # noqa: E501
+            await ctx.respond(
+                content=f"I already have a `{expansion}` mount named `{to_name}` in my database.",  # noqa: E501
                 ephemeral=True,
                 delete_after=90,
             )
-        elif to_name_found:
+        elif not renamed:
             logger.warning(
-                "Expansion %s mount %s already in database, cancelling",
+                "Expansion %s mount %s not found, cancelling",
                 expansion,
-                to_name,
+                from_name,
             )
-            await ctx.send_response(
-                content=f"I already have a `{expansion}` mount named `{to_name}` in my database.",  # noqa: E501
+            await ctx.respond(
+                content=f"I don't have a `{expansion}` mount named `{from_name}` in my database.",  # noqa: E501
                 ephemeral=True,
                 delete_after=90,
             )
         else:
             logger.info(
-                "Renaming expansion %s mount %s to %s",
+                "Renamed expansion %s mount %s to %s",
                 expansion,
                 from_name,
                 to_name,
             )
-            await database.edit_item_name(from_name, to_name)
-            await ctx.send_response(
+            await ctx.respond(
                 content=f"Renamed `{expansion}` mount `{from_name}` to `{to_name}`.",
                 ephemeral=True,
                 delete_after=90,
@@ -243,7 +269,7 @@ class DataEdit(commands.Cog):
         name="dbrenameuser",
         description="(Admin only) Change the name of a user in the database",
     )
-    @commands.has_role(547835267394830348)
+    @is_admin()
     @discord.option("from_name", type=str, description="User name to change")
     @discord.option("to_name", type=str, description="User name to assign")
     async def dbrenameuser(
@@ -266,7 +292,7 @@ class DataEdit(commands.Cog):
 
         """
         logger.info("/dbrenameuser invoked by %s", ctx.author.name)
-        database = DataBase()
+        database = get_storage()
         from_name_exists = await database.check_user_exists(
             check_col="user_name",
             check_val=from_name,
@@ -277,25 +303,22 @@ class DataEdit(commands.Cog):
         )
         if not from_name_exists:
             logger.warning("User %s not found, cancelling", from_name)
-            await ctx.send_response(
+            await ctx.respond(
                 content=f"I don't have a user named `{from_name}` in my database.",
                 ephemeral=True,
                 delete_after=90,
             )
         elif to_name_exists:
             logger.warning("User %s already in database, cancelling", to_name)
-            await ctx.send_response(
+            await ctx.respond(
                 content=f"I already have a user named `{to_name}` in my database.",
                 ephemeral=True,
                 delete_after=90,
             )
         else:
             logger.info("Renaming user %s to %s", from_name, to_name)
-            user_id = await database.get_user_id(from_name)
-            query = "UPDATE users SET user_name = ? WHERE user_id = ?"
-            params = (to_name, user_id)
-            await database.db_execute_qmark(query, params)
-            await ctx.send_response(
+            await database.rename_user(from_name, to_name)
+            await ctx.respond(
                 content=f"User name `{from_name}` changed to `{to_name}`.",
                 ephemeral=True,
                 delete_after=90,
@@ -306,7 +329,7 @@ class DataEdit(commands.Cog):
         name="dbdeleteuser",
         description="(Admin only) Delete a user from the database.",
     )
-    @commands.has_role(547835267394830348)
+    @is_admin()
     @discord.option("name", type=str, description="Name of user to delete")
     async def dbdeleteuser(
         self: Self,
@@ -325,28 +348,219 @@ class DataEdit(commands.Cog):
 
         """
         logger.info("/dbdeleteuser invoked by %s", ctx.author.name)
-        database = DataBase()
+        database = get_storage()
         from_name_exists = await database.check_user_exists(
             check_col="user_name",
             check_val=name,
         )
         if not from_name_exists:
             logger.warning("User %s not found, cancelling", name)
-            await ctx.send_response(
+            await ctx.respond(
                 content=f"I don't have a user named `{name}` in my database.",
                 ephemeral=True,
                 delete_after=90,
             )
         else:
             logger.info("Removing user %s from database", name)
-            await database.delete_user()
-            await ctx.send_response(
+            await database.delete_user(name)
+            await ctx.respond(
                 content=f"User name `{name}` deleted.",
                 ephemeral=True,
                 delete_after=90,
             )
         logger.info("/dbdeleteuser OK")
 
+    @discord.slash_command(
+        name="dbimport",
+        description="(Admin only) Import users and their mounts from a file",
+    )
+    @is_admin()
+    @budget(BULK_BUDGET)
+    @discord.option(
+        "file",
+        type=discord.Attachment,
+        description="CSV, JSON or Parquet file of users and mounts",
+        required=False,
+        default=None,
+    )
+    @discord.option(
+        "path",
+        type=str,
+        description="Path of a file on the bot's host to import instead",
+        required=False,
+        default=None,
+    )
+    async def dbimport(
+        self: Self,
+        ctx: discord.ApplicationContext,
+        file: None | discord.Attachment,
+        path: None | str,
+    ) -> None:
+        """Import users and the mounts they own from a file.
+
+        CSV files hold a discord ID, a user name and any number of mount
+        names per line. JSON and JSON Lines files hold objects, and
+        Parquet files rows, with `discord_id`, `name` and `mounts` keys.
+        Mount names found in several expansions must be given as
+        `expansion: name`.
+
+        Parameters
+        ----------
+        ctx : discord.ApplicationContext
+            Discord context. Used for interacting with the command
+            invoker.
+        file : None | discord.Attachment
+            Attached file to import.
+        path : None | str
+            Path of a file on the bot's host to import, if no file is
+            attached.
+
+        """
+        logger.info("/dbimport invoked by %s", ctx.author.name)
+        database = get_storage()
+        if not isinstance(database, DataBase):
+            logger.warning("Import needs the SQLite backend, cancelling")
+            await ctx.respond(
+                content="Imports need the SQLite database backend.",
+                ephemeral=True,
+                delete_after=90,
+            )
+            logger.info("/dbimport OK")
+            return
+        if (file is None) == (path is None):
+            logger.warning("Import needs exactly one file, cancelling")
+            await ctx.respond(
+                content="Attach a file or give me a path, but not both.",
+                ephemeral=True,
+                delete_after=90,
+            )
+            logger.info("/dbimport OK")
+            return
+        await defer(ctx, public=False)
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            if file is not None:
+                path = Path(tmp_dir, Path(file.filename).name)
+                await file.save(path)
+            try:
+                report = await database.import_collections(
+                    iter_collection_rows(path),
+                    actor=ctx.author.id,
+                )
+            except (
+                OSError,
+                ValueError,
+                KeyError,
+                TypeError,
+                csv.Error,
+                pl.exceptions.PolarsError,
+            ) as error:
+                logger.warning("Import of %s failed: %s", path, error)
+                await ctx.respond(content=f"I couldn't import that file: {error}")
+                logger.info("/dbimport OK")
+                return
+        logger.info("Imported %s", report)
+        unknown = ", ".join(f"`{name}`" for name in list(report.unknown_mounts)[:20])
+        ambiguous = ", ".join(
+            f"`{name}`" for name in list(report.ambiguous_mounts)[:20]
+        )
+        skipped = ", ".join(f"`{name}`" for name in report.skipped_names[:20])
+        content = (
+            f"Added {report.users_added} users, matched {report.users_matched} "
+            f"users and added {report.mounts_added} mounts."
+        )
+        if len(unknown) != 0:
+            content += f"\nUnknown mounts: {unknown}"
+        if len(ambiguous) != 0:
+            content += (
+                f"\nMounts in several expansions, give them as `expansion: name`: "
+                f"{ambiguous}"
+            )
+        if len(skipped) != 0:
+            content += f"\nSkipped users with names already taken: {skipped}"
+        await ctx.respond(content=content)
+        logger.info("/dbimport OK")
+
+    @discord.slash_command(
+        name="dbexport",
+        description="(Admin only) Export a snapshot of the database",
+    )
+    @is_admin()
+    @budget(BULK_BUDGET)
+    @discord.option(
+        "file_format",
+        type=str,
+        choices=["parquet", "csv"],
+        description="Format of the exported files",
+        required=False,
+        default="parquet",
+    )
+    @discord.option(
+        "wide",
+        type=bool,
+        description="Export a users by mounts ownership matrix instead of tables",
+        required=False,
+        default=False,
+    )
+    async def dbexport(
+        self: Self,
+        ctx: discord.ApplicationContext,
+        file_format: str,
+        wide: bool,  # noqa: FBT001
+    ) -> None:
+        """Export the database tables to files.
+
+        The export is written under `data/exports` on the bot's host, and
+        uploaded as a zip archive if it is small enough.
+
+        Parameters
+        ----------
+        ctx : discord.ApplicationContext
+            Discord context. Used for interacting with the command
+            invoker.
+        file_format : str
+            Format of the exported files, either parquet or csv.
+        wide : bool
+            Whether to export a users by mounts ownership matrix instead
+            of the users, mounts and status tables.
+
+        """
+        logger.info("/dbexport invoked by %s", ctx.author.name)
+        database = get_storage()
+        if not isinstance(database, DataBase):
+            logger.warning("Export needs the SQLite backend, cancelling")
+            await ctx.respond(
+                content="Exports need the SQLite database backend.",
+                ephemeral=True,
+                delete_after=90,
+            )
+            logger.info("/dbexport OK")
+            return
+        await defer(ctx, public=False)
+        out_dir = Path(
+            Path(database.db_path).parent,
+            "exports",
+            f"{datetime.now(UTC):%Y%m%dT%H%M%S}",
+        )
+        await export_snapshot(database, out_dir, file_format, wide=wide)
+        archive = await asyncio.to_thread(
+            shutil.make_archive,
+            str(out_dir),
+            "zip",
+            out_dir,
+        )
+        logger.info("Exported database to %s", out_dir)
+        archive_size = await asyncio.to_thread(os.path.getsize, archive)
+        if archive_size <= MAX_UPLOAD_BYTES:
+            await ctx.respond(
+                content="Here is your database export.",
+                file=discord.File(archive),
+            )
+        else:
+            await ctx.respond(
+                content=f"The export is too large to upload, it is at `{archive}`.",
+            )
+        logger.info("/dbexport OK")
+
 
 def setup(bot: discord.Bot) -> None:
     """Allow the bot to use this cog."""
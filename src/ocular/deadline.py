@@ -0,0 +1,134 @@
+"""Time budgets for commands, deferring slow ones and cancelling overruns."""
+
+import asyncio
+import contextlib
+import logging
+from collections.abc import Awaitable, Callable
+from dataclasses import dataclass
+
+import discord
+
+from src.ocular import metrics
+from src.ocular.config import get_config
+
+logger = logging.getLogger("discord")
+
+TIMEOUT_MESSAGE = "That took too long and was cancelled, please try again later."
+# Weight of the latest run in a command's latency estimate
+LATENCY_WEIGHT = 0.2
+
+# Smoothed run time in seconds of each command, used to defer up front
+latency_estimates: dict[str, float] = {}
+
+
+@dataclass(frozen=True)
+class Budget:
+    """Time budget set on a command callback by `budget`.
+
+    Attributes
+    ----------
+    seconds : None | float
+        Seconds the command may run for, none using the configured
+        default.
+    public : bool
+        Whether an automatic defer shows the reply to everyone, for
+        commands replying publicly.
+
+    """
+
+    seconds: None | float = None
+    public: bool = False
+
+
+def budget[F: Callable](
+    seconds: None | float = None,
+    *,
+    public: bool = False,
+) -> Callable[[F], F]:
+    """Set the time budget of a command, applied below its slash_command.
+
+    Parameters
+    ----------
+    seconds : None | float
+        Seconds the command may run for, none using the configured
+        default.
+    public : bool
+        Whether an automatic defer shows the reply to everyone.
+
+    """
+
+    def decorate(func: F) -> F:
+        func.__ocular_budget__ = Budget(seconds, public)
+        return func
+
+    return decorate
+
+
+def get_budget(command: discord.ApplicationCommand) -> Budget:
+    """Get the time budget of a command, the default one if it has none."""
+    return getattr(command.callback, "__ocular_budget__", Budget())
+
+
+async def defer(ctx: discord.ApplicationContext, *, public: bool) -> None:
+    """Defer the response to a command unless it was already sent."""
+    if ctx.response.is_done():
+        return
+    # The handler may have responded while the defer was being sent
+    with contextlib.suppress(discord.InteractionResponded):
+        await ctx.defer(ephemeral=not public)
+
+
+def record_latency(command: str, seconds: float) -> None:
+    """Update the smoothed run time of a command."""
+    previous = latency_estimates.get(command, seconds)
+    latency_estimates[command] = previous + LATENCY_WEIGHT * (seconds - previous)
+
+
+async def run_with_deadline(
+    ctx: discord.ApplicationContext,
+    invoke: Callable[[discord.ApplicationContext], Awaitable[None]],
+) -> None:
+    """Run a command within its time budget.
+
+    Commands expected to be slow are deferred straight away, and others
+    once they have run for `commands.defer_after` seconds, so Discord's
+    three second window to acknowledge them is never missed. Commands
+    overrunning their budget are cancelled, rolling back any open
+    transaction, and the user is told so.
+
+    Parameters
+    ----------
+    ctx : discord.ApplicationContext
+        Context of the command.
+    invoke : Callable[[discord.ApplicationContext], Awaitable[None]]
+        Coroutine function running the command.
+
+    """
+    config = get_config().commands
+    command = ctx.command.qualified_name
+    command_budget = get_budget(ctx.command)
+    seconds = command_budget.seconds or config.timeout
+    loop = asyncio.get_running_loop()
+    started = loop.time()
+    if latency_estimates.get(command, 0) > config.defer_after:
+        metrics.increment("deferred", command)
+        await defer(ctx, public=command_budget.public)
+    task = asyncio.create_task(invoke(ctx))
+    done, _ = await asyncio.wait({task}, timeout=config.defer_after)
+    if len(done) == 0:
+        if not ctx.response.is_done():
+            metrics.increment("deferred", command)
+        await defer(ctx, public=command_budget.public)
+        remaining = seconds - (loop.time() - started)
+        done, _ = await asyncio.wait({task}, timeout=max(remaining, 0))
+    if len(done) == 0:
+        task.cancel()
+        with contextlib.suppress(asyncio.CancelledError):
+            await task
+        record_latency(command, seconds)
+        metrics.increment("deadline_missed", command)
+        logger.warning("/%s cancelled after %s seconds", command, seconds)
+        await ctx.respond(TIMEOUT_MESSAGE, ephemeral=True)
+        return
+    record_latency(command, loop.time() - started)
+    await task
@@ -0,0 +1,668 @@
+"""DuckDB storage backend for analytics-heavy deployments."""
+
+from __future__ import annotations
+
+import asyncio
+import json
+from datetime import UTC, datetime, timedelta
+from pathlib import Path
+from typing import TYPE_CHECKING, Literal, Self
+
+import uuid6
+
+from src.ocular.config import get_config
+from src.ocular.identity import Identity
+from src.ocular.lazy import lazy_import
+from src.ocular.storage import PAGE_SIZE, Registration, Storage
+
+if TYPE_CHECKING:
+    from collections.abc import Callable, Iterable
+
+pl = lazy_import("polars")
+
+try:
+    import duckdb
+except ImportError:
+    duckdb = None
+
+
+class DuckDBStorage(Storage):
+    """Storage in a DuckDB database file.
+
+    DuckDB's columnar engine makes whole-table aggregations such as
+    `summarize_needed_mounts` fast, at the cost of slower single-row
+    writes than SQLite. The tables mirror the SQLite backend's users,
+    mounts, status and status_events tables. DuckDB calls block, so
+    they run in a worker thread, one at a time on a single connection.
+    """
+
+    def __init__(self: Self) -> None:
+        """Set the database paths, connecting on first use."""
+        if duckdb is None:
+            msg = "The DuckDB backend needs the duckdb package: uv sync --extra duckdb"
+            raise ImportError(msg)
+        config = get_config().database
+        self.db_path = str(Path(config.path).with_suffix(".duckdb"))
+        self.catalog_path = config.catalog_path
+        self.connection = None
+        self.lock = asyncio.Lock()
+
+    def connect(self: Self) -> duckdb.DuckDBPyConnection:
+        """Connect to the database file on first use."""
+        if self.connection is None:
+            Path(self.db_path).parent.mkdir(parents=True, exist_ok=True)
+            self.connection = duckdb.connect(str(self.db_path))
+        return self.connection
+
+    async def run(self: Self, query: str, params: tuple | list = ()) -> list[tuple]:
+        """Run a query in a worker thread and return its rows."""
+
+        def execute() -> list[tuple]:
+            cs = self.connect().execute(query, params)
+            return cs.fetchall() if cs.description is not None else []
+
+        async with self.lock:
+            return await asyncio.to_thread(execute)
+
+    async def run_transaction[T](
+        self: Self,
+        apply: Callable[[duckdb.DuckDBPyConnection], T],
+    ) -> T:
+        """Run a function of the connection as one transaction in a worker thread."""
+
+        def execute() -> T:
+            db = self.connect()
+            db.begin()
+            try:
+                result = apply(db)
+            except Exception:
+                db.rollback()
+                raise
+            db.commit()
+            return result
+
+        async with self.lock:
+            return await asyncio.to_thread(execute)
+
+    async def close(self: Self) -> None:
+        """Close the connection, if one is open."""
+        async with self.lock:
+            if self.connection is not None:
+                self.connection.close()
+                self.connection = None
+
+    @staticmethod
+    def set_status(
+        db: duckdb.DuckDBPyConnection,
+        user: Identity,
+        item_ids: list[str],
+        has_item: int,
+        actor: int,
+    ) -> int:
+        """Set the status of mounts for a user, logging an event per change.
+
+        Runs inside a transaction of `run_transaction`, returning the
+        number of mounts whose status changed.
+        """
+        cs = db.execute(
+            """
+            UPDATE status SET has_item = ?
+            WHERE user_id = ? AND has_item != ? AND list_contains(?, item_id)
+            RETURNING item_id
+            """,
+            (has_item, user.user_id, has_item, item_ids),
+        )
+        changed = [row[0] for row in cs.fetchall()]
+        if len(changed) != 0:
+            db.execute(
+                """
+                INSERT INTO status_events(
+                    user_id, item_id, item_expac, has_item,
+                    actor_discord_id, actor_role, created_at
+                )
+                SELECT ?, item_id, item_expac, ?, ?, ?, ?
+                FROM mounts WHERE list_contains(?, item_id)
+                """,
+                (
+                    user.user_id,
+                    has_item,
+                    actor,
+                    "self" if actor == user.user_discord_id else "admin",
+                    datetime.now(UTC).replace(tzinfo=None),
+                    changed,
+                ),
+            )
+        return len(changed)
+
+    async def get_discord_identity(self: Self, discord_id: int) -> Identity:
+        """Get the identity of the user with a discord ID, raising if none."""
+        query = """
+            SELECT user_id, user_name, user_discord_id FROM users
+            WHERE user_discord_id = ?
+        """
+        rows = await self.run(query, (discord_id,))
+        if len(rows) == 0:
+            msg = f"No user with discord ID {discord_id}"
+            raise ValueError(msg)
+        return Identity(*rows[0])
+
+    async def check_name_free(
+        self: Self,
+        item_name: str,
+        item_expac: str,
+        item_id: None | str = None,
+    ) -> None:
+        """Raise if a mount of an expansion other than `item_id` has a name."""
+        query = """
+            SELECT 1 FROM mounts
+            WHERE lower(trim(item_name)) = lower(trim(?))
+                AND item_expac = ? AND item_id IS DISTINCT FROM ?
+        """
+        if len(await self.run(query, (item_name, item_expac, item_id))) != 0:
+            msg = f"Mount name {item_name} is already taken"
+            raise ValueError(msg)
+
+    async def init_tables(self: Self) -> None:
+        """Create the tables and load the mount catalog if they are new."""
+        await self.run(
+            """
+            CREATE TABLE IF NOT EXISTS users(
+                user_id VARCHAR PRIMARY KEY,
+                user_name VARCHAR UNIQUE,
+                user_discord_id BIGINT UNIQUE
+            )
+            """,
+        )
+        await self.run(
+            """
+            CREATE TABLE IF NOT EXISTS mounts(
+                item_id VARCHAR PRIMARY KEY, item_name VARCHAR, item_expac VARCHAR
+            )
+            """,
+        )
+        await self.run(
+            """
+            CREATE TABLE IF NOT EXISTS status(
+                user_id VARCHAR, item_id VARCHAR, has_item INTEGER,
+                PRIMARY KEY (user_id, item_id)
+            )
+            """,
+        )
+        await self.run(
+            """
+            CREATE TABLE IF NOT EXISTS status_events(
+                user_id VARCHAR, item_id VARCHAR, item_expac VARCHAR,
+                has_item INTEGER, actor_discord_id BIGINT, actor_role VARCHAR,
+                created_at TIMESTAMP
+            )
+            """,
+        )
+        if (await self.run("SELECT COUNT(*) FROM mounts"))[0][0] != 0:
+            return
+        catalog = json.loads(Path(self.catalog_path).read_bytes())
+        for duty_rows in catalog.values():
+            for row in duty_rows:
+                await self.run(
+                    "INSERT INTO mounts VALUES(?, ?, ?)",
+                    (row["item_id"], row["item_name"], row["item_expac"]),
+                )
+
+    async def register_user(self: Self, name: str, discord_id: int) -> Registration:
+        """Add a user with their statuses unless their name or ID is taken."""
+        user_id = uuid6.uuid7().hex
+
+        def apply(db: duckdb.DuckDBPyConnection) -> Registration:
+            cs = db.execute(
+                """
+                INSERT INTO users VALUES(?, ?, ?)
+                ON CONFLICT DO NOTHING
+                RETURNING user_id
+                """,
+                (user_id, name, discord_id),
+            )
+            if len(cs.fetchall()) != 0:
+                db.execute(
+                    """
+                    INSERT INTO status(user_id, item_id, has_item)
+                    SELECT ?, item_id, 0 FROM mounts
+                    """,
+                    (user_id,),
+                )
+                return "added"
+            cs = db.execute(
+                """
+                SELECT user_name, user_discord_id FROM users
+                WHERE user_name = ? OR user_discord_id = ?
+                """,
+                (name, discord_id),
+            )
+            users = cs.fetchall()
+            if (name, discord_id) in users:
+                return "registered"
+            if any(user_name == name for user_name, _ in users):
+                return "name_taken"
+            return "id_taken"
+
+        return await self.run_transaction(apply)
+
+    async def append_new_user(self: Self, name: str, discord_id: int) -> None:
+        """Add a user."""
+        await self.run(
+            "INSERT INTO users VALUES(?, ?, ?)",
+            (uuid6.uuid7().hex, name, discord_id),
+        )
+
+    async def append_new_status(self: Self, discord_id: int) -> None:
+        """Add a not owned status of every mount for a new user."""
+        await self.run(
+            """
+            INSERT INTO status(user_id, item_id, has_item)
+            SELECT users.user_id, mounts.item_id, 0
+            FROM users CROSS JOIN mounts
+            WHERE users.user_discord_id = ?
+            """,
+            (discord_id,),
+        )
+
+    async def check_user_exists(
+        self: Self,
+        check_col: Literal["user_name", "user_id", "user_discord_id"],
+        check_val: str | int,
+    ) -> bool:
+        """Check if a user already exists."""
+        if check_col not in {"user_name", "user_id", "user_discord_id"}:
+            msg = "check_col must be one of ['user_name', 'user_id', 'user_discord_id']"
+            raise ValueError(msg)
+        query = f"SELECT 1 FROM users WHERE {check_col} = ? LIMIT 1"  # noqa: S608
+        return len(await self.run(query, (check_val,))) != 0
+
+    async def get_user_from_discord_id(self: Self, discord_id: int) -> str:
+        """Get the ID of the user with a discord ID."""
+        return (await self.get_discord_identity(discord_id)).user_id
+
+    async def get_user_discord_id(self: Self, user_name: str) -> list[int]:
+        """Get the discord ID of a user as a list, empty if there is none."""
+        query = "SELECT user_discord_id FROM users WHERE user_name = ? LIMIT 1"
+        return [row[0] for row in await self.run(query, (user_name,))]
+
+    async def resolve_users(
+        self: Self,
+        user_names: Iterable[str] = (),
+        discord_ids: Iterable[int] = (),
+    ) -> list[Identity]:
+        """Find the users matching any of several names or discord IDs."""
+        query = """
+            SELECT user_id, user_name, user_discord_id FROM users
+            WHERE list_contains(?::VARCHAR[], user_name)
+                OR list_contains(?::BIGINT[], user_discord_id)
+        """
+        rows = await self.run(query, (list(user_names), list(discord_ids)))
+        return [Identity(*row) for row in rows]
+
+    async def find_items(
+        self: Self,
+        item_name: str,
+        expansion: None | str = None,
+    ) -> tuple[dict]:
+        """Find mounts by name, within `expansion` if given."""
+        query = """
+            SELECT item_id, item_name, item_expac FROM mounts
+            WHERE lower(trim(item_name)) = lower(trim(?))
+                AND coalesce(?, item_expac) = item_expac
+            ORDER BY item_expac
+        """
+        rows = await self.run(query, (item_name, expansion))
+        return tuple(
+            {"item_id": item_id, "item_name": name, "item_expac": expac}
+            for item_id, name, expac in rows
+        )
+
+    async def get_item_id(
+        self: Self,
+        item_name: str,
+        expansion: None | str = None,
+    ) -> tuple[str, ...]:
+        """Get the ID of a mount as a tuple, empty if there is none."""
+        items = await self.find_items(item_name, expansion)
+        item_ids = tuple(item["item_id"] for item in items)
+        if len(item_ids) > 1:
+            msg = f"Mount name {item_name} is not unique"
+            raise ValueError(msg)
+        return item_ids
+
+    async def list_item_names(self: Self, expansion: None | str = None) -> list[str]:
+        """List mount names, grouped by expansion in catalog order."""
+        if expansion is not None:
+            query = "SELECT item_name FROM mounts WHERE item_expac = ? ORDER BY rowid"
+            return [row[0] for row in await self.run(query, (expansion,))]
+        query = """
+            SELECT item_name FROM mounts
+            ORDER BY MIN(rowid) OVER (PARTITION BY item_expac), rowid
+        """
+        return [row[0] for row in await self.run(query)]
+
+    async def list_user_names_page(
+        self: Self,
+        after: str = "",
+        limit: int = PAGE_SIZE,
+    ) -> list[str]:
+        """Get one page of user names, sorted by name."""
+        query = "SELECT user_name FROM users WHERE user_name > ? ORDER BY 1 LIMIT ?"
+        return [row[0] for row in await self.run(query, (after, limit))]
+
+    async def list_item_names_page(
+        self: Self,
+        expansion: str,
+        after: str = "",
+        limit: int = PAGE_SIZE,
+    ) -> list[str]:
+        """Get one page of mount names from an expansion, sorted by name."""
+        query = """
+            SELECT item_name FROM mounts
+            WHERE item_expac = ? AND item_name > ?
+            ORDER BY item_name
+            LIMIT ?
+        """
+        return [row[0] for row in await self.run(query, (expansion, after, limit))]
+
+    async def list_expansions(self: Self) -> list[str]:
+        """List the expansions that have mounts."""
+        query = "SELECT item_expac FROM mounts GROUP BY item_expac ORDER BY MIN(rowid)"
+        return [row[0] for row in await self.run(query)]
+
+    async def list_user_items(
+        self: Self,
+        user: int,
+        check_type: Literal["has", "needs"],
+        expansion: str,
+    ) -> list[str]:
+        """List the mounts of an expansion a user has or needs."""
+        query = """
+            SELECT mounts.item_name
+            FROM status
+            JOIN mounts ON mounts.item_id = status.item_id
+            WHERE status.user_id = ?
+                AND status.has_item = ?
+                AND mounts.item_expac = ?
+            ORDER BY mounts.rowid
+        """
+        user_id = await self.get_user_from_discord_id(user)
+        check_val = 1 if check_type == "has" else 0
+        rows = await self.run(query, (user_id, check_val, expansion))
+        if len(rows) == 0:
+            return ["none"]
+        return [row[0] for row in rows]
+
+    async def update_user_items(
+        self: Self,
+        action: Literal["add", "remove"],
+        user: int,
+        item_names: str,
+        actor: None | int = None,
+        expansion: None | str = None,
+    ) -> bool:
+        """Mark a mount as owned or not owned by a user."""
+        if action not in {"add", "remove"}:
+            msg = "action must be one of ['add', 'remove']"
+            raise ValueError(msg)
+        identity = await self.get_discord_identity(user)
+        item_ids = list(await self.get_item_id(item_names, expansion))
+        has_item = 1 if action == "add" else 0
+        actor = user if actor is None else actor
+        await self.run_transaction(
+            lambda db: self.set_status(db, identity, item_ids, has_item, actor),
+        )
+        return len(item_ids) != 0
+
+    async def update_user_expansion(
+        self: Self,
+        action: Literal["add", "remove"],
+        user: int,
+        expansion: str,
+        actor: None | int = None,
+    ) -> int:
+        """Mark every mount of an expansion as owned or not owned by a user."""
+        if action not in {"add", "remove"}:
+            msg = "action must be one of ['add', 'remove']"
+            raise ValueError(msg)
+        identity = await self.get_discord_identity(user)
+        query = "SELECT item_id FROM mounts WHERE item_expac = ?"
+        item_ids = [row[0] for row in await self.run(query, (expansion,))]
+        has_item = 1 if action == "add" else 0
+        actor = user if actor is None else actor
+        return await self.run_transaction(
+            lambda db: self.set_status(db, identity, item_ids, has_item, actor),
+        )
+
+    async def update_users_item(
+        self: Self,
+        action: Literal["add", "remove"],
+        users: Iterable[Identity],
+        item_id: str,
+        actor: int,
+    ) -> int:
+        """Mark a mount as owned or not owned by several users at once."""
+        if action not in {"add", "remove"}:
+            msg = "action must be one of ['add', 'remove']"
+            raise ValueError(msg)
+        has_item = 1 if action == "add" else 0
+        users = list(users)
+        return await self.run_transaction(
+            lambda db: sum(
+                self.set_status(db, user, [item_id], has_item, actor) for user in users
+            ),
+        )
+
+    async def add_new_item(self: Self, expansion: str, name: str) -> None:
+        """Add a mount, not owned by any user."""
+        item_id = uuid6.uuid7().hex
+        await self.check_name_free(name, expansion)
+        await self.run("INSERT INTO mounts VALUES(?, ?, ?)", (item_id, name, expansion))
+        await self.run(
+            """
+            INSERT INTO status(user_id, item_id, has_item)
+            SELECT user_id, ?, 0 FROM users
+            """,
+            (item_id,),
+        )
+
+    async def edit_item_name(
+        self: Self,
+        old_name: str,
+        new_name: str,
+        expansion: None | str = None,
+    ) -> bool:
+        """Rename a mount."""
+        items = await self.find_items(old_name, expansion)
+        if len(items) > 1:
+            msg = f"Mount name {old_name} is not unique"
+            raise ValueError(msg)
+        for item in items:
+            await self.check_name_free(new_name, item["item_expac"], item["item_id"])
+            query = "UPDATE mounts SET item_name = ? WHERE item_id = ?"
+            await self.run(query, (new_name, item["item_id"]))
+        return len(items) != 0
+
+    async def delete_item(self: Self, name: str, expansion: None | str = None) -> bool:
+        """Delete a mount and its statuses."""
+        item_ids = await self.get_item_id(name, expansion)
+        for item_id in item_ids:
+            await self.run("DELETE FROM status WHERE item_id = ?", (item_id,))
+            await self.run("DELETE FROM mounts WHERE item_id = ?", (item_id,))
+        return len(item_ids) != 0
+
+    async def delete_user(self: Self, name: str) -> None:
+        """Delete a user and their statuses."""
+        query = "SELECT user_id FROM users WHERE user_name = ?"
+        for (user_id,) in await self.run(query, (name,)):
+            await self.run("DELETE FROM status WHERE user_id = ?", (user_id,))
+            await self.run("DELETE FROM users WHERE user_id = ?", (user_id,))
+
+    async def rename_user(self: Self, from_name: str, to_name: str) -> None:
+        """Change the name of a user."""
+        query = "UPDATE users SET user_name = ? WHERE user_name = ?"
+        await self.run(query, (to_name, from_name))
+
+    async def find_missing_users(self: Self, user_names: list[str]) -> list[str]:
+        """Get the names from a list that are not users."""
+        query = "SELECT user_name FROM users WHERE list_contains(?, user_name)"
+        found = {row[0] for row in await self.run(query, (user_names,))}
+        return [name for name in user_names if name not in found]
+
+    async def get_party_need_masks(
+        self: Self,
+        user_names: list[str],
+    ) -> dict[tuple[str, str], int]:
+        """Get need bitmasks of a party keyed by (item_expac, item_name)."""
+        query = """
+            SELECT
+                mounts.item_expac,
+                mounts.item_name,
+                BIT_OR(
+                    CASE WHEN status.has_item = 0
+                    THEN 1::HUGEINT << (list_position(?, users.user_name) - 1)
+                    ELSE 0 END
+                )
+            FROM users
+            JOIN status ON status.user_id = users.user_id
+            JOIN mounts ON mounts.item_id = status.item_id
+            WHERE list_contains(?, users.user_name)
+            GROUP BY mounts.item_expac, mounts.item_name
+        """
+        rows = await self.run(query, (user_names, user_names))
+        return {(expac, name): int(mask) for expac, name, mask in rows}
+
+    async def summarize_needed_mounts(self: Self) -> pl.DataFrame:
+        """Count the users needing each mount."""
+        query = """
+            SELECT
+                mounts.item_expac,
+                mounts.item_name,
+                CAST(SUM(CASE WHEN status.has_item = 0 THEN 1 ELSE 0 END) AS BIGINT)
+            FROM status
+            JOIN mounts ON mounts.item_id = status.item_id
+            GROUP BY mounts.item_expac, mounts.item_name
+            ORDER BY 3 DESC
+        """
+        rows = await self.run(query)
+        return pl.DataFrame(
+            rows,
+            schema={
+                "item_expac": pl.String,
+                "item_name": pl.String,
+                "need_count": pl.Int64,
+            },
+            orient="row",
+        )
+
+    async def summarize_party_needs(
+        self: Self,
+        user_names: list[str],
+        per_expansion: int = -1,
+    ) -> pl.DataFrame:
+        """Rank the mounts of each expansion by how many party members need them."""
+        query = """
+            SELECT item_expac, item_name, need_count FROM (
+                SELECT
+                    mounts.item_expac,
+                    mounts.item_name,
+                    COUNT(*) AS need_count,
+                    ROW_NUMBER() OVER (
+                        PARTITION BY mounts.item_expac
+                        ORDER BY COUNT(*) DESC, MIN(mounts.rowid)
+                    ) AS expac_rank,
+                    MIN(MIN(mounts.rowid)) OVER (
+                        PARTITION BY mounts.item_expac
+                    ) AS expac_order
+                FROM users
+                JOIN status ON status.user_id = users.user_id AND status.has_item = 0
+                JOIN mounts ON mounts.item_id = status.item_id
+                WHERE list_contains(?, users.user_name)
+                GROUP BY mounts.item_id, mounts.item_expac, mounts.item_name
+            )
+            WHERE expac_rank <= ?
+            ORDER BY expac_order, expac_rank
+        """
+        if per_expansion < 0:
+            per_expansion = (await self.run("SELECT COUNT(*) FROM mounts"))[0][0]
+        rows = await self.run(query, (user_names, per_expansion))
+        schema = {
+            "item_expac": pl.String,
+            "item_name": pl.String,
+            "need_count": pl.Int64,
+        }
+        return pl.DataFrame(rows, schema=schema, orient="row")
+
+    async def list_item_needers(
+        self: Self,
+        item_name: str,
+        expansion: None | str = None,
+    ) -> dict[str, list[str]]:
+        """Get the users who still need a mount, keyed by expansion."""
+        query = """
+            SELECT mounts.item_expac, users.user_name
+            FROM mounts
+            JOIN status ON status.item_id = mounts.item_id AND status.has_item = 0
+            JOIN users ON users.user_id = status.user_id
+            WHERE lower(trim(mounts.item_name)) = lower(trim(?))
+                AND coalesce(?, mounts.item_expac) = mounts.item_expac
+            ORDER BY mounts.item_expac, users.user_name
+        """
+        needers = {}
+        for item_expac, user_name in await self.run(query, (item_name, expansion)):
+            needers.setdefault(item_expac, []).append(user_name)
+        return needers
+
+    async def summarize_weekly_progress(
+        self: Self,
+        user_name: None | str = None,
+        expansion: None | str = None,
+        weeks: int = 8,
+    ) -> pl.DataFrame:
+        """Summarize net mounts gained per week from the status events."""
+        query = """
+            SELECT
+                strftime(date_trunc('week', status_events.created_at), '%Y-%m-%d')
+                    AS week,
+                CAST(SUM(2 * status_events.has_item - 1) AS BIGINT) AS gained
+            FROM status_events
+            LEFT JOIN users ON users.user_id = status_events.user_id
+            WHERE CAST(status_events.created_at AS DATE) >= ?
+                AND (CAST(? AS VARCHAR) IS NULL OR users.user_name = ?)
+                AND coalesce(?, status_events.item_expac) = status_events.item_expac
+            GROUP BY week
+            ORDER BY week
+        """
+        today = datetime.now(UTC).date()
+        start = today - timedelta(days=today.weekday() + 7 * (weeks - 1))
+        params = (start, user_name, user_name, expansion)
+        return pl.DataFrame(
+            await self.run(query, params),
+            schema={"week": pl.String, "gained": pl.Int64},
+            orient="row",
+        )
+
+    async def list_leaderboard(
+        self: Self,
+        expansion: None | str = None,
+        limit: int = 10,
+    ) -> pl.DataFrame:
+        """Get the users with the highest share of mounts owned."""
+        query = """
+            SELECT
+                users.user_name,
+                CAST(SUM(status.has_item) AS BIGINT) AS owned,
+                COUNT(*) AS total
+            FROM users
+            JOIN status ON status.user_id = users.user_id
+            JOIN mounts ON mounts.item_id = status.item_id
+            WHERE coalesce(?, mounts.item_expac) = mounts.item_expac
+            GROUP BY users.user_id, users.user_name
+            ORDER BY owned / total DESC, owned DESC
+            LIMIT ?
+        """
+        return pl.DataFrame(
+            await self.run(query, (expansion, limit)),
+            schema={"user_name": pl.String, "owned": pl.Int64, "total": pl.Int64},
+            orient="row",
+        )
@@ -0,0 +1,240 @@
+"""Streaming export of database snapshots to CSV or Parquet files."""
+
+import argparse
+import asyncio
+import csv
+from collections.abc import AsyncIterator
+from datetime import UTC, datetime
+from pathlib import Path
+from typing import Literal, Self
+
+import aiosqlite
+
+from src.ocular import queries
+from src.ocular.config import CONFIG_PATH, ConfigStore, get_config
+from src.ocular.lazy import lazy_import
+from src.ocular.operations import DataBase
+
+pl = lazy_import("polars")
+
+EXPORT_TABLES = {
+    "users": queries.ALL_USERS,
+    "mounts": queries.ALL_MOUNTS,
+    "status": queries.ALL_STATUS,
+}
+
+
+class CsvTableWriter:
+    """Write chunks of rows to a single CSV file."""
+
+    def __init__(self: Self, path: Path, columns: list[str]) -> None:
+        """Open a CSV file and write its header.
+
+        Parameters
+        ----------
+        path : Path
+            File to write.
+        columns : list[str]
+            Column names of the rows to write.
+
+        """
+        self.path = path
+        self.file = path.open("w", newline="", encoding="utf-8")
+        self.writer = csv.writer(self.file)
+        self.writer.writerow(columns)
+
+    def write(self: Self, rows: list[tuple]) -> None:
+        """Append rows to the file."""
+        self.writer.writerows(rows)
+
+    def close(self: Self) -> None:
+        """Close the file."""
+        self.file.close()
+
+
+class ParquetTableWriter:
+    """Write chunks of rows as part files of a Parquet dataset directory."""
+
+    def __init__(self: Self, path: Path, columns: list[str]) -> None:
+        """Create the dataset directory.
+
+        Parameters
+        ----------
+        path : Path
+            Directory to write part files to.
+        columns : list[str]
+            Column names of the rows to write.
+
+        """
+        self.path = path
+        self.columns = columns
+        self.n_parts = 0
+        path.mkdir(parents=True, exist_ok=True)
+
+    def write(self: Self, rows: list[tuple]) -> None:
+        """Write rows as the next part file."""
+        part = pl.DataFrame(rows, schema=self.columns, orient="row")
+        part.write_parquet(self.path.joinpath(f"part-{self.n_parts:05d}.parquet"))
+        self.n_parts += 1
+
+    def close(self: Self) -> None:
+        """Finish the dataset."""
+
+
+async def iter_query_chunks(
+    db: aiosqlite.Connection,
+    statement: queries.Statement[tuple[()]],
+    chunk_size: int,
+) -> AsyncIterator[tuple[list[str], list[tuple]]]:
+    """Yield the column names and successive row chunks of a statement.
+
+    The first chunk is always yielded, even if empty, so the columns of
+    empty tables are still known.
+    """
+    cs = await db.execute(statement.sql)
+    columns = [column[0] for column in cs.description]
+    rows = await cs.fetchmany(chunk_size)
+    yield columns, [tuple(row) for row in rows]
+    while rows := await cs.fetchmany(chunk_size):
+        yield columns, [tuple(row) for row in rows]
+
+
+async def iter_wide_chunks(
+    db: aiosqlite.Connection,
+    chunk_size: int,
+) -> AsyncIterator[tuple[list[str], list[tuple]]]:
+    """Yield chunks of a users by mounts ownership matrix.
+
+    Status rows are streamed in user order through the status index and
+    pivoted one user at a time, so only one chunk of users is held in
+    memory.
+    """
+    cs = await db.execute(queries.EXPORT_MOUNTS.sql)
+    mounts = await cs.fetchall()
+    positions = {item_id: i for i, (item_id, _, _) in enumerate(mounts)}
+    columns = ["user_name", *(f"{expac}: {name}" for _, expac, name in mounts)]
+    chunk, current_id, current_row = [], None, None
+    ownership = iter_query_chunks(db, queries.EXPORT_OWNERSHIP, chunk_size)
+    async for _, rows in ownership:
+        for user_id, user_name, item_id, has_item in rows:
+            if user_id != current_id:
+                if current_row is not None:
+                    chunk.append(tuple(current_row))
+                current_id, current_row = user_id, [user_name, *([None] * len(mounts))]
+            if item_id in positions:
+                current_row[positions[item_id] + 1] = has_item
+        if len(chunk) >= chunk_size:
+            yield columns, chunk
+            chunk = []
+    if current_row is not None:
+        chunk.append(tuple(current_row))
+    yield columns, chunk
+
+
+async def export_snapshot(
+    database: DataBase,
+    out_dir: Path,
+    file_format: Literal["csv", "parquet"] = "parquet",
+    *,
+    wide: bool = False,
+    chunk_size: None | int = None,
+) -> list[Path]:
+    """Export the database tables from one read snapshot.
+
+    All tables are read in a single read transaction, so the export is
+    consistent, and with the database in WAL mode the transaction does
+    not block writers. Rows are fetched and written in chunks, so memory
+    use does not grow with table size.
+
+    Parameters
+    ----------
+    database : DataBase
+        Database to export.
+    out_dir : Path
+        Directory to write the export to.
+    file_format : Literal["csv", "parquet"]
+        Format of the exported files. CSV tables are written as single
+        files, Parquet tables as directories of part files.
+    wide : bool
+        If true, export one users by mounts ownership matrix instead of
+        the users, mounts and status tables.
+    chunk_size : None | int
+        Number of rows fetched and written at a time. If none, the
+        configured export chunk size.
+
+    Returns
+    -------
+    paths : list[Path]
+        Paths of the exported tables.
+
+    """
+    if chunk_size is None:
+        chunk_size = get_config().batch.export_chunk_size
+    writer_types = {"csv": CsvTableWriter, "parquet": ParquetTableWriter}
+    if file_format not in writer_types:
+        msg = "file_format must be one of ['csv', 'parquet']"
+        raise ValueError(msg)
+    out_dir = Path(out_dir)
+    out_dir.mkdir(parents=True, exist_ok=True)
+    suffix = ".csv" if file_format == "csv" else ""
+    paths = []
+    async with database.connect() as db:
+        await db.execute("BEGIN")
+        if wide:
+            sources = {"ownership": iter_wide_chunks(db, chunk_size)}
+        else:
+            sources = {
+                table: iter_query_chunks(db, statement, chunk_size)
+                for table, statement in EXPORT_TABLES.items()
+            }
+        for table, chunks in sources.items():
+            path = out_dir.joinpath(f"{table}{suffix}")
+            writer = None
+            try:
+                async for columns, rows in chunks:
+                    if writer is None:
+                        writer = writer_types[file_format](path, columns)
+                    await asyncio.to_thread(writer.write, rows)
+            finally:
+                # Also closes the file of an export failing midway
+                if writer is not None:
+                    writer.close()
+            if writer is not None:
+                paths.append(path)
+        await db.rollback()
+    return paths
+
+
+def main() -> None:
+    """Export the bot database from the command line."""
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--config", default=CONFIG_PATH, help="Configuration path")
+    parser.add_argument(
+        "--db",
+        help="Database path, the configured one by default",
+    )
+    parser.add_argument(
+        "--out",
+        default=f"./data/exports/{datetime.now(UTC):%Y%m%dT%H%M%S}",
+        help="Directory to write the export to",
+    )
+    parser.add_argument("--format", choices=["csv", "parquet"], default="parquet")
+    parser.add_argument(
+        "--wide",
+        action="store_true",
+        help="Export a users by mounts ownership matrix",
+    )
+    args = parser.parse_args()
+    ConfigStore.load(args.config)
+    database = DataBase()
+    if args.db is not None:
+        database.db_path = args.db
+    paths = asyncio.run(
+        export_snapshot(database, Path(args.out), args.format, wide=args.wide),
+    )
+    for path in paths:
+        print(path)  # noqa: T201
+
+
+if __name__ == "__main__":
+    main()
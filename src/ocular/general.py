@@ -1,33 +1,55 @@
 """Cog storing commands for general use."""
 
+import io
 import logging
 from typing import Self
 
 import discord
-import polars as pl
 from discord.ext import commands
 
-from src.ocular.operations import DataBase
+from src.ocular.cards import cards_available
+from src.ocular.deadline import budget
+from src.ocular.lazy import lazy_import
+from src.ocular.planner import plan_farm
+from src.ocular.storage import get_storage
+from src.ocular.views import KeysetPaginator
 
 logger = logging.getLogger("discord")
+pl = lazy_import("polars")
+
+MAX_PARTY_SIZE = 8
+PARTY_NEEDS_PER_EXPANSION = 5
+MAX_PLAN_WEEKS = 8
+MAX_RUNS_PER_WEEK = 10
+MAX_LISTED_NAMES = 40
+MAX_PROGRESS_WEEKS = 26
 
 
 async def get_mount_names(ctx: discord.AutocompleteContext) -> list[str]:
     """Fetch list of mount names for autocomplete."""
-    database = DataBase()
+    database = get_storage()
     mounts = await database.list_item_names(
-        expansion=ctx.options["expansion"],
+        expansion=ctx.options.get("expansion"),
     )
     return mounts  # noqa: RET504
 
 
 async def get_expansion_names(ctx: discord.AutocompleteContext) -> list[str]:  # noqa: ARG001
     """Fetch list of mount names for autocomplete."""
-    database = DataBase()
+    database = get_storage()
     expansions = await database.list_expansions()
     return expansions  # noqa: RET504
 
 
+def format_name_list(names: list[str]) -> str:
+    """Format names as an embed list, truncated to fit in a field."""
+    shown = names[:MAX_LISTED_NAMES]
+    hidden = len(names) - len(shown)
+    if hidden > 0:
+        shown = [*shown, f"... and {hidden} more"]
+    return f" - {'\n - '.join(shown)}"
+
+
 class General(commands.Cog):
     """Class to hold general use commands."""
 
@@ -36,6 +58,7 @@ class General(commands.Cog):
         self.bot = bot
 
     @discord.slash_command(name="ocular", description="Confirm the bot is responsive")
+    @budget(public=True)
     async def ocular(self: Self, ctx: discord.ApplicationContext) -> None:
         """Check if the bot responds."""
         logger.info("/ocular invoked by %s", ctx.author.name)
@@ -64,43 +87,23 @@ class General(commands.Cog):
 
         """
         logger.info("/addme invoked by %s", ctx.author.name)
-        database = DataBase()
-        # Check if user name is already added
-        name_exists = await database.check_user_exists(
-            check_col="user_name",
-            check_val=name,
-        )
-        # Check if discord ID is already added
-        id_exists = await database.check_user_exists(
-            check_col="user_discord_id",
-            check_val=ctx.author.id,
-        )
-        if name_exists:
+        database = get_storage()
+        outcome = await database.register_user(name=name, discord_id=ctx.author.id)
+        if outcome == "name_taken":
             logger.warning("User %s already in database, cancelling", name)
-            await ctx.send_response(
-                content=f"I already have a user named `{name}` in my database.",
-                ephemeral=True,
-                delete_after=90,
-            )
-        elif id_exists:
+            content = f"I already have a user named `{name}` in my database."
+        elif outcome == "id_taken":
             logger.warning(
                 "Discord ID %s already in database, cancelling",
                 ctx.author.id,
             )
-            await ctx.send_response(
-                content="I already have a user with your discord ID in my database.",
-                ephemeral=True,
-                delete_after=90,
-            )
+            content = "I already have a user with your discord ID in my database."
+        elif outcome == "registered":
+            content = f"You are already in my database as `{name}`."
         else:
-            logger.info("Adding %s to the database as %s", ctx.author.name, name)
-            await database.append_new_user(name=name, discord_id=ctx.author.id)
-            await database.append_new_status(discord_id=ctx.author.id)
-            await ctx.send_response(
-                content=f"You have been added as `{name}` in my database.",
-                ephemeral=True,
-                delete_after=90,
-            )
+            logger.info("Added %s to the database as %s", ctx.author.name, name)
+            content = f"You have been added as `{name}` in my database."
+        await ctx.respond(content=content, ephemeral=True, delete_after=90)
         logger.info("/addme OK")
 
     @discord.slash_command(name="userlist", description="List users in the database")
@@ -115,15 +118,19 @@ class General(commands.Cog):
 
         """
         logger.info("/userlist invoked by %s", ctx.author.name)
-        database = DataBase()
-        user_table = await database.read_table_polars("users")
-        user_list = user_table.select("user_name").to_series().to_list()
-        embed = discord.Embed(
+        database = get_storage()
+        view = KeysetPaginator(
             title="Users",
-            description=f"List of users in the database: \n - {'\n - '.join(user_list)}",  # noqa: E501
-            color=discord.Colour.blue(),
+            description="List of users in the database:",
+            fetch_page=database.list_user_names_page,
+        )
+        embed = await view.load_page()
+        await ctx.respond(
+            embed=embed,
+            view=view,
+            ephemeral=True,
+            delete_after=90,
         )
-        await ctx.send_response(embed=embed, ephemeral=True, delete_after=90)
         logger.info("/userlist OK")
 
     @discord.slash_command(name="mountlist", description="List available mount names")
@@ -150,14 +157,23 @@ class General(commands.Cog):
 
         """
         logger.info("/mountnames invoked by %s", ctx.author.name)
-        database = DataBase()
-        item_names = await database.list_item_names(expansion)
-        embed = discord.Embed(
+        database = get_storage()
+
+        async def fetch_page(after: str, limit: int) -> list[str]:
+            return await database.list_item_names_page(expansion, after, limit)
+
+        view = KeysetPaginator(
             title=f"{expansion.capitalize()} mounts",
-            description=f"Available mounts are: \n - {'\n - '.join(item_names)}",
-            color=discord.Colour.blue(),
+            description="Available mounts are:",
+            fetch_page=fetch_page,
+        )
+        embed = await view.load_page()
+        await ctx.respond(
+            embed=embed,
+            view=view,
+            ephemeral=True,
+            delete_after=90,
         )
-        await ctx.send_response(embed=embed, ephemeral=True, delete_after=90)
         logger.info("/mountnames OK")
 
     @discord.slash_command(name="addmount", description="Add mounts to your list")
@@ -193,31 +209,30 @@ class General(commands.Cog):
 
         """
         logger.info("/addmount invoked by %s", ctx.author.name)
-        database = DataBase()
-        item_names = await database.list_item_names(expansion)
-        user_id = await database.get_user_from_discord_id(ctx.author.id)
-        if len(user_id) == 0:
+        database = get_storage()
+        registered = await database.check_user_exists("user_discord_id", ctx.author.id)
+        if not registered:
             logger.warning("User %s not registered, cancelling", ctx.author.name)
-            await ctx.send_response(
+            await ctx.respond(
                 content="I don't have you in my database! Add yourself with `/addme`.",
                 ephemeral=True,
                 delete_after=90,
             )
-        elif name not in item_names:
+        elif not await database.update_user_items(
+            action="add",
+            user=ctx.author.id,
+            item_names=name,
+            expansion=expansion,
+        ):
             logger.warning("Mount %s not found in database, cancelling", name)
-            await ctx.send_response(
+            await ctx.respond(
                 content=f"I don't have a `{expansion}` mount named `{name}` in my database.",  # noqa: E501
                 ephemeral=True,
                 delete_after=90,
             )
         else:
-            logger.info("Adding mount %s for %s", name, ctx.author.name)
-            await database.update_user_items(
-                action="add",
-                user=ctx.author.id,
-                item_names=name,
-            )
-            await ctx.send_response(
+            logger.info("Added mount %s for %s", name, ctx.author.name)
+            await ctx.respond(
                 content=f"Added `{name}` to your `{expansion}` mounts.",
                 ephemeral=True,
                 delete_after=90,
@@ -260,38 +275,162 @@ class General(commands.Cog):
 
         """
         logger.info("/removemount invoked by %s", ctx.author.name)
-        database = DataBase()
-        item_names = await database.list_item_names(expansion)
-        user_id = await database.get_user_from_discord_id(ctx.author.id)
-        if len(user_id) == 0:
+        database = get_storage()
+        registered = await database.check_user_exists("user_discord_id", ctx.author.id)
+        if not registered:
             logger.warning("User %s not registered, cancelling", ctx.author.name)
-            await ctx.send_response(
+            await ctx.respond(
                 content="I don't have you in my database! Add yourself with `/addme`.",
                 ephemeral=True,
                 delete_after=90,
             )
-        elif name not in item_names:
+        elif not await database.update_user_items(
+            user=ctx.author.id,
+            action="remove",
+            item_names=name,
+            expansion=expansion,
+        ):
             logger.warning("Mount %s not found in database, cancelling", name)
-            await ctx.send_response(
+            await ctx.respond(
                 content=f"I don't have a `{expansion}` mount named `{name}` in my database.",  # noqa: E501
                 ephemeral=True,
                 delete_after=90,
             )
         else:
-            logger.info("Removing mount %s from %s", name, ctx.author.name)
-            await database.update_user_items(
+            logger.info("Removed mount %s from %s", name, ctx.author.name)
+            await ctx.respond(
+                content=f"Removed `{name}` from your `{expansion}` mounts.",
+                ephemeral=True,
+                delete_after=90,
+            )
+        logger.info("/removemount OK")
+
+    @discord.slash_command(
+        name="addexpansion",
+        description="Add every mount of an expansion to your list",
+    )
+    @discord.option(
+        "expansion",
+        type=str,
+        autocomplete=discord.utils.basic_autocomplete(get_expansion_names),
+        description="Expansion to add every mount from",
+    )
+    async def addexpansion(
+        self: Self,
+        ctx: discord.ApplicationContext,
+        expansion: str,
+    ) -> None:
+        """Add every mount of an expansion to a user in the status table.
+
+        Parameters
+        ----------
+        ctx : discord.ApplicationContext
+            Discord context. Used for interacting with the command
+            invoker.
+        expansion : str
+            The FFXIV expansion to add every mount from.
+
+        """
+        logger.info("/addexpansion invoked by %s", ctx.author.name)
+        database = get_storage()
+        registered = await database.check_user_exists("user_discord_id", ctx.author.id)
+        if not registered:
+            logger.warning("User %s not registered, cancelling", ctx.author.name)
+            await ctx.respond(
+                content="I don't have you in my database! Add yourself with `/addme`.",
+                ephemeral=True,
+                delete_after=90,
+            )
+        elif expansion not in await database.list_expansions():
+            logger.warning("Expansion %s not found, cancelling", expansion)
+            await ctx.respond(
+                content=f"I don't have an expansion named `{expansion}` in my database.",  # noqa: E501
+                ephemeral=True,
+                delete_after=90,
+            )
+        else:
+            changed = await database.update_user_expansion(
+                action="add",
                 user=ctx.author.id,
+                expansion=expansion,
+            )
+            logger.info(
+                "Added %s %s mounts for %s",
+                changed,
+                expansion,
+                ctx.author.name,
+            )
+            await ctx.respond(
+                content=f"Added {changed} `{expansion}` mounts to your mounts.",
+                ephemeral=True,
+                delete_after=90,
+            )
+        logger.info("/addexpansion OK")
+
+    @discord.slash_command(
+        name="clearexpansion",
+        description="Remove every mount of an expansion from your list",
+    )
+    @discord.option(
+        "expansion",
+        type=str,
+        autocomplete=discord.utils.basic_autocomplete(get_expansion_names),
+        description="Expansion to remove every mount from",
+    )
+    async def clearexpansion(
+        self: Self,
+        ctx: discord.ApplicationContext,
+        expansion: str,
+    ) -> None:
+        """Remove every mount of an expansion from a user in the status table.
+
+        Parameters
+        ----------
+        ctx : discord.ApplicationContext
+            Discord context. Used for interacting with the command
+            invoker.
+        expansion : str
+            The FFXIV expansion to remove every mount from.
+
+        """
+        logger.info("/clearexpansion invoked by %s", ctx.author.name)
+        database = get_storage()
+        registered = await database.check_user_exists("user_discord_id", ctx.author.id)
+        if not registered:
+            logger.warning("User %s not registered, cancelling", ctx.author.name)
+            await ctx.respond(
+                content="I don't have you in my database! Add yourself with `/addme`.",
+                ephemeral=True,
+                delete_after=90,
+            )
+        elif expansion not in await database.list_expansions():
+            logger.warning("Expansion %s not found, cancelling", expansion)
+            await ctx.respond(
+                content=f"I don't have an expansion named `{expansion}` in my database.",  # noqa: E501
+                ephemeral=True,
+                delete_after=90,
+            )
+        else:
+            changed = await database.update_user_expansion(
                 action="remove",
-                item_names=name,
+                user=ctx.author.id,
+                expansion=expansion,
             )
-            await ctx.send_response(
-                content=f"Removed `{name}` from your `{expansion}` mounts.",
+            logger.info(
+                "Removed %s %s mounts from %s",
+                changed,
+                expansion,
+                ctx.author.name,
+            )
+            await ctx.respond(
+                content=f"Removed {changed} `{expansion}` mounts from your mounts.",
                 ephemeral=True,
                 delete_after=90,
             )
-        logger.info("/removemount OK")
+        logger.info("/clearexpansion OK")
 
     @discord.slash_command(name="mymounts", description="View your mounts")
+    @budget(public=True)
     @discord.option(
         "expansion",
         type=str,
@@ -315,52 +454,51 @@ class General(commands.Cog):
 
         """
         logger.info("/mymounts invoked by %s", ctx.author.name)
-        database = DataBase()
-        user_id = await database.get_user_from_discord_id(ctx.author.id)
-        if len(user_id) == 0:
+        database = get_storage()
+        registered = await database.check_user_exists("user_discord_id", ctx.author.id)
+        if not registered:
             logger.warning("User %s not registered, cancelling", ctx.author.name)
-            await ctx.send_response(
+            await ctx.respond(
                 content="I don't have you in my database! Add yourself with `/addme`.",
                 ephemeral=True,
                 delete_after=90,
             )
-        else:
-            has_mounts = await database.list_user_items(
-                user=ctx.author.id,
-                check_type="has",
-                expansion=expansion,
+        elif expansion not in await database.list_expansions():
+            logger.warning("Expansion %s not found, cancelling", expansion)
+            await ctx.respond(
+                content=f"I don't have an expansion named `{expansion}` in my database.",  # noqa: E501
+                ephemeral=True,
+                delete_after=90,
             )
-            needs_mounts = await database.list_user_items(
-                user=ctx.author.id,
-                check_type="needs",
-                expansion=expansion,
+        else:
+            has_mounts = set(
+                await database.list_user_items(
+                    user=ctx.author.id,
+                    check_type="has",
+                    expansion=expansion,
+                ),
             )
-            image_urls = {
-                "a realm reborn": "https://lds-img.finalfantasyxiv.com/h/-/pnlEUJhVj0vMO7dtJ5psZ84Vvg.jpg",
-                "heavensward": "https://lds-img.finalfantasyxiv.com/h/3/uN1BWnRvdTy5nT8izK6G4Hu3cI.jpg",
-                "stormblood": "https://lds-img.finalfantasyxiv.com/h/v/CBMATiZFo0BaxDrY2G483WScs4.jpg",
-                "shadowbringers": "https://lds-img.finalfantasyxiv.com/h/m/B56bwbNBbqkA9UlbmcZ_BeWIL8.jpg",
-                "endwalker": "https://lds-img.finalfantasyxiv.com/h/Q/YW-_Cq8HEN5QOH5PD5w9xF2-YI.jpg",
-                "dawntrail": "https://lds-img.finalfantasyxiv.com/h/Z/1Li39bwJmXi701FfGzRL_7LAZg.jpg",
-            }
-            image_url = image_urls[expansion]
+            cells = [
+                (name, name in has_mounts)
+                for name in await database.list_item_names(expansion)
+            ]
             embed = discord.Embed(
                 title=f"{expansion.capitalize()} mounts",
                 color=discord.Colour.blue(),
             )
-            embed.add_field(
-                name="Have",
-                value=f" - {'\n - '.join(has_mounts)}",
-                inline=True,
-            )
-            embed.add_field(
-                name="Need",
-                value=f" - {'\n - '.join(needs_mounts)}",
-                inline=True,
-            )
-            embed.set_image(url=image_url)
             embed.set_thumbnail(url=ctx.author.avatar)
-            await ctx.respond(embed=embed)
+            if cards_available():
+                card = await self.bot.cards.get_card(expansion, cells)
+                embed.set_image(url="attachment://progress.png")
+                file = discord.File(io.BytesIO(card), filename="progress.png")
+                await ctx.respond(embed=embed, file=file)
+            else:
+                # Without Pillow the mounts are listed as text instead
+                have = [name for name, has_item in cells if has_item] or ["none"]
+                need = [name for name, has_item in cells if not has_item] or ["none"]
+                embed.add_field(name="Have", value=format_name_list(have), inline=True)
+                embed.add_field(name="Need", value=format_name_list(need), inline=True)
+                await ctx.respond(embed=embed)
         logger.info("/mymounts OK")
 
     @discord.slash_command(
@@ -381,7 +519,7 @@ class General(commands.Cog):
 
         """
         logger.info("/mostneeded invoked by %s", ctx.author.name)
-        database = DataBase()
+        database = get_storage()
         needed_mounts = await database.summarize_needed_mounts()
         output = needed_mounts[0:10]
         item_expansion_list = output.select("item_expac").to_series().to_list()
@@ -408,9 +546,360 @@ class General(commands.Cog):
             value=f"{'\n '.join(item_count_list)}",
             inline=True,
         )
-        await ctx.send_response(embed=embed, ephemeral=True)
+        await ctx.respond(embed=embed, ephemeral=True)
         logger.info("/mostneeded OK")
 
+    @discord.slash_command(
+        name="partyneeds",
+        description="Rank the mounts most needed by a group of users",
+    )
+    @discord.option(
+        "user_names",
+        type=str,
+        description=f"Comma-separated names of up to {MAX_PARTY_SIZE} users",
+    )
+    async def partyneeds(
+        self: Self,
+        ctx: discord.ApplicationContext,
+        user_names: str,
+    ) -> None:
+        """Display the mounts of each expansion needed by the most party members.
+
+        Parameters
+        ----------
+        ctx : discord.ApplicationContext
+            Discord context. Used for interacting with the command
+            invoker.
+        user_names : str
+            Comma-separated names of the users in the party.
+
+        """
+        logger.info("/partyneeds invoked by %s", ctx.author.name)
+        database = get_storage()
+        party = list(dict.fromkeys(x.strip() for x in user_names.split(",")))
+        party = [name for name in party if len(name) != 0]
+        if len(party) == 0 or len(party) > MAX_PARTY_SIZE:
+            logger.warning("Party of %s users requested, cancelling", len(party))
+            await ctx.respond(
+                content=f"Give me between 1 and {MAX_PARTY_SIZE} user names.",
+                ephemeral=True,
+                delete_after=90,
+            )
+        elif len(missing_users := await database.find_missing_users(party)) != 0:
+            logger.warning("Users %s not found, cancelling", missing_users)
+            await ctx.respond(
+                content=f"I don't have users named `{'`, `'.join(missing_users)}` in my database.",  # noqa: E501
+                ephemeral=True,
+                delete_after=90,
+            )
+        else:
+            needed_mounts = await database.summarize_party_needs(
+                party,
+                per_expansion=PARTY_NEEDS_PER_EXPANSION,
+            )
+            embed = discord.Embed(
+                title="Mounts most needed by the party",
+                color=discord.Colour.blue(),
+            )
+            if needed_mounts.is_empty():
+                embed.description = "Everyone in the party has every mount!"
+            for (item_expac,), mounts in needed_mounts.group_by(
+                "item_expac",
+                maintain_order=True,
+            ):
+                lines = [
+                    f"{item_name} ({need_count}/{len(party)})"
+                    for item_name, need_count in mounts.select(
+                        "item_name",
+                        "need_count",
+                    ).iter_rows()
+                ]
+                embed.add_field(
+                    name=item_expac.capitalize(),
+                    value=format_name_list(lines),
+                    inline=True,
+                )
+            await ctx.respond(embed=embed, ephemeral=True)
+        logger.info("/partyneeds OK")
+
+    @discord.slash_command(
+        name="farmplan",
+        description="Plan which duties a group should run each week",
+    )
+    @discord.option(
+        "user_names",
+        type=str,
+        description="Comma-separated names of the users in the group",
+    )
+    @discord.option(
+        "runs_per_week",
+        type=int,
+        min_value=1,
+        max_value=MAX_RUNS_PER_WEEK,
+        description="Number of duties the group runs each week",
+    )
+    @discord.option(
+        "weeks",
+        type=int,
+        min_value=1,
+        max_value=MAX_PLAN_WEEKS,
+        description="Number of weeks to plan for",
+    )
+    async def farmplan(
+        self: Self,
+        ctx: discord.ApplicationContext,
+        user_names: str,
+        runs_per_week: int,
+        weeks: int,
+    ) -> None:
+        """Display a weekly schedule maximizing the mounts a group gains.
+
+        Parameters
+        ----------
+        ctx : discord.ApplicationContext
+            Discord context. Used for interacting with the command
+            invoker.
+        user_names : str
+            Comma-separated names of the users in the group.
+        runs_per_week : int
+            Number of duties the group runs each week.
+        weeks : int
+            Number of weeks to plan for.
+
+        """
+        logger.info("/farmplan invoked by %s", ctx.author.name)
+        database = get_storage()
+        group = list(dict.fromkeys(x.strip() for x in user_names.split(",")))
+        group = [name for name in group if len(name) != 0]
+        missing_users = await database.find_missing_users(group)
+        if len(group) == 0:
+            logger.warning("Empty group requested, cancelling")
+            await ctx.respond(
+                content="Give me at least one user name.",
+                ephemeral=True,
+                delete_after=90,
+            )
+        elif len(missing_users) != 0:
+            logger.warning("Users %s not found, cancelling", missing_users)
+            await ctx.respond(
+                content=f"I don't have users named `{'`, `'.join(missing_users)}` in my database.",  # noqa: E501
+                ephemeral=True,
+                delete_after=90,
+            )
+        else:
+            need_masks = await database.get_party_need_masks(group)
+            plan = plan_farm(need_masks, runs_per_week=runs_per_week, weeks=weeks)
+            total_gain = sum(run.expected_gain for run in plan)
+            embed = discord.Embed(
+                title=f"{weeks} week farm plan",
+                description=f"Expected mounts gained: {total_gain:.1f}",
+                color=discord.Colour.blue(),
+            )
+            for week in range(1, weeks + 1):
+                week_runs = [
+                    f"{run.item_name} ({run.item_expac}): "
+                    f"{run.needed_by.bit_count()} need, +{run.expected_gain:.2f}"
+                    for run in plan
+                    if run.week == week
+                ]
+                if len(week_runs) != 0:
+                    embed.add_field(
+                        name=f"Week {week}",
+                        value=f" - {'\n - '.join(week_runs)}",
+                        inline=False,
+                    )
+            await ctx.respond(embed=embed, ephemeral=True)
+        logger.info("/farmplan OK")
+
+    @discord.slash_command(
+        name="whoneeds",
+        description="List the users who still need a mount",
+    )
+    @discord.option(
+        "name",
+        type=str,
+        autocomplete=discord.utils.basic_autocomplete(get_mount_names),
+        description="Mount name",
+    )
+    @discord.option(
+        "expansion",
+        type=str,
+        autocomplete=discord.utils.basic_autocomplete(get_expansion_names),
+        description="Mount expansion, if the name is used in several",
+        required=False,
+        default=None,
+    )
+    async def whoneeds(
+        self: Self,
+        ctx: discord.ApplicationContext,
+        name: str,
+        expansion: None | str,
+    ) -> None:
+        """Display the users who still need a mount.
+
+        Parameters
+        ----------
+        ctx : discord.ApplicationContext
+            Discord context. Used for interacting with the command
+            invoker.
+        name : str
+            Name of the mount to check.
+        expansion : None | str
+            The FFXIV expansion the mount is from. If none, mounts with
+            this name from every expansion are checked.
+
+        """
+        logger.info("/whoneeds invoked by %s", ctx.author.name)
+        database = get_storage()
+        if len(await database.find_items(name, expansion)) == 0:
+            logger.warning("Mount %s not found in database, cancelling", name)
+            await ctx.respond(
+                content=f"I don't have a mount named `{name}` in my database.",
+                ephemeral=True,
+                delete_after=90,
+            )
+        else:
+            needers = await database.list_item_needers(name, expansion)
+            embed = discord.Embed(
+                title=f"Users who need `{name}`",
+                color=discord.Colour.blue(),
+            )
+            if len(needers) == 0:
+                embed.description = "Nobody needs this mount!"
+            for item_expac, user_names in needers.items():
+                embed.add_field(
+                    name=f"{item_expac.capitalize()} ({len(user_names)})",
+                    value=format_name_list(user_names),
+                    inline=True,
+                )
+            await ctx.respond(embed=embed, ephemeral=True)
+        logger.info("/whoneeds OK")
+
+    @discord.slash_command(
+        name="progress",
+        description="Chart mounts gained per week",
+    )
+    @discord.option(
+        "user_name",
+        type=str,
+        description="User to chart, or everyone if empty",
+        required=False,
+        default=None,
+    )
+    @discord.option(
+        "expansion",
+        type=str,
+        autocomplete=discord.utils.basic_autocomplete(get_expansion_names),
+        description="Expansion to chart, or every expansion if empty",
+        required=False,
+        default=None,
+    )
+    @discord.option(
+        "weeks",
+        type=int,
+        min_value=1,
+        max_value=MAX_PROGRESS_WEEKS,
+        description="Number of weeks to chart",
+        required=False,
+        default=8,
+    )
+    async def progress(
+        self: Self,
+        ctx: discord.ApplicationContext,
+        user_name: None | str,
+        expansion: None | str,
+        weeks: int,
+    ) -> None:
+        """Display a chart of net mounts gained per week.
+
+        Parameters
+        ----------
+        ctx : discord.ApplicationContext
+            Discord context. Used for interacting with the command
+            invoker.
+        user_name : None | str
+            Name of the user to chart. If none, every user is summed.
+        expansion : None | str
+            The FFXIV expansion to chart. If none, every expansion is
+            summed.
+        weeks : int
+            Number of weeks to chart, ending with the current week.
+
+        """
+        logger.info("/progress invoked by %s", ctx.author.name)
+        database = get_storage()
+        progress = await database.summarize_weekly_progress(
+            user_name=user_name,
+            expansion=expansion,
+            weeks=weeks,
+        )
+        title = f"Mounts gained by `{user_name or 'everyone'}`"
+        if expansion is not None:
+            title += f" in {expansion.capitalize()}"
+        embed = discord.Embed(title=title, color=discord.Colour.blue())
+        if progress.is_empty():
+            embed.description = f"No mounts gained in the last {weeks} weeks."
+        else:
+            most_gained = max(progress.select("gained").to_series().max(), 1)
+            chart = [
+                f"`{week}` {'█' * round(10 * max(gained, 0) / most_gained)} {gained}"
+                for week, gained in progress.iter_rows()
+            ]
+            embed.description = "\n".join(chart)
+        embed.set_footer(text="Updated hourly")
+        await ctx.respond(embed=embed, ephemeral=True)
+        logger.info("/progress OK")
+
+    @discord.slash_command(
+        name="leaderboard",
+        description="Rank users by share of mounts owned",
+    )
+    @discord.option(
+        "expansion",
+        type=str,
+        autocomplete=discord.utils.basic_autocomplete(get_expansion_names),
+        description="Expansion to rank, or every expansion if empty",
+        required=False,
+        default=None,
+    )
+    async def leaderboard(
+        self: Self,
+        ctx: discord.ApplicationContext,
+        expansion: None | str,
+    ) -> None:
+        """Display the ten users with the highest share of mounts owned.
+
+        Parameters
+        ----------
+        ctx : discord.ApplicationContext
+            Discord context. Used for interacting with the command
+            invoker.
+        expansion : None | str
+            The FFXIV expansion to rank users by. If none, users are
+            ranked over every expansion.
+
+        """
+        logger.info("/leaderboard invoked by %s", ctx.author.name)
+        database = get_storage()
+        leaders = await database.list_leaderboard(expansion=expansion, limit=10)
+        scope = "all" if expansion is None else expansion.capitalize()
+        embed = discord.Embed(
+            title=f"Completion leaderboard: {scope} mounts",
+            color=discord.Colour.blue(),
+        )
+        if leaders.is_empty():
+            embed.description = "Nobody is tracking these mounts yet."
+        else:
+            embed.description = "\n".join(
+                f"{rank}. `{user_name}` {owned}/{total} ({owned / max(total, 1):.0%})"
+                for rank, (user_name, owned, total) in enumerate(
+                    leaders.iter_rows(),
+                    start=1,
+                )
+            )
+        await ctx.respond(embed=embed, ephemeral=True)
+        logger.info("/leaderboard OK")
+
 
 def setup(bot: discord.Bot) -> None:
     """Allow the bot to use this cog."""
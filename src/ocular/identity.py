@@ -0,0 +1,117 @@
+"""LRU cache of user identities, with negative entries for unknown users."""
+
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Literal, Self
+
+IDENTITY_CACHE_SIZE = 4096
+IDENTITY_CACHE_TTL = 0
+
+type IdentityKey = tuple[Literal["user_id", "user_name", "user_discord_id"], str | int]
+
+
+@dataclass(frozen=True)
+class Identity:
+    """A row of the users table.
+
+    Attributes
+    ----------
+    user_id : str
+        Database ID of the user.
+    user_name : str
+        Name of the user.
+    user_discord_id : int
+        Discord ID of the user.
+
+    """
+
+    user_id: str
+    user_name: str
+    user_discord_id: int
+
+    def cache_keys(self: Self) -> list[IdentityKey]:
+        """Get the cache keys the user can be looked up by."""
+        return [
+            ("user_id", self.user_id),
+            ("user_name", self.user_name),
+            ("user_discord_id", self.user_discord_id),
+        ]
+
+
+class IdentityCache:
+    """Users keyed by ID, name and discord ID, evicted least recently used.
+
+    A key can map to none, recording that no user has that value, so
+    repeated lookups of unregistered users are answered from memory too.
+    Writers to the users table must keep the cache coherent through
+    `add`, `remove` and `rename`, or `clear` it after bulk changes. A
+    nonzero `ttl` also expires entries, bounding how long changes made
+    outside the bot go unseen.
+    """
+
+    def __init__(
+        self: Self,
+        max_size: int = IDENTITY_CACHE_SIZE,
+        ttl: float = IDENTITY_CACHE_TTL,
+    ) -> None:
+        """Create an empty cache.
+
+        Parameters
+        ----------
+        max_size : int
+            Maximum number of keys held.
+        ttl : float
+            Seconds entries are kept for, 0 keeping them until evicted.
+
+        """
+        self.max_size = max_size
+        self.ttl = ttl
+        self.entries: OrderedDict[IdentityKey, tuple[None | Identity, float]] = (
+            OrderedDict()
+        )
+
+    def lookup(self: Self, key: IdentityKey) -> tuple[bool, None | Identity]:
+        """Get whether a key is cached, and the user it maps to."""
+        if key not in self.entries:
+            return False, None
+        identity, stored_at = self.entries[key]
+        if self.ttl > 0 and time.monotonic() - stored_at > self.ttl:
+            del self.entries[key]
+            return False, None
+        self.entries.move_to_end(key)
+        return True, identity
+
+    def store(self: Self, key: IdentityKey, identity: None | Identity) -> None:
+        """Cache the user found for a key, or none if there is none."""
+        if identity is not None:
+            self.add(identity)
+        self.put(key, identity)
+
+    def put(self: Self, key: IdentityKey, identity: None | Identity) -> None:
+        """Set one key, evicting the least recently used beyond the size."""
+        self.entries[key] = (identity, time.monotonic())
+        self.entries.move_to_end(key)
+        while len(self.entries) > self.max_size:
+            self.entries.popitem(last=False)
+
+    def add(self: Self, identity: Identity) -> None:
+        """Cache a user under all its keys."""
+        for key in identity.cache_keys():
+            self.put(key, identity)
+
+    def remove(self: Self, identity: Identity) -> None:
+        """Record that a deleted user's keys no longer match any user."""
+        for key in identity.cache_keys():
+            self.put(key, None)
+
+    def rename(self: Self, identity: Identity, new_name: str) -> Identity:
+        """Cache a renamed user and return its new identity."""
+        self.put(("user_name", identity.user_name), None)
+        renamed = Identity(identity.user_id, new_name, identity.user_discord_id)
+        self.add(renamed)
+        return renamed
+
+    def clear(self: Self) -> None:
+        """Drop every entry."""
+        self.entries.clear()
@@ -0,0 +1,162 @@
+"""Streaming readers for bulk imports of users' mount collections."""
+
+import csv
+import json
+from collections import Counter
+from collections.abc import Iterator
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Literal
+
+from src.ocular.lazy import lazy_import
+
+pl = lazy_import("polars")
+
+READ_CHUNK_SIZE = 64 * 1024
+PARQUET_BATCH_SIZE = 5000
+
+type CollectionRow = tuple[int, str, list[str]]
+
+
+@dataclass
+class ImportReport:
+    """Summary of a bulk import.
+
+    Attributes
+    ----------
+    users_added : int
+        Number of new users created.
+    users_matched : int
+        Number of rows matched to users already in the database.
+    mounts_added : int
+        Number of mounts newly marked as owned.
+    unknown_mounts : Counter
+        Mount names not found in the catalog, with how often they were
+        seen.
+    ambiguous_mounts : Counter
+        Mount names matching mounts of several expansions, not imported
+        unless qualified with their expansion, with how often they were
+        seen.
+    skipped_names : list[str]
+        Names of new users not imported because another user already
+        has the name.
+
+    """
+
+    users_added: int = 0
+    users_matched: int = 0
+    mounts_added: int = 0
+    unknown_mounts: Counter = field(default_factory=Counter)
+    ambiguous_mounts: Counter = field(default_factory=Counter)
+    skipped_names: list[str] = field(default_factory=list)
+
+
+def mount_key(name: str, expansion: None | str = None) -> str:
+    """Normalize a mount name to match it to the catalog.
+
+    Names are matched ignoring case and surrounding spaces. A name may
+    be qualified with its expansion as `expansion: name`, as are the
+    keys of names given with an expansion.
+    """
+    if expansion is not None:
+        name = f"{expansion}:{name}"
+    return ":".join(part.strip() for part in name.lower().split(":", 1))
+
+
+def iter_csv_rows(path: Path) -> Iterator[CollectionRow]:
+    """Stream collection rows from a CSV file.
+
+    Each line holds a discord ID, a user name, then any number of mount
+    names. A first line that does not start with a discord ID is taken
+    as a header and skipped.
+    """
+    with Path(path).open(newline="", encoding="utf-8") as file:
+        for i, line in enumerate(csv.reader(file)):
+            if len(line) < 2 or (i == 0 and not line[0].strip().isdigit()):  # noqa: PLR2004
+                continue
+            mounts = [name for name in line[2:] if len(name.strip()) != 0]
+            yield int(line[0]), line[1].strip(), mounts
+
+
+def iter_json_objects(path: Path) -> Iterator[dict]:
+    """Stream objects from a JSON array or a JSON Lines file.
+
+    The file is decoded incrementally, so only one object and one read
+    chunk are held in memory at a time.
+    """
+    decoder = json.JSONDecoder()
+    buffer = ""
+    with Path(path).open(encoding="utf-8") as file:
+        while True:
+            chunk = file.read(READ_CHUNK_SIZE)
+            buffer = (buffer + chunk).lstrip(" \t\r\n[,")
+            while len(buffer) != 0 and buffer[0] != "]":
+                try:
+                    obj, end = decoder.raw_decode(buffer)
+                except json.JSONDecodeError:
+                    # Object continues in the next chunk
+                    break
+                yield obj
+                buffer = buffer[end:].lstrip(" \t\r\n,")
+            if len(chunk) == 0:
+                if len(buffer.strip(" \t\r\n]")) != 0:
+                    msg = f"Could not decode JSON object at: {buffer[:40]}"
+                    raise ValueError(msg)
+                return
+
+
+def iter_json_rows(path: Path) -> Iterator[CollectionRow]:
+    """Stream collection rows from a JSON array or JSON Lines file.
+
+    Each object must have `discord_id`, `name` and `mounts` keys, the
+    latter holding a list of mount names.
+    """
+    for obj in iter_json_objects(path):
+        yield int(obj["discord_id"]), str(obj["name"]).strip(), list(obj["mounts"])
+
+
+def iter_parquet_rows(path: Path) -> Iterator[CollectionRow]:
+    """Stream collection rows from a Parquet file in batches.
+
+    The file must have `discord_id`, `name` and `mounts` columns, the
+    latter holding a list of mount names.
+    """
+    scan = pl.scan_parquet(path).select(["discord_id", "name", "mounts"])
+    offset = 0
+    while True:
+        batch = scan.slice(offset, PARQUET_BATCH_SIZE).collect()
+        if batch.is_empty():
+            return
+        for discord_id, name, mounts in batch.iter_rows():
+            yield int(discord_id), name.strip(), list(mounts or [])
+        offset += PARQUET_BATCH_SIZE
+
+
+def iter_collection_rows(
+    path: Path,
+    file_format: None | Literal["csv", "json", "parquet"] = None,
+) -> Iterator[CollectionRow]:
+    """Stream (discord ID, user name, mount names) rows from a file.
+
+    Parameters
+    ----------
+    path : Path
+        File to read.
+    file_format : None | Literal["csv", "json", "parquet"]
+        Format of the file. If none, it is taken from the file suffix,
+        with .jsonl and .ndjson read as JSON.
+
+    """
+    path = Path(path)
+    if file_format is None:
+        suffix = path.suffix.lower().lstrip(".")
+        file_format = "json" if suffix in {"jsonl", "ndjson"} else suffix
+    readers = {
+        "csv": iter_csv_rows,
+        "json": iter_json_rows,
+        "parquet": iter_parquet_rows,
+    }
+    if file_format not in readers:
+        msg = "file_format must be one of ['csv', 'json', 'parquet']"
+        raise ValueError(msg)
+    return readers[file_format](path)
@@ -0,0 +1,25 @@
+"""Deferred imports for heavy optional-at-startup modules."""
+
+import importlib.util
+import sys
+from types import ModuleType
+
+
+def lazy_import(name: str) -> ModuleType:
+    """Import a module, deferring its execution until first attribute access.
+
+    Parameters
+    ----------
+    name : str
+        Absolute name of the module to import.
+
+    """
+    if name in sys.modules:
+        return sys.modules[name]
+    spec = importlib.util.find_spec(name)
+    loader = importlib.util.LazyLoader(spec.loader)
+    spec.loader = loader
+    module = importlib.util.module_from_spec(spec)
+    sys.modules[name] = module
+    loader.exec_module(module)
+    return module
@@ -0,0 +1,146 @@
+"""Bot lifecycle, draining in-flight work before shutting down."""
+
+import asyncio
+import logging
+from typing import Self
+
+import aiosqlite
+import discord
+
+from src.ocular.cards import CardRenderer
+from src.ocular.config import get_config
+from src.ocular.deadline import run_with_deadline
+from src.ocular.ratelimit import REJECTION_MESSAGES, AdmissionControl
+from src.ocular.storage import get_storage
+
+logger = logging.getLogger("discord")
+
+DRAINING_MESSAGE = "Ocular is restarting, please try again in a minute."
+
+
+class OcularBot(discord.Bot):
+    """Bot admitting and timing commands, and draining them on shutdown.
+
+    Commands are first checked against per user and per guild rate
+    limits and the cap on concurrent heavy commands, then run within
+    their time budget.
+    Once a shutdown is requested, new application commands are turned
+    away and commands already running are given until the configured
+    deadline to finish. Cogs with a `drain` coroutine are then drained,
+    the card render workers are stopped, the read replica is closed and
+    the WAL is checkpointed into the database file, so the next startup
+    finds no journal to recover.
+    """
+
+    def __init__(self: Self, *args: object, **kwargs: object) -> None:
+        """Create the bot, accepting commands.
+
+        Unless other intents are given, the default intents are used
+        plus the privileged members intent, so that the members of roles
+        and voice channels are cached for `/adminpartymount`. The intent
+        must also be enabled for the bot under Privileged Gateway Intents
+        in the Discord developer portal, or logging in fails.
+        """
+        if "intents" not in kwargs:
+            intents = discord.Intents.default()
+            intents.members = True
+            kwargs["intents"] = intents
+        super().__init__(*args, **kwargs)
+        self.accepting = True
+        self.in_flight = 0
+        self.idle = asyncio.Event()
+        self.idle.set()
+        self.stop_requested = asyncio.Event()
+        self.admission = AdmissionControl()
+        self.cards = CardRenderer()
+
+    async def invoke_application_command(
+        self: Self,
+        ctx: discord.ApplicationContext,
+    ) -> None:
+        """Run a command, or turn it away if overloaded or shutting down."""
+        if not self.accepting:
+            await ctx.respond(DRAINING_MESSAGE, ephemeral=True)
+            return
+        command = ctx.command.qualified_name
+        rejection = self.admission.admit(command, ctx.author.id, ctx.guild_id)
+        if rejection is not None:
+            logger.info("/%s by %s rejected: %s", command, ctx.author.name, rejection)
+            await ctx.respond(REJECTION_MESSAGES[rejection], ephemeral=True)
+            return
+        self.in_flight += 1
+        self.idle.clear()
+        try:
+            await run_with_deadline(ctx, super().invoke_application_command)
+        finally:
+            self.admission.release(command)
+            self.in_flight -= 1
+            if self.in_flight == 0:
+                self.idle.set()
+
+    async def on_application_command_auto_complete(
+        self: Self,
+        interaction: discord.Interaction,
+        command: discord.ApplicationCommand,
+    ) -> None:
+        """Answer an autocomplete request, or send no choices if rate limited."""
+        user_id = interaction.user.id
+        if not self.admission.admit_autocomplete(command.qualified_name, user_id):
+            await interaction.response.send_autocomplete_result(choices=[])
+            return
+        await super().on_application_command_auto_complete(interaction, command)
+
+    def request_shutdown(self: Self) -> None:
+        """Ask the bot to shut down, for use as a signal handler."""
+        logger.info("Shutdown requested")
+        self.stop_requested.set()
+
+    async def drain(self: Self, grace: float) -> bool:
+        """Stop accepting commands and wait for running ones to finish.
+
+        Parameters
+        ----------
+        grace : float
+            Seconds to wait for running commands and cogs.
+
+        Returns
+        -------
+        drained : bool
+            Whether everything finished before the deadline.
+
+        """
+        self.accepting = False
+        cogs = [cog for cog in self.cogs.values() if hasattr(cog, "drain")]
+        try:
+            async with asyncio.timeout(grace):
+                await self.idle.wait()
+                await asyncio.gather(*(cog.drain() for cog in cogs))
+        except TimeoutError:
+            logger.warning(
+                "Shutting down with %s commands still running",
+                self.in_flight,
+            )
+            return False
+        return True
+
+    async def shutdown(self: Self) -> None:
+        """Drain in-flight work, flush the database and log out."""
+        await self.drain(get_config().shutdown_timeout)
+        self.cards.close()
+        database = get_storage()
+        try:
+            await database.close()
+        except aiosqlite.Error:
+            logger.exception("Could not close the database on shutdown")
+        await self.close()
+        logger.info("Ocular shut down")
+
+    async def serve(self: Self, token: str) -> None:
+        """Run the bot until a shutdown is requested or it disconnects."""
+        session = asyncio.create_task(self.start(token))
+        stop = asyncio.create_task(self.stop_requested.wait())
+        await asyncio.wait({session, stop}, return_when=asyncio.FIRST_COMPLETED)
+        stop.cancel()
+        await self.shutdown()
+        # Raises any login error, otherwise returns once the gateway closes
+        await session
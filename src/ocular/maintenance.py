@@ -0,0 +1,78 @@
+"""Cog storing periodic database maintenance tasks."""
+
+import asyncio
+import logging
+from typing import Self
+
+import aiosqlite
+import discord
+from discord.ext import commands, tasks
+
+from src.ocular.backup import backup_database
+from src.ocular.config import get_config
+from src.ocular.storage import get_storage
+
+logger = logging.getLogger("discord")
+
+
+class Maintenance(commands.Cog):
+    """Class to hold periodic maintenance tasks."""
+
+    def __init__(self: Self, bot: discord.Bot) -> None:
+        """Store and start periodic maintenance tasks."""
+        self.bot = bot
+        # Held while a task runs, so shutdown can wait for it to finish
+        self.busy = asyncio.Lock()
+        self.compact_events.start()
+        # Backups copy the SQLite database file, other backends have none
+        if get_config().database.backend == "sqlite":
+            self.backup.start()
+
+    def cog_unload(self: Self) -> None:
+        """Stop periodic maintenance tasks."""
+        self.compact_events.cancel()
+        self.backup.cancel()
+
+    async def drain(self: Self) -> None:
+        """Wait for a running maintenance task, then stop all of them."""
+        async with self.busy:
+            self.cog_unload()
+
+    @tasks.loop(hours=1)
+    async def compact_events(self: Self) -> None:
+        """Roll status events up into daily aggregates."""
+        database = get_storage()
+        async with self.busy:
+            try:
+                n_events = await database.compact_status_events()
+            except aiosqlite.Error:
+                logger.exception("Status event compaction failed, retrying next run")
+            else:
+                logger.info("Compacted %s status events", n_events)
+
+    @compact_events.before_loop
+    async def before_compact_events(self: Self) -> None:
+        """Wait for the database to be initialized."""
+        await self.bot.wait_until_ready()
+
+    @tasks.loop(hours=24)
+    async def backup(self: Self) -> None:
+        """Back up the database and rotate old backups."""
+        database = get_storage()
+        async with self.busy:
+            try:
+                backup_path = await backup_database(database.db_path)
+            except (aiosqlite.Error, OSError):
+                logger.exception("Database backup failed, retrying next run")
+            else:
+                logger.info("Backed up database to %s", backup_path)
+
+    @backup.before_loop
+    async def before_backup(self: Self) -> None:
+        """Wait for the database to be initialized."""
+        await self.bot.wait_until_ready()
+
+
+def setup(bot: discord.Bot) -> None:
+    """Allow the bot to use this cog."""
+    bot.add_cog(Maintenance(bot))
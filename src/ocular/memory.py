@@ -0,0 +1,596 @@
+"""In-memory storage backend built on dicts and bitsets."""
+
+import json
+from collections.abc import Iterable
+from dataclasses import dataclass
+from datetime import UTC, date, datetime, timedelta
+from pathlib import Path
+from typing import Literal, Self
+
+import uuid6
+
+from src.ocular.config import get_config
+from src.ocular.identity import Identity
+from src.ocular.lazy import lazy_import
+from src.ocular.storage import PAGE_SIZE, Registration, Storage
+
+pl = lazy_import("polars")
+
+
+@dataclass
+class MemoryUser:
+    """A user and the mounts they own.
+
+    Attributes
+    ----------
+    user_id : str
+        Database ID of the user.
+    user_name : str
+        Name of the user.
+    user_discord_id : int
+        Discord ID of the user.
+    owned : int
+        Bitset of owned mounts, bit i being set when the user owns the
+        mount in slot i.
+
+    """
+
+    user_id: str
+    user_name: str
+    user_discord_id: int
+    owned: int = 0
+
+
+@dataclass
+class MemoryMount:
+    """A mount and the bitset slot holding its ownership.
+
+    Attributes
+    ----------
+    item_id : str
+        Database ID of the mount.
+    item_name : str
+        Name of the mount.
+    item_expac : str
+        Expansion of the mount.
+    slot : int
+        Bit of users' ownership bitsets for this mount.
+
+    """
+
+    item_id: str
+    item_name: str
+    item_expac: str
+    slot: int
+
+
+@dataclass(frozen=True)
+class MemoryEvent:
+    """A change of a user's status for a mount.
+
+    Attributes
+    ----------
+    day : date
+        Day of the change, in UTC.
+    user_id : str
+        Database ID of the user.
+    item_expac : str
+        Expansion of the mount at the time of the change.
+    has_item : int
+        1 if the mount was gained, 0 if it was lost.
+
+    """
+
+    day: date
+    user_id: str
+    item_expac: str
+    has_item: int
+
+
+class MemoryStorage(Storage):
+    """Storage kept in process memory, for tests and tiny deployments.
+
+    Each user holds one integer bitset of the mounts they own, so a
+    user's status for every mount is one bit, and counting needers of a
+    mount is one bit test per user. Users and mounts are indexed by
+    every value they are looked up by. Status changes are kept as
+    events for weekly progress. Nothing is persisted.
+    """
+
+    def __init__(self: Self) -> None:
+        """Create empty storage."""
+        self.db_path = ":memory:"
+        self.catalog_path = get_config().database.catalog_path
+        self.users: dict[str, MemoryUser] = {}
+        self.users_by_name: dict[str, MemoryUser] = {}
+        self.users_by_discord_id: dict[int, MemoryUser] = {}
+        self.mounts: dict[str, MemoryMount] = {}
+        # Mount IDs keyed by trimmed, lowercased mount name
+        self.mount_names: dict[str, list[str]] = {}
+        self.events: list[MemoryEvent] = []
+        self.next_slot = 0
+
+    def get_user(
+        self: Self,
+        check_col: Literal["user_name", "user_id", "user_discord_id"],
+        check_val: str | int,
+    ) -> None | MemoryUser:
+        """Get the user with a value in a column, or none."""
+        index = {
+            "user_id": self.users,
+            "user_name": self.users_by_name,
+            "user_discord_id": self.users_by_discord_id,
+        }
+        if check_col not in index:
+            msg = "check_col must be one of ['user_name', 'user_id', 'user_discord_id']"
+            raise ValueError(msg)
+        return index[check_col].get(check_val)
+
+    def get_discord_user(self: Self, discord_id: int) -> MemoryUser:
+        """Get the user with a discord ID, raising if there is none."""
+        user = self.users_by_discord_id.get(discord_id)
+        if user is None:
+            msg = f"No user with discord ID {discord_id}"
+            raise ValueError(msg)
+        return user
+
+    def add_mount(self: Self, item_id: str, item_name: str, item_expac: str) -> None:
+        """Add a mount in a new bitset slot."""
+        mount = MemoryMount(item_id, item_name, item_expac, self.next_slot)
+        self.mounts[item_id] = mount
+        self.mount_names.setdefault(item_name.strip().lower(), []).append(item_id)
+        self.next_slot += 1
+
+    def set_owned(
+        self: Self,
+        user: MemoryUser,
+        item_ids: Iterable[str],
+        has_item: int,
+    ) -> int:
+        """Set the status of mounts for a user, logging an event per change.
+
+        Returns the number of mounts whose status changed.
+        """
+        day = datetime.now(UTC).date()
+        changed = 0
+        for item_id in item_ids:
+            mount = self.mounts[item_id]
+            if (user.owned >> mount.slot) & 1 == has_item:
+                continue
+            user.owned ^= 1 << mount.slot
+            self.events.append(
+                MemoryEvent(day, user.user_id, mount.item_expac, has_item),
+            )
+            changed += 1
+        return changed
+
+    def check_name_free(
+        self: Self,
+        item_name: str,
+        item_expac: str,
+        item_id: None | str = None,
+    ) -> None:
+        """Raise if a mount of an expansion other than `item_id` has a name."""
+        for other_id in self.mount_names.get(item_name.strip().lower(), []):
+            if other_id != item_id and self.mounts[other_id].item_expac == item_expac:
+                msg = f"Mount name {item_name} is already taken"
+                raise ValueError(msg)
+
+    def remove_mount_name(self: Self, item_id: str) -> None:
+        """Drop a mount from the name index."""
+        norm_name = self.mounts[item_id].item_name.strip().lower()
+        self.mount_names[norm_name].remove(item_id)
+        if len(self.mount_names[norm_name]) == 0:
+            del self.mount_names[norm_name]
+
+    async def init_tables(self: Self) -> None:
+        """Load the mount catalog if no mounts are loaded yet."""
+        if len(self.mounts) != 0:
+            return
+        catalog = json.loads(Path(self.catalog_path).read_bytes())
+        for duty_rows in catalog.values():
+            for row in duty_rows:
+                self.add_mount(row["item_id"], row["item_name"], row["item_expac"])
+
+    async def register_user(self: Self, name: str, discord_id: int) -> Registration:
+        """Add a user unless their name or discord ID is taken."""
+        by_name = self.get_user("user_name", name)
+        by_id = self.get_user("user_discord_id", discord_id)
+        if by_name is not None and by_name is by_id:
+            return "registered"
+        if by_name is not None:
+            return "name_taken"
+        if by_id is not None:
+            return "id_taken"
+        await self.append_new_user(name, discord_id)
+        return "added"
+
+    async def append_new_user(self: Self, name: str, discord_id: int) -> None:
+        """Add a user."""
+        user_id = uuid6.uuid7().hex
+        user = MemoryUser(user_id, name, discord_id)
+        self.users[user_id] = user
+        self.users_by_name[name] = user
+        self.users_by_discord_id[discord_id] = user
+
+    async def append_new_status(self: Self, discord_id: int) -> None:
+        """Reset the statuses of a new user to not owned."""
+        self.get_discord_user(discord_id).owned = 0
+
+    async def check_user_exists(
+        self: Self,
+        check_col: Literal["user_name", "user_id", "user_discord_id"],
+        check_val: str | int,
+    ) -> bool:
+        """Check if a user already exists."""
+        return self.get_user(check_col, check_val) is not None
+
+    async def get_user_from_discord_id(self: Self, discord_id: int) -> str:
+        """Get the ID of the user with a discord ID."""
+        return self.get_discord_user(discord_id).user_id
+
+    async def get_user_discord_id(self: Self, user_name: str) -> list[int]:
+        """Get the discord ID of a user as a list, empty if there is none."""
+        user = self.get_user("user_name", user_name)
+        return [] if user is None else [user.user_discord_id]
+
+    async def resolve_users(
+        self: Self,
+        user_names: Iterable[str] = (),
+        discord_ids: Iterable[int] = (),
+    ) -> list[Identity]:
+        """Find the users matching any of several names or discord IDs."""
+        found = {}
+        for key, index in (
+            (user_names, self.users_by_name),
+            (discord_ids, self.users_by_discord_id),
+        ):
+            for value in key:
+                if (user := index.get(value)) is not None:
+                    found[user.user_id] = user
+        return [
+            Identity(user.user_id, user.user_name, user.user_discord_id)
+            for user in found.values()
+        ]
+
+    async def find_items(
+        self: Self,
+        item_name: str,
+        expansion: None | str = None,
+    ) -> tuple[dict]:
+        """Find mounts by name, within `expansion` if given."""
+        mounts = [
+            self.mounts[item_id]
+            for item_id in self.mount_names.get(item_name.strip().lower(), [])
+        ]
+        return tuple(
+            {
+                "item_id": mount.item_id,
+                "item_name": mount.item_name,
+                "item_expac": mount.item_expac,
+            }
+            for mount in sorted(mounts, key=lambda mount: mount.item_expac)
+            if expansion in {None, mount.item_expac}
+        )
+
+    async def get_item_id(
+        self: Self,
+        item_name: str,
+        expansion: None | str = None,
+    ) -> tuple[str, ...]:
+        """Get the ID of a mount as a tuple, empty if there is none."""
+        items = await self.find_items(item_name, expansion)
+        item_ids = tuple(item["item_id"] for item in items)
+        if len(item_ids) > 1:
+            msg = f"Mount name {item_name} is not unique"
+            raise ValueError(msg)
+        return item_ids
+
+    async def list_item_names(self: Self, expansion: None | str = None) -> list[str]:
+        """List mount names, grouped by expansion in catalog order."""
+        if expansion is not None:
+            return [
+                mount.item_name
+                for mount in self.mounts.values()
+                if mount.item_expac == expansion
+            ]
+        return [
+            name
+            for expansion in await self.list_expansions()
+            for name in await self.list_item_names(expansion)
+        ]
+
+    async def list_user_names_page(
+        self: Self,
+        after: str = "",
+        limit: int = PAGE_SIZE,
+    ) -> list[str]:
+        """Get one page of user names, sorted by name."""
+        return sorted(name for name in self.users_by_name if name > after)[:limit]
+
+    async def list_item_names_page(
+        self: Self,
+        expansion: str,
+        after: str = "",
+        limit: int = PAGE_SIZE,
+    ) -> list[str]:
+        """Get one page of mount names from an expansion, sorted by name."""
+        names = sorted(
+            mount.item_name
+            for mount in self.mounts.values()
+            if mount.item_expac == expansion and mount.item_name > after
+        )
+        return names[:limit]
+
+    async def list_expansions(self: Self) -> list[str]:
+        """List the expansions that have mounts."""
+        return list(dict.fromkeys(mount.item_expac for mount in self.mounts.values()))
+
+    async def list_user_items(
+        self: Self,
+        user: int,
+        check_type: Literal["has", "needs"],
+        expansion: str,
+    ) -> list[str]:
+        """List the mounts of an expansion a user has or needs."""
+        owned = self.get_discord_user(user).owned
+        check_val = 1 if check_type == "has" else 0
+        item_names = [
+            mount.item_name
+            for mount in self.mounts.values()
+            if mount.item_expac == expansion and (owned >> mount.slot) & 1 == check_val
+        ]
+        if len(item_names) == 0:
+            return ["none"]
+        return item_names
+
+    async def update_user_items(
+        self: Self,
+        action: Literal["add", "remove"],
+        user: int,
+        item_names: str,
+        actor: None | int = None,  # noqa: ARG002
+        expansion: None | str = None,
+    ) -> bool:
+        """Mark a mount as owned or not owned by a user."""
+        if action not in {"add", "remove"}:
+            msg = "action must be one of ['add', 'remove']"
+            raise ValueError(msg)
+        user_row = self.get_discord_user(user)
+        item_ids = await self.get_item_id(item_names, expansion)
+        self.set_owned(user_row, item_ids, 1 if action == "add" else 0)
+        return len(item_ids) != 0
+
+    async def update_user_expansion(
+        self: Self,
+        action: Literal["add", "remove"],
+        user: int,
+        expansion: str,
+        actor: None | int = None,  # noqa: ARG002
+    ) -> int:
+        """Mark every mount of an expansion as owned or not owned by a user."""
+        if action not in {"add", "remove"}:
+            msg = "action must be one of ['add', 'remove']"
+            raise ValueError(msg)
+        user_row = self.get_discord_user(user)
+        item_ids = [
+            mount.item_id
+            for mount in self.mounts.values()
+            if mount.item_expac == expansion
+        ]
+        return self.set_owned(user_row, item_ids, 1 if action == "add" else 0)
+
+    async def update_users_item(
+        self: Self,
+        action: Literal["add", "remove"],
+        users: Iterable[Identity],
+        item_id: str,
+        actor: int,  # noqa: ARG002
+    ) -> int:
+        """Mark a mount as owned or not owned by several users at once."""
+        if action not in {"add", "remove"}:
+            msg = "action must be one of ['add', 'remove']"
+            raise ValueError(msg)
+        has_item = 1 if action == "add" else 0
+        return sum(
+            self.set_owned(self.users[user.user_id], [item_id], has_item)
+            for user in users
+            if user.user_id in self.users
+        )
+
+    async def add_new_item(self: Self, expansion: str, name: str) -> None:
+        """Add a mount, not owned by any user."""
+        self.check_name_free(name, expansion)
+        self.add_mount(uuid6.uuid7().hex, name, expansion)
+
+    async def edit_item_name(
+        self: Self,
+        old_name: str,
+        new_name: str,
+        expansion: None | str = None,
+    ) -> bool:
+        """Rename a mount."""
+        item_ids = await self.get_item_id(old_name, expansion)
+        for item_id in item_ids:
+            self.check_name_free(new_name, self.mounts[item_id].item_expac, item_id)
+            self.remove_mount_name(item_id)
+            self.mounts[item_id].item_name = new_name
+            self.mount_names.setdefault(new_name.strip().lower(), []).append(item_id)
+        return len(item_ids) != 0
+
+    async def delete_item(self: Self, name: str, expansion: None | str = None) -> bool:
+        """Delete a mount and clear its bit from every user."""
+        item_ids = await self.get_item_id(name, expansion)
+        for item_id in item_ids:
+            self.remove_mount_name(item_id)
+            bit = 1 << self.mounts.pop(item_id).slot
+            for user in self.users.values():
+                user.owned &= ~bit
+        return len(item_ids) != 0
+
+    async def delete_user(self: Self, name: str) -> None:
+        """Delete a user."""
+        user = self.get_user("user_name", name)
+        if user is not None:
+            del self.users[user.user_id]
+            del self.users_by_name[user.user_name]
+            del self.users_by_discord_id[user.user_discord_id]
+
+    async def rename_user(self: Self, from_name: str, to_name: str) -> None:
+        """Change the name of a user."""
+        user = self.users_by_name.pop(from_name, None)
+        if user is not None:
+            user.user_name = to_name
+            self.users_by_name[to_name] = user
+
+    async def find_missing_users(self: Self, user_names: list[str]) -> list[str]:
+        """Get the names from a list that are not users."""
+        return [name for name in user_names if name not in self.users_by_name]
+
+    async def get_party_need_masks(
+        self: Self,
+        user_names: list[str],
+    ) -> dict[tuple[str, str], int]:
+        """Get need bitmasks of a party keyed by (item_expac, item_name)."""
+        members = [
+            (1 << i, user)
+            for i, name in enumerate(user_names)
+            if (user := self.get_user("user_name", name)) is not None
+        ]
+        if len(members) == 0:
+            return {}
+        need_masks = {}
+        for mount in self.mounts.values():
+            mask = 0
+            for member_bit, user in members:
+                if not (user.owned >> mount.slot) & 1:
+                    mask |= member_bit
+            need_masks[mount.item_expac, mount.item_name] = mask
+        return need_masks
+
+    async def summarize_needed_mounts(self: Self) -> pl.DataFrame:
+        """Count the users needing each mount."""
+        rows = [
+            (
+                mount.item_expac,
+                mount.item_name,
+                sum(not (user.owned >> mount.slot) & 1 for user in self.users.values()),
+            )
+            for mount in self.mounts.values()
+        ]
+        summary = pl.DataFrame(
+            rows,
+            schema={
+                "item_expac": pl.String,
+                "item_name": pl.String,
+                "need_count": pl.Int64,
+            },
+            orient="row",
+        )
+        return summary.sort(by="need_count", descending=True)
+
+    async def summarize_party_needs(
+        self: Self,
+        user_names: list[str],
+        per_expansion: int = -1,
+    ) -> pl.DataFrame:
+        """Rank the mounts of each expansion by how many party members need them."""
+        members = [
+            user
+            for name in dict.fromkeys(user_names)
+            if (user := self.get_user("user_name", name)) is not None
+        ]
+        # Mounts in catalog order, grouped by expansion in order of first need
+        needs: dict[str, list[tuple[int, str]]] = {}
+        for mount in self.mounts.values():
+            need_count = sum(not (user.owned >> mount.slot) & 1 for user in members)
+            if need_count != 0:
+                needs.setdefault(mount.item_expac, []).append(
+                    (need_count, mount.item_name),
+                )
+        if per_expansion < 0:
+            per_expansion = len(self.mounts)
+        rows = [
+            (item_expac, item_name, need_count)
+            for item_expac, expac_needs in needs.items()
+            for need_count, item_name in sorted(
+                expac_needs,
+                key=lambda need: -need[0],
+            )[:per_expansion]
+        ]
+        schema = {
+            "item_expac": pl.String,
+            "item_name": pl.String,
+            "need_count": pl.Int64,
+        }
+        return pl.DataFrame(rows, schema=schema, orient="row")
+
+    async def list_item_needers(
+        self: Self,
+        item_name: str,
+        expansion: None | str = None,
+    ) -> dict[str, list[str]]:
+        """Get the users who still need a mount, keyed by expansion."""
+        needers = {}
+        for item in await self.find_items(item_name, expansion):
+            slot = self.mounts[item["item_id"]].slot
+            names = sorted(
+                user.user_name
+                for user in self.users.values()
+                if not (user.owned >> slot) & 1
+            )
+            if len(names) != 0:
+                needers[item["item_expac"]] = names
+        return needers
+
+    async def summarize_weekly_progress(
+        self: Self,
+        user_name: None | str = None,
+        expansion: None | str = None,
+        weeks: int = 8,
+    ) -> pl.DataFrame:
+        """Summarize net mounts gained per week from the status events."""
+        today = datetime.now(UTC).date()
+        start = today - timedelta(days=today.weekday() + 7 * (weeks - 1))
+        user = None if user_name is None else self.get_user("user_name", user_name)
+        user_ids = set() if user is None else {user.user_id}
+        gained: dict[date, int] = {}
+        for event in self.events:
+            if user_name is not None and event.user_id not in user_ids:
+                continue
+            if event.day < start or expansion not in {None, event.item_expac}:
+                continue
+            week = event.day - timedelta(days=event.day.weekday())
+            gained[week] = gained.get(week, 0) + (1 if event.has_item else -1)
+        rows = [(week.isoformat(), gained[week]) for week in sorted(gained)]
+        return pl.DataFrame(
+            rows,
+            schema={"week": pl.String, "gained": pl.Int64},
+            orient="row",
+        )
+
+    async def list_leaderboard(
+        self: Self,
+        expansion: None | str = None,
+        limit: int = 10,
+    ) -> pl.DataFrame:
+        """Get the users with the highest share of mounts owned."""
+        mask = sum(
+            1 << mount.slot
+            for mount in self.mounts.values()
+            if expansion in {None, mount.item_expac}
+        )
+        total = mask.bit_count()
+        rows = sorted(
+            (
+                (user.user_name, (user.owned & mask).bit_count(), total)
+                for user in self.users.values()
+            ),
+            key=lambda row: row[1],
+            reverse=True,
+        )
+        return pl.DataFrame(
+            rows[:limit] if total != 0 else [],
+            schema={"user_name": pl.String, "owned": pl.Int64, "total": pl.Int64},
+            orient="row",
+        )
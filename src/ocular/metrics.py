@@ -0,0 +1,21 @@
+"""In-process counters of how commands are handled."""
+
+from collections import Counter, defaultdict
+
+# Counts per metric name, keyed by command name
+counters: defaultdict[str, Counter[str]] = defaultdict(Counter)
+
+
+def increment(metric: str, command: str) -> None:
+    """Count one event of a metric for a command."""
+    counters[metric][command] += 1
+
+
+def snapshot() -> dict[str, dict[str, int]]:
+    """Get a copy of every counter."""
+    return {metric: dict(counts) for metric, counts in counters.items()}
+
+
+def reset() -> None:
+    """Set every counter back to zero."""
+    counters.clear()
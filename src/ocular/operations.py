@@ -1,13 +1,46 @@
 """Database operations for discord bot."""
 
+from __future__ import annotations
+
+import asyncio
+import hashlib
+import itertools
 import json
+import logging
+import time
+from contextlib import asynccontextmanager
+from datetime import UTC, datetime
 from pathlib import Path
-from typing import Literal, Self
+from typing import TYPE_CHECKING, ClassVar, Literal, Self
 
 import aiosqlite
-import polars as pl
 import uuid6
 
+from src.ocular import queries
+from src.ocular.config import get_config
+from src.ocular.identity import Identity, IdentityCache, IdentityKey
+from src.ocular.importer import ImportReport, mount_key
+from src.ocular.lazy import lazy_import
+from src.ocular.queries import ALL_EXPANSIONS, Statement
+from src.ocular.storage import PAGE_SIZE, Storage
+
+if TYPE_CHECKING:
+    from collections.abc import AsyncIterator, Awaitable, Callable, Iterable
+
+    from src.ocular.importer import CollectionRow
+
+# Polars is only loaded once an aggregation first needs it
+pl = lazy_import("polars")
+
+logger = logging.getLogger("discord")
+
+# Lookups of users by each identity column
+USER_LOOKUPS = {
+    "user_id": queries.USER_BY_ID,
+    "user_name": queries.USER_BY_NAME,
+    "user_discord_id": queries.USER_BY_DISCORD_ID,
+}
+
 
 def dict_factory(cursor: aiosqlite.Cursor, row: aiosqlite.Row) -> dict:
     """Convert rows returned by a cursor operation to dicts."""
@@ -15,60 +48,302 @@ def dict_factory(cursor: aiosqlite.Cursor, row: aiosqlite.Row) -> dict:
     return dict(zip(fields, row, strict=True))
 
 
-class DataBase:
-    """Class storing methods for database operations."""
+class DataBase(Storage):
+    """Class storing methods for database operations, backed by SQLite."""
+
+    # Mount rows and expansion name index, keyed by database path
+    mount_cache: ClassVar[dict[str, tuple[dict]]] = {}
+    mount_index_cache: ClassVar[dict[str, dict[str, list[str]]]] = {}
+    # User identities by ID, name and discord ID, keyed by database path
+    identity_caches: ClassVar[dict[str, IdentityCache]] = {}
+    # In-memory read replicas and the locks serializing their use
+    replicas: ClassVar[dict[str, aiosqlite.Connection]] = {}
+    replica_locks: ClassVar[dict[str, asyncio.Lock]] = {}
 
     def __init__(self) -> None:
         """Methods for database operations."""
-        self.db_path = "./data/bot.db"
+        config = get_config().database
+        self.db_path = config.path
+        self.catalog_path = config.catalog_path
+
+    @asynccontextmanager
+    async def connect(self: Self) -> AsyncIterator[aiosqlite.Connection]:
+        """Connect to the database with the configured pragmas set."""
+        config = get_config().database
+        async with aiosqlite.connect(
+            self.db_path,
+            cached_statements=config.cached_statements,
+        ) as db:
+            for pragma, value in config.pragmas.items():
+                await db.execute(f"PRAGMA {pragma} = {value}")
+            yield db
+
+    def log_if_slow(self: Self, started: float, statement: str) -> None:
+        """Log a statement that took longer than the slow query threshold."""
+        elapsed_ms = (time.perf_counter() - started) * 1000
+        if elapsed_ms > get_config().database.slow_query_ms:
+            statement = " ".join(statement.split())
+            logger.warning("Slow query (%.0f ms): %s", elapsed_ms, statement[:200])
+
+    async def open_replica(self: Self) -> None:
+        """Load the database into an in-memory replica serving reads.
+
+        While the replica is open, reads made through `read_connection`
+        are served from memory. Writes made through `db_write` are
+        committed to disk first and then applied to the replica, and
+        bulk writes reload it from disk.
+        """
+        await self.close_replica()
+        replica = await aiosqlite.connect(
+            ":memory:",
+            cached_statements=get_config().database.cached_statements,
+        )
+        async with self.connect() as db:
+            await db.backup(replica)
+        self.replicas[str(self.db_path)] = replica
+        self.replica_locks[str(self.db_path)] = asyncio.Lock()
+        logger.info("Opened in-memory read replica of %s", self.db_path)
+
+    async def refresh_replica(self: Self) -> None:
+        """Reload the read replica from disk, if one is open."""
+        replica = self.replicas.get(str(self.db_path))
+        if replica is None:
+            return
+        async with (
+            self.replica_locks[str(self.db_path)],
+            self.connect() as db,
+        ):
+            await db.backup(replica)
+
+    async def close_replica(self: Self) -> None:
+        """Close the read replica, if one is open, and read from disk again."""
+        replica = self.replicas.pop(str(self.db_path), None)
+        self.replica_locks.pop(str(self.db_path), None)
+        if replica is not None:
+            await replica.close()
+
+    async def checkpoint(self: Self) -> None:
+        """Copy the write-ahead log into the database file and truncate it."""
+        async with self.connect() as db:
+            await db.execute("PRAGMA wal_checkpoint(TRUNCATE)")
+
+    async def close(self: Self) -> None:
+        """Close the read replica and checkpoint the write-ahead log."""
+        await self.close_replica()
+        await self.checkpoint()
+
+    @asynccontextmanager
+    async def read_connection(self: Self) -> AsyncIterator[aiosqlite.Connection]:
+        """Connect for reading, to the read replica if one is open."""
+        replica = self.replicas.get(str(self.db_path))
+        if replica is None:
+            async with self.connect() as db:
+                yield db
+            return
+        async with self.replica_locks[str(self.db_path)]:
+            replica.row_factory = None
+            yield replica
+
+    async def db_write[T](
+        self: Self,
+        apply: Callable[[aiosqlite.Connection], Awaitable[T]],
+    ) -> T:
+        """Run writes in a transaction on disk, then on the read replica.
+
+        Parameters
+        ----------
+        apply : Callable[[aiosqlite.Connection], Awaitable[T]]
+            Coroutine function making the writes on a connection. It is
+            run once per copy of the database, so it must not have other
+            side effects.
+
+        Returns
+        -------
+        result : T
+            What `apply` returned when run on disk.
+
+        """
+        started = time.perf_counter()
+        async with self.connect() as db:
+            result = await apply(db)
+            await db.commit()
+            self.log_if_slow(started, f"write by {apply.__qualname__}")
+            # Once on disk, the writes reach the replica even if cancelled
+            await asyncio.shield(self.replica_write(apply))
+        return result
+
+    async def replica_write(
+        self: Self,
+        apply: Callable[[aiosqlite.Connection], Awaitable[object]],
+    ) -> None:
+        """Apply writes committed to disk to the read replica, if one is open.
+
+        Should the writes fail on the replica, it is reloaded from disk
+        instead, so it never drifts from the database file.
+        """
+        replica = self.replicas.get(str(self.db_path))
+        if replica is None:
+            return
+        async with self.replica_locks[str(self.db_path)]:
+            replica.row_factory = None
+            try:
+                await apply(replica)
+                await replica.commit()
+            except (aiosqlite.Error, ValueError):
+                logger.exception("Reloading read replica after a failed write")
+                await replica.rollback()
+                async with self.connect() as db:
+                    await db.backup(replica)
 
     async def db_execute_literal(self: Self, query: str) -> None:
         """Execute a DB write query directly string."""
-        async with aiosqlite.connect(self.db_path) as db:
-            db.row_factory = dict_factory
-            cs = await db.cursor()
-            await cs.execute(query)
-            await db.commit()
+        await self.db_write(lambda db: db.execute(query))
 
-    async def db_execute_qmark(self: Self, query: str, params: tuple) -> None:
-        """Execute a DB query with the qmarks placeholder syntax."""
-        async with aiosqlite.connect(self.db_path) as db:
-            db.row_factory = dict_factory
-            cs = await db.cursor()
-            await cs.execute(query, params)
-            await db.commit()
+    async def db_execute_qmark[P: tuple](
+        self: Self,
+        statement: Statement[P],
+        params: P,
+    ) -> None:
+        """Execute a statement with the qmarks placeholder syntax."""
+        await self.db_write(lambda db: db.execute(statement.sql, params))
 
-    async def db_execute_dictuple(self: Self, query: str, rows: tuple[dict]) -> None:
-        """Execute a DB query with the tuple of dict placeholder syntax."""
-        async with aiosqlite.connect(self.db_path) as db:
-            db.row_factory = dict_factory
-            cs = await db.cursor()
-            await cs.executemany(query, rows)
-            await db.commit()
+    async def db_execute_dictuple(
+        self: Self,
+        statement: Statement[dict],
+        rows: tuple[dict],
+    ) -> None:
+        """Execute a statement with the tuple of dict placeholder syntax."""
+        await self.db_write(lambda db: db.executemany(statement.sql, rows))
+
+    async def db_read_table(self: Self, statement: Statement[tuple[()]]) -> tuple[dict]:
+        """Read all rows returned by a statement without parameters."""
+        return await self.db_read_qmark(statement, ())
 
-    async def db_read_table(self: Self, query: str) -> tuple[dict]:
-        """Read a DB table and return all rows."""
-        async with aiosqlite.connect(self.db_path) as db:
+    async def db_read_qmark[P: tuple](
+        self: Self,
+        statement: Statement[P],
+        params: P,
+    ) -> tuple[dict]:
+        """Read DB rows with the qmarks placeholder syntax."""
+        started = time.perf_counter()
+        async with self.read_connection() as db:
             db.row_factory = dict_factory
             cs = await db.cursor()
-            await cs.execute(query)
-            return await cs.fetchall()
+            await cs.execute(statement.sql, params)
+            rows = await cs.fetchall()
+        self.log_if_slow(started, statement.name)
+        return rows
 
-    async def init_mount_table(self: Self) -> tuple[dict]:
-        """Create rows for initializing mounts table."""
-        trials = tuple(json.load(Path.open("./assets/inputs/mounts.json"))["trials"])
-        raids = tuple(json.load(Path.open("./assets/inputs/mounts.json"))["raids"])
+    async def init_mount_table(self: Self) -> None:
+        """Initialize mounts table, adding the normalized name if missing.
+
+        Mounts are looked up by `norm_name`, their trimmed and lowercased
+        name compared case-insensitively, which is unique within an
+        expansion.
+        """
         query = """
             CREATE TABLE IF NOT EXISTS
-            mounts(item_id STRING, item_name STRING, item_expac STRING)
+            mounts(
+                item_id STRING,
+                item_name STRING,
+                item_expac STRING,
+                norm_name STRING COLLATE NOCASE
+            )
         """
         await self.db_execute_literal(query)
-        table_shape = await self.check_table_shape("mounts")
-        if table_shape != (0, 0):
-            msg = "Mounts table is not empty, initial rows not appended."
-            raise AssertionError(msg)
-        await self.append_to_mount_table(trials)
-        await self.append_to_mount_table(raids)
+        columns = await self.db_read_qmark(queries.TABLE_COLUMNS, ("mounts",))
+        if "norm_name" not in {row["name"] for row in columns}:
+            await self.db_execute_literal(
+                "ALTER TABLE mounts ADD COLUMN norm_name STRING COLLATE NOCASE",
+            )
+            await self.db_execute_qmark(queries.BACKFILL_NORM_NAMES, ())
+
+    async def sync_mount_catalog(self: Self) -> bool:
+        """Bring the mounts table in line with the mount catalog file.
+
+        The catalog is diffed against the mounts table by item ID: new
+        mounts are inserted with a status row for every user, changed
+        names or expansions are updated, and mounts dropped since the
+        previous catalog are deleted along with their status rows. The
+        IDs of the catalog are stored in the meta table, so mounts
+        created with `/dbcreatemount` are never deleted, and catalog
+        mounts whose name is already taken in their expansion by such a
+        mount are skipped. All changes are applied in one transaction.
+        The catalog's content hash is stored in the meta table too, and
+        the sync is skipped when the file has not changed since the last
+        one.
+
+        Returns
+        -------
+        synced : bool
+            Whether the catalog had changed and was synced.
+
+        """
+        catalog_bytes = Path(self.catalog_path).read_bytes()
+        catalog_hash = hashlib.sha256(catalog_bytes).hexdigest()
+        hash_rows = await self.db_read_qmark(queries.GET_META, ("catalog_hash",))
+        if len(hash_rows) != 0 and hash_rows[0]["value"] == catalog_hash:
+            return False
+        catalog = {
+            row["item_id"]: row
+            for duty_rows in json.loads(catalog_bytes).values()
+            for row in duty_rows
+        }
+        id_rows = await self.db_read_qmark(queries.GET_META, ("catalog_ids",))
+        # Databases synced before IDs were stored delete nothing this once
+        previous_ids = set(json.loads(id_rows[0]["value"]) if id_rows else ())
+        current = {row["item_id"]: row for row in await self.get_mount_table()}
+        deleted_ids = [
+            (item_id,)
+            for item_id in current
+            if item_id in previous_ids and item_id not in catalog
+        ]
+
+        def name_key(row: dict) -> tuple[str, str]:
+            return row["item_expac"], row["item_name"].strip().lower()
+
+        # Names in use once deletions are applied, mapped to their mount
+        taken = {
+            name_key(row): item_id
+            for item_id, row in current.items()
+            if (item_id,) not in deleted_ids
+        }
+        new_rows, changed_rows, skipped = [], [], []
+        for item_id, row in catalog.items():
+            if current.get(item_id) == row:
+                continue
+            if taken.get(name_key(row), item_id) != item_id:
+                skipped.append(row["item_name"])
+                continue
+            if item_id in current:
+                taken.pop(name_key(current[item_id]), None)
+                changed_rows.append(row)
+            else:
+                new_rows.append(row)
+            taken[name_key(row)] = item_id
+        if len(skipped) != 0:
+            logger.warning("Catalog mounts %s clash with others, skipped", skipped)
+
+        async def apply(db: aiosqlite.Connection) -> None:
+            # Status rows go first so completion triggers can see their expansion
+            await db.executemany(queries.DELETE_MOUNT_STATUS.sql, deleted_ids)
+            await db.executemany(queries.DELETE_MOUNT.sql, deleted_ids)
+            await db.executemany(queries.UPDATE_MOUNT.sql, changed_rows)
+            await db.executemany(queries.INSERT_MOUNT.sql, new_rows)
+            await db.executemany(queries.SEED_MOUNT_STATUS.sql, new_rows)
+            catalog_ids = json.dumps(sorted(catalog))
+            await db.execute(queries.SET_META.sql, ("catalog_ids", catalog_ids))
+            await db.execute(queries.SET_META.sql, ("catalog_hash", catalog_hash))
+
+        await self.db_write(apply)
+        self.clear_mount_cache()
+        logger.info(
+            "Synced mount catalog: %s added, %s changed, %s deleted",
+            len(new_rows),
+            len(changed_rows),
+            len(deleted_ids),
+        )
+        return True
 
     async def init_user_table(self: Self) -> None:
         """Initialize user table."""
@@ -90,14 +365,246 @@ class DataBase:
         """
         await self.db_execute_literal(query)
 
+    async def init_event_tables(self: Self) -> None:
+        """Initialize status event log and daily aggregate tables."""
+        schema = (
+            """
+            CREATE TABLE IF NOT EXISTS
+            status_events(
+                event_id INTEGER PRIMARY KEY,
+                user_id STRING,
+                item_id STRING,
+                has_item INTEGER,
+                actor_discord_id INTEGER,
+                actor_role STRING,
+                created_at STRING
+            )
+            """,
+            """
+            CREATE TABLE IF NOT EXISTS
+            status_daily(
+                day STRING,
+                user_id STRING,
+                item_expac STRING,
+                gained INTEGER,
+                lost INTEGER,
+                PRIMARY KEY (day, user_id, item_expac)
+            )
+            """,
+            "CREATE TABLE IF NOT EXISTS meta(key STRING PRIMARY KEY, value STRING)",
+        )
+        for query in schema:
+            await self.db_execute_literal(query)
+
+    async def init_completion_table(self: Self) -> None:
+        """Initialize per-user completion counters and the triggers keeping them.
+
+        Counters of owned and total mounts are kept per user and
+        expansion, plus one row per user under the `ALL_EXPANSIONS`
+        expansion for overall completion. Triggers on the status and
+        mounts tables update them in the same transaction as every
+        write, so they are only computed from the status table once,
+        when the table is first created.
+        """
+        exists_rows = await self.db_read_qmark(queries.TABLE_EXISTS, ("completion",))
+        table_exists = len(exists_rows) != 0
+        schema = (
+            """
+            CREATE TABLE IF NOT EXISTS
+            completion(
+                user_id STRING,
+                item_expac STRING,
+                owned INTEGER,
+                total INTEGER,
+                PRIMARY KEY (user_id, item_expac)
+            )
+            """,
+            """
+            CREATE INDEX IF NOT EXISTS
+            completion_rank ON completion(
+                item_expac, owned * 1.0 / total DESC, owned DESC
+            )
+            """,
+            f"""
+            CREATE TRIGGER IF NOT EXISTS
+            completion_status_insert AFTER INSERT ON status
+            BEGIN
+                INSERT INTO completion(user_id, item_expac, owned, total)
+                SELECT NEW.user_id, item_expac, NEW.has_item, 1
+                FROM mounts WHERE item_id = NEW.item_id
+                UNION ALL
+                SELECT NEW.user_id, '{ALL_EXPANSIONS}', NEW.has_item, 1 WHERE true
+                ON CONFLICT(user_id, item_expac) DO UPDATE SET
+                    owned = owned + excluded.owned,
+                    total = total + 1;
+            END
+            """,  # noqa: S608
+            f"""
+            CREATE TRIGGER IF NOT EXISTS
+            completion_status_update AFTER UPDATE OF has_item ON status
+            WHEN NEW.has_item != OLD.has_item
+            BEGIN
+                UPDATE completion SET owned = owned + NEW.has_item - OLD.has_item
+                WHERE user_id = NEW.user_id AND item_expac IN (
+                    (SELECT item_expac FROM mounts WHERE item_id = NEW.item_id),
+                    '{ALL_EXPANSIONS}'
+                );
+            END
+            """,  # noqa: S608
+            f"""
+            CREATE TRIGGER IF NOT EXISTS
+            completion_status_delete AFTER DELETE ON status
+            BEGIN
+                UPDATE completion SET
+                    owned = owned - OLD.has_item,
+                    total = total - 1
+                WHERE user_id = OLD.user_id AND item_expac IN (
+                    (SELECT item_expac FROM mounts WHERE item_id = OLD.item_id),
+                    '{ALL_EXPANSIONS}'
+                );
+                DELETE FROM completion WHERE user_id = OLD.user_id AND total = 0;
+            END
+            """,  # noqa: S608
+            """
+            CREATE TRIGGER IF NOT EXISTS
+            completion_mount_move AFTER UPDATE OF item_expac ON mounts
+            WHEN NEW.item_expac != OLD.item_expac
+            BEGIN
+                UPDATE completion SET
+                    owned = owned - (
+                        SELECT has_item FROM status
+                        WHERE status.user_id = completion.user_id
+                            AND status.item_id = NEW.item_id
+                    ),
+                    total = total - 1
+                WHERE item_expac = OLD.item_expac AND user_id IN (
+                    SELECT user_id FROM status WHERE item_id = NEW.item_id
+                );
+                DELETE FROM completion WHERE item_expac = OLD.item_expac AND total = 0;
+                INSERT INTO completion(user_id, item_expac, owned, total)
+                SELECT user_id, NEW.item_expac, has_item, 1
+                FROM status WHERE item_id = NEW.item_id
+                ON CONFLICT(user_id, item_expac) DO UPDATE SET
+                    owned = owned + excluded.owned,
+                    total = total + 1;
+            END
+            """,
+        )
+        async with self.connect() as db:
+            for query in schema:
+                await db.execute(query)
+            if not table_exists:
+                await db.execute(queries.BACKFILL_COMPLETION.sql)
+            await db.commit()
+
+    async def dedupe_users(self: Self) -> int:
+        """Delete users repeating an earlier user's name or discord ID.
+
+        Concurrent registrations could add such duplicates before user
+        names and discord IDs had unique indexes. The first user added
+        with a name or discord ID is kept, and later ones are deleted
+        along with their status rows.
+
+        Returns
+        -------
+        n_deleted : int
+            Number of duplicate users deleted.
+
+        """
+        rows = await self.db_read_table(queries.DUPLICATE_USERS)
+        if len(rows) == 0:
+            return 0
+        params = [(row["user_id"],) for row in rows]
+
+        async def apply(db: aiosqlite.Connection) -> None:
+            await db.executemany(queries.DELETE_USER_STATUS.sql, params)
+            await db.executemany(queries.DELETE_USER.sql, params)
+
+        await self.db_write(apply)
+        self.identity_cache.clear()
+        logger.warning("Deleted %s duplicate users", len(rows))
+        return len(rows)
+
+    async def dedupe_mounts(self: Self) -> int:
+        """Merge mounts repeating an earlier mount's name in its expansion.
+
+        Names differing only in case or surrounding spaces could be added
+        before mount names had a unique index. The first mount added with
+        a name is kept, owned by every user owning any of its duplicates,
+        and the duplicates are deleted along with their status rows.
+
+        Returns
+        -------
+        n_deleted : int
+            Number of duplicate mounts deleted.
+
+        """
+        rows = await self.db_read_table(queries.DUPLICATE_MOUNTS)
+        if len(rows) == 0:
+            return 0
+        params = [(row["item_id"],) for row in rows]
+
+        async def apply(db: aiosqlite.Connection) -> None:
+            await db.executemany(queries.MERGE_MOUNT_STATUS.sql, rows)
+            # Status rows go first so completion triggers can see their expansion
+            await db.executemany(queries.DELETE_MOUNT_STATUS.sql, params)
+            await db.executemany(queries.DELETE_MOUNT.sql, params)
+
+        await self.db_write(apply)
+        self.clear_mount_cache()
+        logger.warning("Merged %s duplicate mounts", len(rows))
+        return len(rows)
+
+    async def init_indexes(self: Self) -> None:
+        """Create the indexes used by keyed lookups and paginated listings.
+
+        User names and discord IDs get unique indexes, which registration
+        relies on to reject duplicates without a separate check. Mount
+        names are unique within an expansion, ignoring case, and the
+        index enforcing it leads with the name so it also serves
+        lookups by name alone. Duplicates added before the indexes existed
+        are removed first.
+        """
+        await self.dedupe_users()
+        await self.dedupe_mounts()
+        schema = (
+            "CREATE UNIQUE INDEX IF NOT EXISTS users_name_key ON users(user_name)",
+            """
+            CREATE INDEX IF NOT EXISTS
+            mounts_expac_name ON mounts(item_expac, item_name)
+            """,
+            "CREATE UNIQUE INDEX IF NOT EXISTS users_id ON users(user_id)",
+            """
+            CREATE UNIQUE INDEX IF NOT EXISTS
+            users_discord_id_key ON users(user_discord_id)
+            """,
+            "CREATE UNIQUE INDEX IF NOT EXISTS mounts_id ON mounts(item_id)",
+            """
+            CREATE UNIQUE INDEX IF NOT EXISTS
+            mounts_norm_name_expac ON mounts(norm_name COLLATE NOCASE, item_expac)
+            """,
+            "CREATE INDEX IF NOT EXISTS status_user ON status(user_id, item_id)",
+            # Partial index of unmet needs, kept current by every status write
+            """
+            CREATE INDEX IF NOT EXISTS
+            status_needs ON status(item_id, user_id) WHERE has_item = 0
+            """,
+        )
+        for query in schema:
+            await self.db_execute_literal(query)
+
     async def init_tables(self: Self) -> None:
-        """Initialize database tables."""
-        data_dir = Path("./data")
-        if not data_dir.joinpath("bot.db").exists():
-            data_dir.mkdir(parents=True, exist_ok=True)
-            await self.init_user_table()
-            await self.init_mount_table()
-            await self.init_status_table()
+        """Initialize database tables and sync the mount catalog."""
+        Path(self.db_path).parent.mkdir(parents=True, exist_ok=True)
+        # WAL lets snapshot readers such as exports run without blocking writes
+        await self.db_execute_literal("PRAGMA journal_mode=WAL")
+        await self.init_user_table()
+        await self.init_mount_table()
+        await self.init_status_table()
+        await self.init_event_tables()
+        await self.init_completion_table()
+        await self.init_indexes()
+        await self.sync_mount_catalog()
 
     def create_user_row(self: Self, name: str, discord_id: int) -> tuple[dict]:
         """Create a new user ID as a row for the user table.
@@ -120,9 +627,59 @@ class DataBase:
 
     async def append_new_user(self: Self, name: str, discord_id: int) -> None:
         """Create user table rows from a string of comma-separated user names."""
-        row = self.create_user_row(name, discord_id)
-        query = "INSERT INTO users VALUES(:user_id, :user_name, :user_discord_id)"
-        await self.db_execute_dictuple(query, row)
+        user_id = self.create_user_row(name, discord_id)[0]["user_id"]
+        await self.db_execute_qmark(queries.INSERT_USER, (user_id, name, discord_id))
+        self.identity_cache.add(Identity(user_id, name, discord_id))
+
+    async def register_user(
+        self: Self,
+        name: str,
+        discord_id: int,
+    ) -> Literal["added", "registered", "name_taken", "id_taken"]:
+        """Add a user with a status row for every mount, in one transaction.
+
+        The user is inserted with `ON CONFLICT DO NOTHING` against the
+        unique user name and discord ID indexes, so concurrent calls
+        cannot create duplicates and no lock or prior check is needed.
+        Status rows are seeded from the mounts table in the same
+        transaction, and calling again with the same name and discord ID
+        changes nothing, so the call is safe to retry.
+
+        Parameters
+        ----------
+        name : str
+            Name of the user to add.
+        discord_id : int
+            Discord ID of the user to add.
+
+        Returns
+        -------
+        outcome : Literal["added", "registered", "name_taken", "id_taken"]
+            Whether the user was added, was already registered with this
+            name and discord ID, or conflicts with another user's name or
+            discord ID.
+
+        """
+        user_id = uuid6.uuid7().hex
+
+        async def apply(db: aiosqlite.Connection) -> str:
+            params = (user_id, name, discord_id)
+            cs = await db.execute(queries.REGISTER_USER.sql, params)
+            if await cs.fetchone() is not None:
+                await db.execute(queries.SEED_USER_STATUS.sql, (user_id,))
+                return "added"
+            cs = await db.execute(queries.USER_CONFLICTS.sql, (name, discord_id))
+            users = set(await cs.fetchall())
+            if (name, discord_id) in users:
+                return "registered"
+            if any(user_name == name for user_name, _ in users):
+                return "name_taken"
+            return "id_taken"
+
+        outcome = await self.db_write(apply)
+        if outcome == "added":
+            self.identity_cache.add(Identity(user_id, name, discord_id))
+        return outcome
 
     async def append_to_mount_table(self: Self, new_rows: tuple[dict]) -> None:
         """Add new mounts to the mount table.
@@ -134,8 +691,8 @@ class DataBase:
             item_name. Each new row should be a separate dict.
 
         """
-        query = "INSERT INTO mounts VALUES(:item_id, :item_name, :item_expac)"
-        await self.db_execute_dictuple(query, new_rows)
+        await self.db_execute_dictuple(queries.INSERT_MOUNT, new_rows)
+        self.clear_mount_cache()
 
     async def append_to_status_table(self: Self, new_rows: tuple[dict]) -> None:
         """Add new status rows to the status table.
@@ -148,8 +705,72 @@ class DataBase:
             separate dict.
 
         """
-        query = "INSERT INTO status VALUES(:user_id, :item_id, :has_item)"
-        await self.db_execute_dictuple(query, new_rows)
+        await self.db_execute_dictuple(queries.INSERT_STATUS, new_rows)
+
+    @property
+    def identity_cache(self: Self) -> IdentityCache:
+        """Get the identity cache of this database, sized as configured."""
+        config = get_config().cache
+        cache = self.identity_caches.setdefault(str(self.db_path), IdentityCache())
+        cache.max_size, cache.ttl = config.identity_size, config.identity_ttl
+        return cache
+
+    async def resolve_user(self: Self, key: IdentityKey) -> None | Identity:
+        """Find a user by ID, name or discord ID, or none if there is none.
+
+        Lookups are answered from the identity cache when possible,
+        including lookups of values known to match no user, and only
+        misses query the users table.
+
+        Parameters
+        ----------
+        key : IdentityKey
+            Column to match, one of user_id, user_name or
+            user_discord_id, and the value to match in it.
+
+        """
+        hit, identity = self.identity_cache.lookup(key)
+        if hit:
+            return identity
+        column, value = key
+        if column not in USER_LOOKUPS:
+            msg = "column must be one of ['user_id', 'user_name', 'user_discord_id']"
+            raise ValueError(msg)
+        rows = await self.db_read_qmark(USER_LOOKUPS[column], (value,))
+        identity = Identity(**rows[0]) if len(rows) != 0 else None
+        self.identity_cache.store(key, identity)
+        return identity
+
+    async def resolve_users(
+        self: Self,
+        user_names: Iterable[str] = (),
+        discord_ids: Iterable[int] = (),
+    ) -> list[Identity]:
+        """Find the users matching any of several names or discord IDs.
+
+        All users are found by one query of the users table, and cached
+        for later lookups.
+
+        Parameters
+        ----------
+        user_names : Iterable[str]
+            Names of the users to find.
+        discord_ids : Iterable[int]
+            Discord IDs of the users to find.
+
+        Returns
+        -------
+        identities : list[Identity]
+            Users found, each once. Names and discord IDs matching no
+            user are left out.
+
+        """
+        params = (json.dumps(list(user_names)), json.dumps(list(discord_ids)))
+        rows = await self.db_read_qmark(queries.RESOLVE_USERS, params)
+        identities = [Identity(**row) for row in rows]
+        for identity in identities:
+            self.identity_cache.add(identity)
+        return identities
 
     async def get_user_id(self: Self, user_name: str) -> str:
         """Get a user id from the user table.
@@ -160,15 +781,13 @@ class DataBase:
             Name of user to get database ID for.
 
         """
-        usr = tuple(x for x in [user_name])
-        async with aiosqlite.connect(self.db_path) as db:
-            db.row_factory = dict_factory
-            cs = await db.cursor()
-            await cs.execute("SELECT user_id FROM users WHERE user_name = ?", usr)
-            user_row = await cs.fetchone()
-            return user_row["user_id"]
+        identity = await self.resolve_user(("user_name", user_name))
+        if identity is None:
+            msg = f"No user named {user_name}"
+            raise ValueError(msg)
+        return identity.user_id
 
-    async def get_user_discord_id(self: Self, user_name: str) -> int:
+    async def get_user_discord_id(self: Self, user_name: str) -> list[int]:
         """Get a user discord ID from user name.
 
         Parameters
@@ -177,43 +796,60 @@ class DataBase:
             Name of user to get discord ID for.
 
         """
-        user_table = await self.read_table_polars("users")
-        user_row = user_table.filter(pl.col("user_name") == user_name)
-        if user_row.shape == (0, 1):
+        identity = await self.resolve_user(("user_name", user_name))
+        if identity is None:
             return []
-        return [user_row.select("user_discord_id").item()]
+        return [identity.user_discord_id]
 
-    async def get_user_from_discord_id(self: Self, discord_id: str) -> str:
+    async def get_user_from_discord_id(self: Self, discord_id: int) -> str:
         """Get a user id from the user table.
 
         Parameters
         ----------
-        discord_id : str
+        discord_id : int
             Discord ID of user to get database ID for.
 
         """
-        usr = tuple(x for x in [discord_id])
-        async with aiosqlite.connect(self.db_path) as db:
-            db.row_factory = dict_factory
-            cs = await db.cursor()
-            await cs.execute("SELECT user_id FROM users WHERE user_discord_id = ?", usr)
-            user_row = await cs.fetchone()
-            return user_row["user_id"]
+        identity = await self.resolve_user(("user_discord_id", discord_id))
+        if identity is None:
+            msg = f"No user with discord ID {discord_id}"
+            raise ValueError(msg)
+        return identity.user_id
 
     async def get_user_table(self: Self) -> tuple[dict]:
         """Get user table as tuple of dict."""
-        query = "SELECT * FROM users"
-        return await self.db_read_table(query)
+        return await self.db_read_table(queries.ALL_USERS)
 
     async def get_mount_table(self: Self) -> tuple[dict]:
-        """Get mount table as tuple of dict."""
-        query = "SELECT * FROM mounts"
-        return await self.db_read_table(query)
+        """Get mount table as tuple of dict, cached until mounts are changed."""
+        cache_key = str(self.db_path)
+        if cache_key not in self.mount_cache:
+            rows = await self.db_read_table(queries.ALL_MOUNTS)
+            self.mount_cache[cache_key] = tuple(rows)
+        return self.mount_cache[cache_key]
+
+    async def get_mount_index(self: Self) -> dict[str, list[str]]:
+        """Get mount names keyed by expansion, cached until mounts are changed."""
+        cache_key = str(self.db_path)
+        if cache_key not in self.mount_index_cache:
+            mount_index = {}
+            for row in await self.get_mount_table():
+                mount_index.setdefault(row["item_expac"], []).append(row["item_name"])
+            self.mount_index_cache[cache_key] = mount_index
+        return self.mount_index_cache[cache_key]
+
+    def clear_mount_cache(self: Self) -> None:
+        """Drop cached mount rows after the mounts table is changed."""
+        self.mount_cache.pop(str(self.db_path), None)
+        self.mount_index_cache.pop(str(self.db_path), None)
+
+    async def warm_caches(self: Self) -> None:
+        """Load the mount cache and autocomplete index ahead of first use."""
+        await self.get_mount_index()
 
     async def get_status_table(self: Self) -> tuple[dict]:
         """Get raid table as tuple of dict."""
-        query = "SELECT * FROM status"
-        return await self.db_read_table(query)
+        return await self.db_read_table(queries.ALL_STATUS)
 
     async def read_table_polars(
         self: Self,
@@ -240,52 +876,86 @@ class DataBase:
             table = pl.DataFrame(await self.get_status_table())
         return table
 
-    async def append_new_status(self: Self, discord_id: str) -> tuple[dict]:
+    async def append_new_status(self: Self, discord_id: int) -> None:
         """Create status table rows for a new user.
 
+        One row per mount is seeded from the mounts table by a single
+        `INSERT ... SELECT` statement, without reading rows into Python.
+
         Parameters
         ----------
-        discord_id : str
+        discord_id : int
             Discord ID of the user being added.
 
         """
-        user = await self.get_user_from_discord_id(discord_id)
-        mounts = await self.read_table_polars("mounts")
-        rows = tuple(
-            mounts.with_columns(
-                user_id=pl.lit(user),
-                has_item=pl.lit(0).cast(pl.Int64),
-            ).to_dicts(),
-        )
-        await self.append_to_status_table(rows)
-        return rows
+        await self.db_execute_qmark(queries.SEED_DISCORD_USER_STATUS, (discord_id,))
+
+    async def find_items(
+        self: Self,
+        item_name: str,
+        expansion: None | str = None,
+    ) -> tuple[dict]:
+        """Find mounts by name with one probe of the mount name index.
+
+        Names are matched ignoring case and surrounding spaces.
+
+        Parameters
+        ----------
+        item_name : str
+            Name of the mounts to find.
+        expansion : None | str
+            If none, finds mounts with this name in every expansion. If
+            string must be the name of an expansion, and only the mount
+            from that expansion is found.
+
+        Returns
+        -------
+        items : tuple[dict]
+            Rows of the mounts found, with item_id, item_name and
+            item_expac keys.
+
+        """
+        if expansion is None:
+            return await self.db_read_qmark(queries.MOUNTS_BY_NAME, (item_name,))
+        return await self.db_read_qmark(queries.MOUNT_BY_NAME, (expansion, item_name))
 
     async def get_item_id(
         self: Self,
         item_name: str,
-    ) -> str:
+        expansion: None | str = None,
+    ) -> tuple[str, ...]:
         """Get an item ID from the mounts table.
 
         Parameters
         ----------
         item_name : str
-            Name of the mount to get the database ID for.
+            Name of the mount to get the database ID for, matched
+            ignoring case.
+        expansion : None | str
+            Expansion of the mount. Needed when several expansions have
+            a mount with this name.
 
         """
-        items = await self.read_table_polars("mounts")
-        item_id = items.filter(item_name=item_name).select("item_id")
-        if item_id.shape != (0, 1):
-            return (item_id.item(),)
-        return ()
+        items = await self.find_items(item_name, expansion)
+        item_ids = tuple(item["item_id"] for item in items)
+        if len(item_ids) > 1:
+            msg = f"Mount name {item_name} is not unique"
+            raise ValueError(msg)
+        return item_ids
 
     async def update_user_items(
         self: Self,
         action: Literal["add", "remove"],
         user: int,
         item_names: list[str],
-    ) -> tuple[dict]:
+        actor: None | int = None,
+        expansion: None | str = None,
+    ) -> bool:
         """Update entries for a user in the status table.
 
+        Every change is also appended to the status event log, in the
+        same transaction as the status update.
+
         Parameters
         ----------
         action : Literal["add", "remove"]
@@ -294,10 +964,21 @@ class DataBase:
             Name of the user to add or remove items for.
         item_names : str
             Name of item to add or remove from the user.
+        actor : None | int
+            Discord ID of the user making the change. If none, the change
+            is logged as made by the user themself.
+        expansion : None | str
+            Expansion of the mount. Needed when several expansions have
+            a mount with this name.
+
+        Returns
+        -------
+        found : bool
+            Whether the mount was found.
 
         """
         user_id = await self.get_user_from_discord_id(user)
-        items = await self.get_item_id(item_names)
+        items = await self.get_item_id(item_names, expansion)
         if action == "add":
             has_item_entry = 1
         elif action == "remove":
@@ -305,14 +986,141 @@ class DataBase:
         else:
             msg = "action must be one of ['add', 'remove']"
             raise ValueError(msg)
-        query = """
-            UPDATE status
-            SET has_item = ?
-            WHERE user_id = ? AND item_id = ?
+        actor = user if actor is None else actor
+        actor_role = "self" if actor == user else "admin"
+        created_at = datetime.now(UTC).isoformat()
+
+        async def apply(db: aiosqlite.Connection) -> None:
+            for item in items:
+                params = (has_item_entry, user_id, item, has_item_entry)
+                cs = await db.execute(queries.SET_STATUS.sql, params)
+                # Only log rows whose status actually changed
+                if cs.rowcount > 0:
+                    params = (user_id, item, has_item_entry, actor, actor_role)
+                    await db.execute(
+                        queries.INSERT_STATUS_EVENT.sql,
+                        (*params, created_at),
+                    )
+
+        await self.db_write(apply)
+        return len(items) != 0
+
+    async def update_user_expansion(
+        self: Self,
+        action: Literal["add", "remove"],
+        user: int,
+        expansion: str,
+        actor: None | int = None,
+    ) -> int:
+        """Update every mount of an expansion for a user in the status table.
+
+        The statuses are changed by one set-based update, logged to the
+        status event log in the same transaction. Completion counters are
+        kept current by the status triggers.
+
+        Parameters
+        ----------
+        action : Literal["add", "remove"]
+            Whether to add or remove the mounts from the user.
+        user : int
+            Discord ID of the user to add or remove mounts for.
+        expansion : str
+            Name of the expansion whose mounts to add or remove.
+        actor : None | int
+            Discord ID of the user making the change. If none, the change
+            is logged as made by the user themself.
+
+        Returns
+        -------
+        changed : int
+            Number of mounts whose status changed.
+
         """
-        for item in items:
-            params = (has_item_entry, user_id, item)
-            await self.db_execute_qmark(query, params)
+        user_id = await self.get_user_from_discord_id(user)
+        if action == "add":
+            has_item_entry = 1
+        elif action == "remove":
+            has_item_entry = 0
+        else:
+            msg = "action must be one of ['add', 'remove']"
+            raise ValueError(msg)
+        actor = user if actor is None else actor
+        actor_role = "self" if actor == user else "admin"
+        created_at = datetime.now(UTC).isoformat()
+        match = (user_id, has_item_entry, expansion)
+
+        async def apply(db: aiosqlite.Connection) -> int:
+            # Events first, while the changing rows can still be told apart
+            params = (has_item_entry, actor, actor_role, created_at, *match)
+            await db.execute(queries.INSERT_EXPANSION_EVENTS.sql, params)
+            cs = await db.execute(
+                queries.SET_EXPANSION_STATUS.sql,
+                (has_item_entry, *match),
+            )
+            return cs.rowcount
+
+        return await self.db_write(apply)
+
+    async def update_users_item(
+        self: Self,
+        action: Literal["add", "remove"],
+        users: Iterable[Identity],
+        item_id: str,
+        actor: int,
+    ) -> int:
+        """Update one mount for several users in the status table.
+
+        The statuses and their status events are written by one
+        `executemany` each, in a single transaction.
+
+        Parameters
+        ----------
+        action : Literal["add", "remove"]
+            Whether to add or remove the mount from the users.
+        users : Iterable[Identity]
+            Users to add or remove the mount for, as found by
+            `resolve_users`.
+        item_id : str
+            Database ID of the mount.
+        actor : int
+            Discord ID of the user making the change.
+
+        Returns
+        -------
+        changed : int
+            Number of users whose status changed.
+
+        """
+        if action == "add":
+            has_item_entry = 1
+        elif action == "remove":
+            has_item_entry = 0
+        else:
+            msg = "action must be one of ['add', 'remove']"
+            raise ValueError(msg)
+        created_at = datetime.now(UTC).isoformat()
+        events = [
+            (
+                has_item_entry,
+                actor,
+                "self" if actor == user.user_discord_id else "admin",
+                created_at,
+                user.user_id,
+                item_id,
+                has_item_entry,
+            )
+            for user in users
+        ]
+        updates = [event[-3:] for event in events]
+
+        async def apply(db: aiosqlite.Connection) -> int:
+            # Events first, while the changing rows can still be told apart
+            await db.executemany(queries.INSERT_CHANGE_EVENT.sql, events)
+            params = [(has_item_entry, *update) for update in updates]
+            cs = await db.executemany(queries.SET_STATUS.sql, params)
+            return cs.rowcount
+
+        return await self.db_write(apply)
 
     async def check_table_shape(
         self: Self,
@@ -344,12 +1152,7 @@ class DataBase:
             Value to check for in column.
 
         """
-        table = await self.read_table_polars("users")
-        if table.shape[0] == 0:
-            return False
-        return not (
-            table.filter(pl.col(check_col) == check_val).select("user_id").is_empty()
-        )
+        return await self.resolve_user((check_col, check_val)) is not None
 
     async def list_item_names(
         self: Self,
@@ -365,22 +1168,58 @@ class DataBase:
             from that expansion will be listed.
 
         """
-        table = await self.read_table_polars("mounts")
+        mount_index = await self.get_mount_index()
         if expansion is None:
-            return table.select("item_name").to_series().to_list()
-        return (
-            table.filter(pl.col("item_expac") == expansion)
-            .select("item_name")
-            .to_series()
-            .to_list()
-        )
+            return [name for names in mount_index.values() for name in names]
+        return list(mount_index.get(expansion, []))
+
+    async def list_user_names_page(
+        self: Self,
+        after: str = "",
+        limit: int = PAGE_SIZE,
+    ) -> list[str]:
+        """Get one page of user names, sorted by name.
+
+        Parameters
+        ----------
+        after : str
+            Last user name of the previous page. Only names sorting after
+            it are returned, so the first page is fetched with "".
+        limit : int
+            Maximum number of names to return.
+
+        """
+        rows = await self.db_read_qmark(queries.USER_NAMES_PAGE, (after, limit))
+        return [row["user_name"] for row in rows]
+
+    async def list_item_names_page(
+        self: Self,
+        expansion: str,
+        after: str = "",
+        limit: int = PAGE_SIZE,
+    ) -> list[str]:
+        """Get one page of mount names from an expansion, sorted by name.
+
+        Parameters
+        ----------
+        expansion : str
+            Name of the expansion to list mounts from.
+        after : str
+            Last mount name of the previous page. Only names sorting after
+            it are returned, so the first page is fetched with "".
+        limit : int
+            Maximum number of names to return.
+
+        """
+        params = (expansion, after, limit)
+        rows = await self.db_read_qmark(queries.MOUNT_NAMES_PAGE, params)
+        return [row["item_name"] for row in rows]
 
     async def list_expansions(
         self: Self,
     ) -> list[str]:
         """Get list of expansions in a table."""
-        table = await self.read_table_polars("mounts")
-        return table.select("item_expac").to_series().unique().to_list()
+        return list(await self.get_mount_index())
 
     async def list_user_items(
         self: Self,
@@ -424,7 +1263,8 @@ class DataBase:
         self: Self,
         old_name: str,
         new_name: str,
-    ) -> None:
+        expansion: None | str = None,
+    ) -> bool:
         """Edit an item name.
 
         Parameters
@@ -433,19 +1273,44 @@ class DataBase:
             Mount name to change.
         new_name : str
             Mount name to assign.
+        expansion : None | str
+            Expansion of the mount. Needed when several expansions have
+            a mount with this name.
+
+        Returns
+        -------
+        found : bool
+            Whether the mount was found.
+
+        Raises
+        ------
+        ValueError
+            If another mount of the expansion already has the new name,
+            ignoring case and surrounding spaces.
 
         """
-        item_id = await self.get_item_id(old_name)
-        query = "UPDATE mounts SET item_name = ? WHERE item_id = ?"
-        params = (new_name, item_id[0])
-        await self.db_execute_qmark(query, params)
+        item_id = await self.get_item_id(old_name, expansion)
+        if len(item_id) == 0:
+            return False
+        params = (new_name, new_name, item_id[0])
+        try:
+            await self.db_execute_qmark(queries.RENAME_MOUNT, params)
+        except aiosqlite.IntegrityError as error:
+            msg = f"Mount name {new_name} is already taken"
+            raise ValueError(msg) from error
+        self.clear_mount_cache()
+        return True
 
     async def add_new_item(
         self: Self,
         expansion: str,
         name: str,
     ) -> None:
-        """Edit an item name.
+        """Add a mount, with a not owned status row for every user.
+
+        The mount and its status rows are added in one transaction, the
+        rows being seeded from the users table by a single
+        `INSERT ... SELECT` statement whatever the number of users.
 
         Parameters
         ----------
@@ -454,38 +1319,55 @@ class DataBase:
         name : str
             Name of item to add under expansion.
 
+        Raises
+        ------
+        ValueError
+            If a mount of the expansion already has the name, ignoring
+            case and surrounding spaces.
+
         """
         new_mount_row = self.create_item_row(name, expansion)
-        await self.append_to_mount_table(new_mount_row)
-        user_table = await self.read_table_polars("users")
-        new_item_id = await self.get_item_id(name)
-        new_status_rows = user_table.select("user_id")
-        new_status_rows = tuple(
-            new_status_rows.with_columns(
-                item_id=pl.lit(new_item_id[0]),
-                has_item=pl.lit(0),
-            ).to_dicts(),
-        )
-        await self.append_to_status_table(new_status_rows)
+
+        async def apply(db: aiosqlite.Connection) -> None:
+            await db.executemany(queries.INSERT_MOUNT.sql, new_mount_row)
+            await db.executemany(queries.SEED_MOUNT_STATUS.sql, new_mount_row)
+
+        try:
+            await self.db_write(apply)
+        except aiosqlite.IntegrityError as error:
+            msg = f"Mount name {name} is already taken"
+            raise ValueError(msg) from error
+        self.clear_mount_cache()
 
     async def delete_item(
         self: Self,
         name: str,
-    ) -> None:
+        expansion: None | str = None,
+    ) -> bool:
         """Remove mounts from the database.
 
         Parameters
         ----------
         name : str
             Name of mount to delete from the database.
+        expansion : None | str
+            Expansion of the mount. Needed when several expansions have
+            a mount with this name.
+
+        Returns
+        -------
+        found : bool
+            Whether the mount was found.
 
         """
-        item_id = await self.get_item_id(name)
-        params = tuple(item_id)
-        mounts_query = "DELETE FROM mounts WHERE item_id = ?"
-        status_query = "DELETE FROM status WHERE item_id = ?"
-        await self.db_execute_qmark(mounts_query, params)
-        await self.db_execute_qmark(status_query, params)
+        item_id = await self.get_item_id(name, expansion)
+        if len(item_id) == 0:
+            return False
+        # Status rows go first so completion triggers can see their expansion
+        await self.db_execute_qmark(queries.DELETE_MOUNT_STATUS, item_id)
+        await self.db_execute_qmark(queries.DELETE_MOUNT, item_id)
+        self.clear_mount_cache()
+        return True
 
     async def delete_user(self: Self, name: str) -> None:
         """Remove users from the database.
@@ -496,12 +1378,390 @@ class DataBase:
             Name of user to delete from the database.
 
         """
-        user_id = await self.get_user_id(name)
-        params = (user_id,)
-        user_query = "DELETE FROM users WHERE user_id = ?"
-        status_query = "DELETE FROM status WHERE user_id = ?"
-        await self.db_execute_qmark(user_query, params)
-        await self.db_execute_qmark(status_query, params)
+        identity = await self.resolve_user(("user_name", name))
+        if identity is None:
+            return
+        params = (identity.user_id,)
+        await self.db_execute_qmark(queries.DELETE_USER, params)
+        await self.db_execute_qmark(queries.DELETE_USER_STATUS, params)
+        self.identity_cache.remove(identity)
+
+    async def rename_user(self: Self, from_name: str, to_name: str) -> None:
+        """Change the name of a user.
+
+        Parameters
+        ----------
+        from_name : str
+            Name of the user to rename.
+        to_name : str
+            Name to give the user.
+
+        """
+        identity = await self.resolve_user(("user_name", from_name))
+        if identity is None:
+            return
+        await self.db_execute_qmark(queries.RENAME_USER, (to_name, identity.user_id))
+        self.identity_cache.rename(identity, to_name)
+
+    async def find_missing_users(self: Self, user_names: list[str]) -> list[str]:
+        """Get the names from a list that are not in the users table.
+
+        Parameters
+        ----------
+        user_names : list[str]
+            Names of users to look up.
+
+        """
+        params = (json.dumps(user_names),)
+        rows = await self.db_read_qmark(queries.FIND_USER_NAMES, params)
+        found = {row["user_name"] for row in rows}
+        return [name for name in user_names if name not in found]
+
+    async def read_party_status(self: Self, user_names: list[str]) -> pl.DataFrame:
+        """Read the status rows of a group of users.
+
+        Parameters
+        ----------
+        user_names : list[str]
+            Names of the users in the party.
+
+        Returns
+        -------
+        status_table : pl.DataFrame
+            Status rows of the party joined with user and mount names,
+            with columns user_name, item_expac, item_name and has_item.
+
+        """
+        params = (json.dumps(user_names),)
+        rows = await self.db_read_qmark(queries.PARTY_STATUS, params)
+        return pl.DataFrame(
+            rows,
+            schema={
+                "user_name": pl.String,
+                "item_expac": pl.String,
+                "item_name": pl.String,
+                "has_item": pl.Int64,
+            },
+        )
+
+    async def summarize_party_needs(
+        self: Self,
+        user_names: list[str],
+        per_expansion: int = -1,
+    ) -> pl.DataFrame:
+        """Rank the mounts of each expansion by how many party members need them.
+
+        The needs are counted and ranked within each expansion by one
+        query, reading only the party's unmet needs.
+
+        Parameters
+        ----------
+        user_names : list[str]
+            Names of the users in the party.
+        per_expansion : int
+            Number of top ranked mounts to keep per expansion. If
+            negative, every mount needed by a party member is kept.
+
+        Returns
+        -------
+        summary : pl.DataFrame
+            One row per mount needed by at least one party member, with
+            columns item_expac, item_name and need_count. Expansions come
+            in catalog order, and their mounts from most to least needed.
+
+        """
+        if per_expansion < 0:
+            per_expansion = len(await self.get_mount_table())
+        params = (json.dumps(user_names), per_expansion)
+        rows = await self.db_read_qmark(queries.PARTY_NEEDS, params)
+        schema = {
+            "item_expac": pl.String,
+            "item_name": pl.String,
+            "need_count": pl.Int64,
+        }
+        return pl.DataFrame(rows, schema=schema)
+
+    async def get_party_need_masks(
+        self: Self,
+        user_names: list[str],
+    ) -> dict[tuple[str, str], int]:
+        """Get which party members need each mount as bitmasks.
+
+        Parameters
+        ----------
+        user_names : list[str]
+            Names of the users in the party. Bit i of each mask is set
+            when the i-th user needs the mount.
+
+        Returns
+        -------
+        need_masks : dict[tuple[str, str], int]
+            Need bitmask of every mount, keyed by (item_expac, item_name).
+
+        """
+        member_bits = {name: 1 << i for i, name in enumerate(user_names)}
+        status_table = await self.read_party_status(user_names)
+        need_masks = dict.fromkeys(
+            status_table.select(["item_expac", "item_name"]).unique().iter_rows(),
+            0,
+        )
+        needs = status_table.filter(pl.col("has_item") == 0)
+        for user_name, item_expac, item_name, _ in needs.iter_rows():
+            need_masks[item_expac, item_name] |= member_bits[user_name]
+        return need_masks
+
+    async def list_item_needers(
+        self: Self,
+        item_name: str,
+        expansion: None | str = None,
+    ) -> dict[str, list[str]]:
+        """Get the users who still need a mount.
+
+        Parameters
+        ----------
+        item_name : str
+            Name of the mount to check.
+        expansion : None | str
+            If none, checks mounts with this name in every expansion. If
+            string must be the name of an expansion, and only the mount
+            from that expansion is checked.
+
+        Returns
+        -------
+        needers : dict[str, list[str]]
+            Sorted names of the users needing the mount, keyed by the
+            expansion of the mount. Expansions where nobody needs the
+            mount are left out.
+
+        """
+        params = (item_name, expansion, expansion)
+        needers = {}
+        for row in await self.db_read_qmark(queries.ITEM_NEEDERS, params):
+            needers.setdefault(row["item_expac"], []).append(row["user_name"])
+        return needers
+
+    async def compact_status_events(self: Self) -> int:
+        """Roll new status events up into the daily aggregates table.
+
+        Events are added to the per day, user and expansion counts of
+        mounts gained and lost. The last compacted event ID is kept in
+        the meta table, so each event is counted exactly once and raw
+        events are left untouched.
+
+        Returns
+        -------
+        n_events : int
+            Number of events compacted.
+
+        """
+        async with self.connect() as db:
+            db.row_factory = dict_factory
+            cs = await db.execute(queries.GET_META.sql, ("events_compacted_to",))
+            row = await cs.fetchone()
+            start = 0 if row is None else int(row["value"])
+            cs = await db.execute(queries.LAST_EVENT_ID.sql)
+            end = (await cs.fetchone())["event_id"] or 0
+            if end > start:
+                await db.execute(queries.ROLLUP_EVENTS.sql, (start, end))
+                params = ("events_compacted_to", str(end))
+                await db.execute(queries.SET_META.sql, params)
+                await db.commit()
+        if end > start:
+            await self.refresh_replica()
+        return max(end - start, 0)
+
+    async def summarize_weekly_progress(
+        self: Self,
+        user_name: None | str = None,
+        expansion: None | str = None,
+        weeks: int = 8,
+    ) -> pl.DataFrame:
+        """Summarize net mounts gained per week from the daily aggregates.
+
+        Parameters
+        ----------
+        user_name : None | str
+            If none, sums progress over every user. If string, only the
+            progress of the user with this name is summarized.
+        expansion : None | str
+            If none, sums progress over every expansion. If string, only
+            progress on mounts from this expansion is summarized.
+        weeks : int
+            Number of weeks to summarize, ending with the current week.
+
+        Returns
+        -------
+        progress : pl.DataFrame
+            One row per week with any progress, with columns week (date
+            of the week's Monday) and gained, sorted by week.
+
+        """
+        start_offset = f"-{7 * (weeks - 1)} days"
+        params = (start_offset, user_name, user_name, expansion, expansion)
+        rows = await self.db_read_qmark(queries.WEEKLY_PROGRESS, params)
+        return pl.DataFrame(rows, schema={"week": pl.String, "gained": pl.Int64})
+
+    async def list_leaderboard(
+        self: Self,
+        expansion: None | str = None,
+        limit: int = 10,
+    ) -> pl.DataFrame:
+        """Get the users with the highest share of mounts owned.
+
+        Parameters
+        ----------
+        expansion : None | str
+            If none, ranks users by completion over every expansion. If
+            string must be the name of an expansion, and users are ranked
+            by completion of that expansion's mounts.
+        limit : int
+            Number of users to return.
+
+        Returns
+        -------
+        leaderboard : pl.DataFrame
+            Top users with columns user_name, owned and total, sorted by
+            share of mounts owned, then by mounts owned.
+
+        """
+        expansion = ALL_EXPANSIONS if expansion is None else expansion
+        rows = await self.db_read_qmark(queries.LEADERBOARD, (expansion, limit))
+        return pl.DataFrame(
+            rows,
+            schema={"user_name": pl.String, "owned": pl.Int64, "total": pl.Int64},
+        )
+
+    async def import_collections(
+        self: Self,
+        rows: Iterable[CollectionRow],
+        actor: int,
+        chunk_size: None | int = None,
+    ) -> ImportReport:
+        """Import users and the mounts they own in bulk.
+
+        Rows are consumed lazily and applied in chunks, each chunk being
+        one transaction of `executemany` statements. Users are matched
+        by discord ID, and unknown discord IDs are added as new users
+        with a status row for every mount. Mount names are matched to
+        the catalog case-insensitively, and may be qualified with their
+        expansion as `expansion: name`. Names matching mounts of several
+        expansions are reported rather than imported. Matched mounts are
+        marked as owned, with the change logged to the status event log.
+        Mounts are never removed by an import. Rows are read in a worker
+        thread, so parsing large files does not block the event loop.
+
+        Parameters
+        ----------
+        rows : Iterable[CollectionRow]
+            Rows of (discord ID, user name, mount names) to import.
+        actor : int
+            Discord ID of the user running the import.
+        chunk_size : None | int
+            Number of rows applied per transaction. If none, the
+            configured import chunk size.
+
+        """
+        if chunk_size is None:
+            chunk_size = get_config().batch.import_chunk_size
+        report = ImportReport()
+        mount_ids = {}
+        for row in await self.get_mount_table():
+            mount_ids.setdefault(mount_key(row["item_name"]), []).append(row["item_id"])
+            mount_ids[mount_key(row["item_name"], row["item_expac"])] = [row["item_id"]]
+        created_at = datetime.now(UTC).isoformat()
+        chunks = itertools.batched(rows, chunk_size)
+        async with self.connect() as db:
+            db.row_factory = dict_factory
+            while (chunk := await asyncio.to_thread(next, chunks, None)) is not None:
+                await self.import_collections_chunk(
+                    db,
+                    chunk,
+                    mount_ids,
+                    (actor, "admin", created_at),
+                    report,
+                )
+                await db.commit()
+        # Imported users may have been cached as unregistered
+        self.identity_cache.clear()
+        await self.refresh_replica()
+        return report
+
+    async def import_collections_chunk(
+        self: Self,
+        db: aiosqlite.Connection,
+        chunk: tuple[CollectionRow],
+        mount_ids: dict[str, list[str]],
+        event_info: tuple[int, str, str],
+        report: ImportReport,
+    ) -> None:
+        """Apply one chunk of a bulk import on an open connection.
+
+        Parameters
+        ----------
+        db : aiosqlite.Connection
+            Connection the chunk's transaction runs on.
+        chunk : tuple[CollectionRow]
+            Rows of (discord ID, user name, mount names) to import.
+        mount_ids : dict[str, list[str]]
+            Item IDs keyed by normalized mount name, with or without
+            expansion.
+        event_info : tuple[int, str, str]
+            Actor discord ID, actor role and timestamp of status events.
+        report : ImportReport
+            Report updated with the chunk's results.
+
+        """
+        # Merge rows repeating a discord ID within the chunk
+        names, owned = {}, {}
+        for discord_id, name, mount_names in chunk:
+            names.setdefault(discord_id, name)
+            for mount_name in mount_names:
+                item_ids = mount_ids.get(mount_key(mount_name), [])
+                if len(item_ids) == 0:
+                    report.unknown_mounts[mount_name] += 1
+                elif len(item_ids) > 1:
+                    report.ambiguous_mounts[mount_name] += 1
+                else:
+                    owned.setdefault(discord_id, set()).update(item_ids)
+        cs = await db.execute(queries.FIND_USER_IDS.sql, (json.dumps(list(names)),))
+        user_ids = {
+            row["user_discord_id"]: row["user_id"] for row in await cs.fetchall()
+        }
+        report.users_matched += len(user_ids)
+        new_names = {
+            discord_id: name
+            for discord_id, name in names.items()
+            if discord_id not in user_ids
+        }
+        params = (json.dumps(list(new_names.values())),)
+        cs = await db.execute(queries.FIND_USER_NAMES.sql, params)
+        taken_names = {row["user_name"] for row in await cs.fetchall()}
+        new_users = []
+        for discord_id, name in new_names.items():
+            if name in taken_names:
+                report.skipped_names.append(name)
+                continue
+            taken_names.add(name)
+            user_ids[discord_id] = uuid6.uuid7().hex
+            new_users.append((user_ids[discord_id], name, discord_id))
+        await db.executemany(queries.INSERT_USER.sql, new_users)
+        await db.executemany(
+            queries.SEED_USER_STATUS.sql,
+            [(user_id,) for user_id, _, _ in new_users],
+        )
+        report.users_added += len(new_users)
+        pairs = [
+            (user_ids[discord_id], item_id)
+            for discord_id, item_ids in owned.items()
+            if discord_id in user_ids
+            for item_id in item_ids
+        ]
+        await db.executemany(
+            queries.INSERT_OWNED_EVENT.sql,
+            [(*event_info, *pair) for pair in pairs],
+        )
+        cs = await db.executemany(queries.SET_OWNED.sql, pairs)
+        report.mounts_added += cs.rowcount
 
     async def summarize_needed_mounts(self: Self) -> list[str]:
         """Return list summarizing how many users need what."""
@@ -0,0 +1,93 @@
+"""Farm schedule planning over party mount ownership."""
+
+import heapq
+from dataclasses import dataclass
+
+DROP_RATE = 0.1
+
+
+@dataclass(frozen=True)
+class PlannedRun:
+    """A duty scheduled in a farm plan.
+
+    Attributes
+    ----------
+    week : int
+        Week of the plan the duty is run in, starting at 1.
+    item_expac : str
+        Expansion of the mount the duty drops.
+    item_name : str
+        Name of the mount the duty drops.
+    needed_by : int
+        Bitmask of the party members who need the mount, bit i being
+        set for the i-th member.
+    expected_gain : float
+        Expected number of mounts the party gains from this run.
+
+    """
+
+    week: int
+    item_expac: str
+    item_name: str
+    needed_by: int
+    expected_gain: float
+
+
+def plan_farm(
+    need_masks: dict[tuple[str, str], int],
+    runs_per_week: int,
+    weeks: int,
+    drop_rate: float = DROP_RATE,
+) -> list[PlannedRun]:
+    """Schedule duties to maximize the expected mounts gained by a party.
+
+    Every clear of a duty gives each member still needing its mount an
+    independent `drop_rate` chance of obtaining it, and each duty can be
+    run at most once per week. The plan is built as a greedy weighted
+    set cover: the universe is the set of (member, mount) needs, a run
+    covers the needs of its mount weighted by the probability they are
+    still unmet, and each week takes the runs covering the most weight.
+    As all members needing a mount share the same chance of still
+    needing it, a mount's weight is the popcount of its need mask times
+    that chance.
+
+    Parameters
+    ----------
+    need_masks : dict[tuple[str, str], int]
+        Bitmask of the members needing each mount, keyed by the mount's
+        (item_expac, item_name).
+    runs_per_week : int
+        Number of duties the party runs each week.
+    weeks : int
+        Number of weeks to plan for.
+    drop_rate : float
+        Chance that one clear gives a member needing the mount its drop.
+
+    Returns
+    -------
+    plan : list[PlannedRun]
+        Scheduled runs ordered by week, then by expected gain.
+
+    """
+    needers = {mount: mask.bit_count() for mount, mask in need_masks.items() if mask}
+    still_needed = dict.fromkeys(needers, 1.0)
+    plan = []
+    for week in range(1, weeks + 1):
+        picks = heapq.nlargest(
+            runs_per_week,
+            needers,
+            key=lambda mount: needers[mount] * still_needed[mount],
+        )
+        for mount in picks:
+            expected_gain = drop_rate * needers[mount] * still_needed[mount]
+            plan.append(
+                PlannedRun(
+                    week=week,
+                    item_expac=mount[0],
+                    item_name=mount[1],
+                    needed_by=need_masks[mount],
+                    expected_gain=expected_gain,
+                ),
+            )
+            still_needed[mount] *= 1 - drop_rate
+    return plan
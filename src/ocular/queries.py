@@ -0,0 +1,507 @@
+"""Named SQL statements run by the SQLite backend.
+
+Every query and write the bot makes goes through one of the statements
+registered here, so the same SQL text is reused, and hits SQLite's
+prepared statement cache, and every query plan can be audited in one
+place. Statements are generic in the type of their parameters, a tuple
+for qmark placeholders or a dict for named ones. Lists of values are
+passed as one JSON array parameter read with `json_each`, rather than
+as a variable number of placeholders.
+
+Schema statements creating tables, indexes and triggers stay with the
+code creating the schema in `operations`.
+"""
+
+from dataclasses import dataclass, field
+
+# Expansion name of the completion counters over every expansion
+ALL_EXPANSIONS = "*"
+
+# Every registered statement, keyed by name
+STATEMENTS: dict[str, "Statement"] = {}
+
+
+@dataclass(frozen=True)
+class Statement[P: tuple | dict]:
+    """A named SQL statement.
+
+    Attributes
+    ----------
+    name : str
+        Unique name of the statement, used in logs.
+    sql : str
+        SQL text of the statement.
+    scans : tuple[str, ...]
+        Tables the statement is expected to read in full, such as the
+        mounts table when seeding a status row for every mount. Full
+        scans of other tables fail the query plan tests.
+
+    """
+
+    name: str
+    sql: str
+    scans: tuple[str, ...] = field(default=())
+
+
+def statement[P: tuple | dict](
+    name: str,
+    sql: str,
+    scans: tuple[str, ...] = (),
+) -> Statement[P]:
+    """Create and register a statement.
+
+    Raises
+    ------
+    ValueError
+        If a statement with the name is already registered.
+
+    """
+    if name in STATEMENTS:
+        msg = f"Statement {name} is already registered"
+        raise ValueError(msg)
+    STATEMENTS[name] = Statement(name, " ".join(sql.split()), scans)
+    return STATEMENTS[name]
+
+
+# Meta table
+GET_META: Statement[tuple[str]] = statement(
+    "get_meta",
+    "SELECT value FROM meta WHERE key = ?",
+)
+SET_META: Statement[tuple[str, str]] = statement(
+    "set_meta",
+    """
+    INSERT INTO meta(key, value) VALUES(?, ?)
+    ON CONFLICT(key) DO UPDATE SET value = excluded.value
+    """,
+)
+TABLE_EXISTS: Statement[tuple[str]] = statement(
+    "table_exists",
+    "SELECT name FROM sqlite_master WHERE type = 'table' AND name = ?",
+    scans=("sqlite_master",),
+)
+TABLE_COLUMNS: Statement[tuple[str]] = statement(
+    "table_columns",
+    "SELECT name FROM pragma_table_info(?)",
+    scans=("pragma_table_info",),
+)
+
+# Users
+ALL_USERS: Statement[tuple[()]] = statement(
+    "all_users",
+    "SELECT * FROM users",
+    scans=("users",),
+)
+INSERT_USER: Statement[tuple[str, str, int]] = statement(
+    "insert_user",
+    "INSERT INTO users(user_id, user_name, user_discord_id) VALUES(?, ?, ?)",
+)
+REGISTER_USER: Statement[tuple[str, str, int]] = statement(
+    "register_user",
+    """
+    INSERT INTO users(user_id, user_name, user_discord_id) VALUES(?, ?, ?)
+    ON CONFLICT DO NOTHING
+    RETURNING user_id
+    """,
+)
+USER_CONFLICTS: Statement[tuple[str, int]] = statement(
+    "user_conflicts",
+    """
+    SELECT user_name, user_discord_id FROM users
+    WHERE user_name = ? OR user_discord_id = ?
+    """,
+)
+USER_BY_ID: Statement[tuple[str]] = statement(
+    "user_by_id",
+    "SELECT user_id, user_name, user_discord_id FROM users WHERE user_id = ?",
+)
+USER_BY_NAME: Statement[tuple[str]] = statement(
+    "user_by_name",
+    "SELECT user_id, user_name, user_discord_id FROM users WHERE user_name = ?",
+)
+USER_BY_DISCORD_ID: Statement[tuple[int]] = statement(
+    "user_by_discord_id",
+    """
+    SELECT user_id, user_name, user_discord_id FROM users
+    WHERE user_discord_id = ?
+    """,
+)
+USER_NAMES_PAGE: Statement[tuple[str, int]] = statement(
+    "user_names_page",
+    "SELECT user_name FROM users WHERE user_name > ? ORDER BY user_name LIMIT ?",
+)
+FIND_USER_NAMES: Statement[tuple[str]] = statement(
+    "find_user_names",
+    """
+    SELECT user_name FROM users
+    WHERE user_name IN (SELECT value FROM json_each(?))
+    """,
+)
+FIND_USER_IDS: Statement[tuple[str]] = statement(
+    "find_user_ids",
+    """
+    SELECT user_discord_id, user_id FROM users
+    WHERE user_discord_id IN (SELECT value FROM json_each(?))
+    """,
+)
+RESOLVE_USERS: Statement[tuple[str, str]] = statement(
+    "resolve_users",
+    """
+    SELECT user_id, user_name, user_discord_id FROM users
+    WHERE user_name IN (SELECT value FROM json_each(?))
+        OR user_discord_id IN (SELECT value FROM json_each(?))
+    """,
+)
+RENAME_USER: Statement[tuple[str, str]] = statement(
+    "rename_user",
+    "UPDATE users SET user_name = ? WHERE user_id = ?",
+)
+DELETE_USER: Statement[tuple[str]] = statement(
+    "delete_user",
+    "DELETE FROM users WHERE user_id = ?",
+)
+DUPLICATE_USERS: Statement[tuple[()]] = statement(
+    "duplicate_users",
+    """
+    SELECT user_id FROM users
+    WHERE rowid NOT IN (SELECT MIN(rowid) FROM users GROUP BY user_name)
+    OR rowid NOT IN (SELECT MIN(rowid) FROM users GROUP BY user_discord_id)
+    """,
+    scans=("users",),
+)
+
+# Mounts
+ALL_MOUNTS: Statement[tuple[()]] = statement(
+    "all_mounts",
+    "SELECT item_id, item_name, item_expac FROM mounts",
+    scans=("mounts",),
+)
+INSERT_MOUNT: Statement[dict] = statement(
+    "insert_mount",
+    """
+    INSERT INTO mounts(item_id, item_name, item_expac, norm_name)
+    VALUES(:item_id, :item_name, :item_expac, lower(trim(:item_name)))
+    """,
+)
+UPDATE_MOUNT: Statement[dict] = statement(
+    "update_mount",
+    """
+    UPDATE mounts SET
+        item_name = :item_name,
+        item_expac = :item_expac,
+        norm_name = lower(trim(:item_name))
+    WHERE item_id = :item_id
+    """,
+)
+RENAME_MOUNT: Statement[tuple[str, str, str]] = statement(
+    "rename_mount",
+    """
+    UPDATE mounts SET item_name = ?, norm_name = lower(trim(?))
+    WHERE item_id = ?
+    """,
+)
+DELETE_MOUNT: Statement[tuple[str]] = statement(
+    "delete_mount",
+    "DELETE FROM mounts WHERE item_id = ?",
+)
+DUPLICATE_MOUNTS: Statement[tuple[()]] = statement(
+    "duplicate_mounts",
+    """
+    SELECT item_id, kept_id FROM (
+        SELECT item_id, FIRST_VALUE(item_id) OVER (
+            PARTITION BY lower(trim(item_name)), item_expac ORDER BY rowid
+        ) AS kept_id
+        FROM mounts
+    )
+    WHERE item_id != kept_id
+    """,
+    scans=("mounts",),
+)
+MOUNT_BY_NAME: Statement[tuple[str, str]] = statement(
+    "mount_by_name",
+    """
+    SELECT item_id, item_name, item_expac FROM mounts
+    WHERE item_expac = ? AND norm_name = lower(trim(?))
+    """,
+)
+MOUNTS_BY_NAME: Statement[tuple[str]] = statement(
+    "mounts_by_name",
+    """
+    SELECT item_id, item_name, item_expac FROM mounts
+    WHERE norm_name = lower(trim(?))
+    """,
+)
+BACKFILL_NORM_NAMES: Statement[tuple[()]] = statement(
+    "backfill_norm_names",
+    "UPDATE mounts SET norm_name = lower(trim(item_name)) WHERE norm_name IS NULL",
+    scans=("mounts",),
+)
+MOUNT_NAMES_PAGE: Statement[tuple[str, str, int]] = statement(
+    "mount_names_page",
+    """
+    SELECT item_name FROM mounts
+    WHERE item_expac = ? AND item_name > ?
+    ORDER BY item_name
+    LIMIT ?
+    """,
+)
+
+# Statuses
+ALL_STATUS: Statement[tuple[()]] = statement(
+    "all_status",
+    "SELECT * FROM status",
+    scans=("status",),
+)
+INSERT_STATUS: Statement[dict] = statement(
+    "insert_status",
+    """
+    INSERT INTO status(user_id, item_id, has_item)
+    VALUES(:user_id, :item_id, :has_item)
+    """,
+)
+SEED_USER_STATUS: Statement[tuple[str]] = statement(
+    "seed_user_status",
+    "INSERT INTO status(user_id, item_id, has_item) SELECT ?, item_id, 0 FROM mounts",
+    scans=("mounts",),
+)
+SEED_DISCORD_USER_STATUS: Statement[tuple[int]] = statement(
+    "seed_discord_user_status",
+    """
+    INSERT INTO status(user_id, item_id, has_item)
+    SELECT users.user_id, mounts.item_id, 0
+    FROM users CROSS JOIN mounts
+    WHERE users.user_discord_id = ?
+    """,
+    scans=("mounts",),
+)
+SEED_MOUNT_STATUS: Statement[dict] = statement(
+    "seed_mount_status",
+    """
+    INSERT INTO status(user_id, item_id, has_item)
+    SELECT user_id, :item_id, 0 FROM users
+    """,
+    scans=("users",),
+)
+SET_STATUS: Statement[tuple[int, str, str, int]] = statement(
+    "set_status",
+    """
+    UPDATE status SET has_item = ?
+    WHERE user_id = ? AND item_id = ? AND has_item != ?
+    """,
+)
+SET_OWNED: Statement[tuple[str, str]] = statement(
+    "set_owned",
+    "UPDATE status SET has_item = 1 WHERE user_id = ? AND item_id = ? AND has_item = 0",
+)
+SET_EXPANSION_STATUS: Statement[tuple[int, str, int, str]] = statement(
+    "set_expansion_status",
+    """
+    UPDATE status SET has_item = ?
+    WHERE user_id = ? AND has_item != ?
+        AND item_id IN (SELECT item_id FROM mounts WHERE item_expac = ?)
+    """,
+)
+DELETE_USER_STATUS: Statement[tuple[str]] = statement(
+    "delete_user_status",
+    "DELETE FROM status WHERE user_id = ?",
+)
+DELETE_MOUNT_STATUS: Statement[tuple[str]] = statement(
+    "delete_mount_status",
+    "DELETE FROM status WHERE item_id = ?",
+    # Only the partial index of needs leads with item_id
+    scans=("status",),
+)
+MERGE_MOUNT_STATUS: Statement[dict] = statement(
+    "merge_mount_status",
+    """
+    UPDATE status SET has_item = 1
+    WHERE item_id = :kept_id AND has_item = 0 AND EXISTS (
+        SELECT 1 FROM status AS duplicate
+        WHERE duplicate.user_id = status.user_id
+            AND duplicate.item_id = :item_id
+            AND duplicate.has_item = 1
+    )
+    """,
+)
+PARTY_STATUS: Statement[tuple[str]] = statement(
+    "party_status",
+    """
+    SELECT users.user_name, mounts.item_expac, mounts.item_name, status.has_item
+    FROM users
+    JOIN status ON status.user_id = users.user_id
+    JOIN mounts ON mounts.item_id = status.item_id
+    WHERE users.user_name IN (SELECT value FROM json_each(?))
+    """,
+)
+PARTY_NEEDS: Statement[tuple[str, int]] = statement(
+    "party_needs",
+    """
+    SELECT item_expac, item_name, need_count FROM (
+        SELECT
+            mounts.item_expac,
+            mounts.item_name,
+            COUNT(*) AS need_count,
+            ROW_NUMBER() OVER (
+                PARTITION BY mounts.item_expac
+                ORDER BY COUNT(*) DESC, MIN(mounts.rowid)
+            ) AS expac_rank,
+            MIN(MIN(mounts.rowid)) OVER (
+                PARTITION BY mounts.item_expac
+            ) AS expac_order
+        FROM users
+        JOIN status ON status.user_id = users.user_id AND status.has_item = 0
+        JOIN mounts ON mounts.item_id = status.item_id
+        WHERE users.user_name IN (SELECT value FROM json_each(?))
+        GROUP BY mounts.item_id
+    )
+    WHERE expac_rank <= ?
+    ORDER BY expac_order, expac_rank
+    """,
+)
+ITEM_NEEDERS: Statement[tuple[str, None | str, None | str]] = statement(
+    "item_needers",
+    """
+    SELECT mounts.item_expac, users.user_name
+    FROM mounts
+    JOIN status ON status.item_id = mounts.item_id AND status.has_item = 0
+    JOIN users ON users.user_id = status.user_id
+    WHERE mounts.norm_name = lower(trim(?)) AND (? IS NULL OR mounts.item_expac = ?)
+    ORDER BY mounts.item_expac, users.user_name
+    """,
+)
+
+# Status events and aggregates
+INSERT_STATUS_EVENT: Statement[tuple[str, str, int, int, str, str]] = statement(
+    "insert_status_event",
+    """
+    INSERT INTO status_events(
+        user_id, item_id, has_item, actor_discord_id, actor_role, created_at
+    )
+    VALUES(?, ?, ?, ?, ?, ?)
+    """,
+)
+INSERT_OWNED_EVENT: Statement[tuple[int, str, str, str, str]] = statement(
+    "insert_owned_event",
+    """
+    INSERT INTO status_events(
+        user_id, item_id, has_item, actor_discord_id, actor_role, created_at
+    )
+    SELECT user_id, item_id, 1, ?, ?, ? FROM status
+    WHERE user_id = ? AND item_id = ? AND has_item = 0
+    """,
+)
+INSERT_EXPANSION_EVENTS: Statement[
+    tuple[int, int, str, str, str, int, str]
+] = statement(
+    "insert_expansion_events",
+    """
+    INSERT INTO status_events(
+        user_id, item_id, has_item, actor_discord_id, actor_role, created_at
+    )
+    SELECT user_id, item_id, ?, ?, ?, ? FROM status
+    WHERE user_id = ? AND has_item != ?
+        AND item_id IN (SELECT item_id FROM mounts WHERE item_expac = ?)
+    """,
+)
+INSERT_CHANGE_EVENT: Statement[tuple[int, int, str, str, str, str, int]] = statement(
+    "insert_change_event",
+    """
+    INSERT INTO status_events(
+        user_id, item_id, has_item, actor_discord_id, actor_role, created_at
+    )
+    SELECT user_id, item_id, ?, ?, ?, ? FROM status
+    WHERE user_id = ? AND item_id = ? AND has_item != ?
+    """,
+)
+ALL_STATUS_EVENTS: Statement[tuple[()]] = statement(
+    "all_status_events",
+    "SELECT * FROM status_events ORDER BY event_id",
+    scans=("status_events",),
+)
+LAST_EVENT_ID: Statement[tuple[()]] = statement(
+    "last_event_id",
+    "SELECT MAX(event_id) AS event_id FROM status_events",
+)
+ROLLUP_EVENTS: Statement[tuple[int, int]] = statement(
+    "rollup_events",
+    """
+    INSERT INTO status_daily(day, user_id, item_expac, gained, lost)
+    SELECT
+        date(status_events.created_at),
+        status_events.user_id,
+        COALESCE(mounts.item_expac, 'deleted'),
+        SUM(status_events.has_item = 1),
+        SUM(status_events.has_item = 0)
+    FROM status_events
+    LEFT JOIN mounts ON mounts.item_id = status_events.item_id
+    WHERE status_events.event_id > ? AND status_events.event_id <= ?
+    GROUP BY 1, 2, 3
+    ON CONFLICT(day, user_id, item_expac) DO UPDATE SET
+        gained = gained + excluded.gained,
+        lost = lost + excluded.lost
+    """,
+)
+type OptionalName = None | str
+WEEKLY_PROGRESS: Statement[
+    tuple[str, OptionalName, OptionalName, OptionalName, OptionalName]
+] = statement(
+    "weekly_progress",
+    """
+    SELECT
+        date(status_daily.day, '-6 days', 'weekday 1') AS week,
+        SUM(status_daily.gained) - SUM(status_daily.lost) AS gained
+    FROM status_daily
+    LEFT JOIN users ON users.user_id = status_daily.user_id
+    WHERE status_daily.day >= date('now', '-6 days', 'weekday 1', ?)
+        AND (? IS NULL OR users.user_name = ?)
+        AND (? IS NULL OR status_daily.item_expac = ?)
+    GROUP BY week
+    ORDER BY week
+    """,
+)
+
+# Completion counters
+BACKFILL_COMPLETION: Statement[tuple[()]] = statement(
+    "backfill_completion",
+    f"""
+    INSERT INTO completion(user_id, item_expac, owned, total)
+    SELECT status.user_id, mounts.item_expac, SUM(status.has_item), COUNT(*)
+    FROM status JOIN mounts ON mounts.item_id = status.item_id
+    GROUP BY status.user_id, mounts.item_expac
+    UNION ALL
+    SELECT user_id, '{ALL_EXPANSIONS}', SUM(has_item), COUNT(*)
+    FROM status
+    GROUP BY user_id
+    """,  # noqa: S608
+    scans=("status",),
+)
+LEADERBOARD: Statement[tuple[str, int]] = statement(
+    "leaderboard",
+    """
+    SELECT users.user_name, completion.owned, completion.total
+    FROM completion
+    JOIN users ON users.user_id = completion.user_id
+    WHERE completion.item_expac = ? AND completion.total > 0
+    ORDER BY
+        completion.owned * 1.0 / completion.total DESC,
+        completion.owned DESC
+    LIMIT ?
+    """,
+)
+
+# Exports
+EXPORT_MOUNTS: Statement[tuple[()]] = statement(
+    "export_mounts",
+    "SELECT item_id, item_expac, item_name FROM mounts",
+    scans=("mounts",),
+)
+EXPORT_OWNERSHIP: Statement[tuple[()]] = statement(
+    "export_ownership",
+    """
+    SELECT users.user_id, users.user_name, status.item_id, status.has_item
+    FROM users
+    JOIN status ON status.user_id = users.user_id
+    ORDER BY users.user_id
+    """,
+    scans=("users",),
+)
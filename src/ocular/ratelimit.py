@@ -0,0 +1,158 @@
+"""Per user and per guild rate limits, and a cap on concurrent heavy commands."""
+
+import time
+from collections import Counter
+from dataclasses import dataclass, field
+from typing import Literal, Self
+
+from src.ocular import metrics
+from src.ocular.config import get_config
+
+type Rejection = Literal["user", "guild", "busy"]
+
+REJECTION_MESSAGES: dict[Rejection, str] = {
+    "user": "You're sending commands too quickly, please wait a few seconds.",
+    "guild": "This server is sending commands too quickly, please wait a few seconds.",
+    "busy": "Ocular is busy with other requests, please try again in a minute.",
+}
+# Number of buckets kept before idle ones are dropped
+MAX_BUCKETS = 10000
+
+
+@dataclass
+class TokenBucket:
+    """Bucket refilled with tokens at a steady rate, up to its burst size.
+
+    Attributes
+    ----------
+    rate : float
+        Tokens added per second.
+    burst : int
+        Maximum number of tokens held.
+    tokens : float
+        Tokens currently held.
+    updated : float
+        Monotonic time the tokens were last refilled.
+
+    """
+
+    rate: float
+    burst: int
+    tokens: float = -1
+    updated: float = field(default_factory=time.monotonic)
+
+    def __post_init__(self: Self) -> None:
+        """Start full."""
+        if self.tokens < 0:
+            self.tokens = self.burst
+
+    def refill(self: Self, now: float) -> None:
+        """Add the tokens accrued since the last refill."""
+        self.tokens = min(self.burst, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def take(self: Self) -> bool:
+        """Take a token, returning whether one was available."""
+        self.refill(time.monotonic())
+        if self.tokens < 1:
+            return False
+        self.tokens -= 1
+        return True
+
+
+class AdmissionControl:
+    """Decides which commands run, shedding load when users flood the bot.
+
+    Each user and each guild has a token bucket, so bursts are allowed
+    but a sustained flood is turned away. Commands listed as heavy in
+    the configuration also share a fixed number of slots, so slow scans
+    of the database cannot all run at once. Rejections are counted in
+    `metrics` by reason and command.
+    """
+
+    def __init__(self: Self) -> None:
+        """Create admission control with no buckets and no heavy commands."""
+        self.buckets: dict[tuple[str, int], TokenBucket] = {}
+        # Heavy slots held, by command
+        self.heavy_running: Counter[str] = Counter()
+
+    def take(self: Self, scope: str, key: int, rate: float, burst: int) -> bool:
+        """Take a token from the bucket of a user or guild."""
+        if len(self.buckets) >= MAX_BUCKETS:
+            self.prune()
+        bucket = self.buckets.get((scope, key))
+        if bucket is None:
+            bucket = self.buckets[scope, key] = TokenBucket(rate, burst)
+        bucket.rate = rate
+        bucket.burst = burst
+        return bucket.take()
+
+    def prune(self: Self) -> None:
+        """Drop buckets that have refilled, as new ones start full anyway."""
+        now = time.monotonic()
+        for key, bucket in list(self.buckets.items()):
+            bucket.refill(now)
+            if bucket.tokens >= bucket.burst:
+                del self.buckets[key]
+
+    def admit(
+        self: Self,
+        command: str,
+        user_id: int,
+        guild_id: None | int,
+    ) -> None | Rejection:
+        """Check if a command may run, taking a heavy slot if it needs one.
+
+        Parameters
+        ----------
+        command : str
+            Name of the command.
+        user_id : int
+            Discord ID of the invoking user.
+        guild_id : None | int
+            ID of the guild the command is run in, none in direct messages.
+
+        Returns
+        -------
+        rejection : None | Rejection
+            None if the command may run, and `release` must be called
+            once it finishes, otherwise why it was turned away.
+
+        """
+        config = get_config().limits
+        rejection = None
+        if not self.take("user", user_id, config.user_rate, config.user_burst):
+            rejection = "user"
+        elif guild_id is not None and not self.take(
+            "guild",
+            guild_id,
+            config.guild_rate,
+            config.guild_burst,
+        ):
+            rejection = "guild"
+        elif command in config.heavy_commands:
+            if self.heavy_running.total() >= config.heavy_concurrency:
+                rejection = "busy"
+            else:
+                self.heavy_running[command] += 1
+        if rejection is not None:
+            metrics.increment(f"rejected_{rejection}", command)
+        return rejection
+
+    def release(self: Self, command: str) -> None:
+        """Free the heavy slot taken by a command that was admitted."""
+        if self.heavy_running[command] > 0:
+            self.heavy_running[command] -= 1
+
+    def admit_autocomplete(self: Self, command: str, user_id: int) -> bool:
+        """Check if an autocomplete request may be answered."""
+        config = get_config().limits
+        admitted = self.take(
+            "autocomplete",
+            user_id,
+            config.autocomplete_rate,
+            config.autocomplete_burst,
+        )
+        if not admitted:
+            metrics.increment("rejected_autocomplete", command)
+        return admitted
@@ -0,0 +1,375 @@
+"""Storage interface implemented by the bot's database backends."""
+
+from __future__ import annotations
+
+from abc import ABC, abstractmethod
+from typing import TYPE_CHECKING, Literal, Self
+
+from src.ocular.config import get_config
+
+if TYPE_CHECKING:
+    from collections.abc import Iterable
+
+    import polars as pl
+
+    from src.ocular.identity import Identity
+
+PAGE_SIZE = 25
+
+type StorageBackend = Literal["sqlite", "memory", "duckdb"]
+type Registration = Literal["added", "registered", "name_taken", "id_taken"]
+
+
+class Storage(ABC):
+    """Operations on users, mounts and ownership used by the bot's cogs.
+
+    Users are identified by name or discord ID, and mounts by name and
+    expansion. Every user has an ownership status for every mount, which
+    starts as not owned.
+    """
+
+    db_path: str
+    catalog_path: str
+
+    @abstractmethod
+    async def init_tables(self: Self) -> None:
+        """Create the storage if needed and load the mount catalog."""
+
+    @abstractmethod
+    async def register_user(self: Self, name: str, discord_id: int) -> Registration:
+        """Add a user with a not owned status of every mount, atomically.
+
+        Returns whether the user was added, was already registered with
+        this name and discord ID, or conflicts with another user's name
+        or discord ID.
+        """
+
+    @abstractmethod
+    async def append_new_user(self: Self, name: str, discord_id: int) -> None:
+        """Add a user, without any mount statuses."""
+
+    @abstractmethod
+    async def append_new_status(self: Self, discord_id: int) -> None:
+        """Add a not owned status of every mount for a new user."""
+
+    @abstractmethod
+    async def check_user_exists(
+        self: Self,
+        check_col: Literal["user_name", "user_id", "user_discord_id"],
+        check_val: str | int,
+    ) -> bool:
+        """Check if a user with the given value in a column exists."""
+
+    @abstractmethod
+    async def get_user_from_discord_id(self: Self, discord_id: int) -> str:
+        """Get the ID of the user with a discord ID."""
+
+    @abstractmethod
+    async def get_user_discord_id(self: Self, user_name: str) -> list[int]:
+        """Get the discord ID of a user as a list, empty if there is none."""
+
+    @abstractmethod
+    async def resolve_users(
+        self: Self,
+        user_names: Iterable[str] = (),
+        discord_ids: Iterable[int] = (),
+    ) -> list[Identity]:
+        """Find the users matching any of several names or discord IDs.
+
+        Returns each user found once, leaving out names and discord IDs
+        matching no user.
+        """
+
+    @abstractmethod
+    async def find_items(
+        self: Self,
+        item_name: str,
+        expansion: None | str = None,
+    ) -> tuple[dict]:
+        """Find mounts by name, within `expansion` if given.
+
+        Names are matched ignoring case and surrounding spaces. Returns
+        rows with item_id, item_name and item_expac keys, sorted by
+        expansion.
+        """
+
+    @abstractmethod
+    async def get_item_id(
+        self: Self,
+        item_name: str,
+        expansion: None | str = None,
+    ) -> tuple[str, ...]:
+        """Get the ID of a mount as a tuple, empty if there is none.
+
+        Names are matched ignoring case and surrounding spaces, within
+        `expansion` if given.
+
+        Raises
+        ------
+        ValueError
+            If several mounts have the name.
+
+        """
+
+    @abstractmethod
+    async def list_item_names(self: Self, expansion: None | str = None) -> list[str]:
+        """List mount names, of all expansions or only of one."""
+
+    @abstractmethod
+    async def list_user_names_page(
+        self: Self,
+        after: str = "",
+        limit: int = PAGE_SIZE,
+    ) -> list[str]:
+        """Get up to `limit` user names sorting after `after`, sorted by name."""
+
+    @abstractmethod
+    async def list_item_names_page(
+        self: Self,
+        expansion: str,
+        after: str = "",
+        limit: int = PAGE_SIZE,
+    ) -> list[str]:
+        """Get up to `limit` mount names of an expansion sorting after `after`.
+
+        Names are sorted, so the first page is fetched with "".
+        """
+
+    @abstractmethod
+    async def list_expansions(self: Self) -> list[str]:
+        """List the expansions that have mounts."""
+
+    @abstractmethod
+    async def list_user_items(
+        self: Self,
+        user: int,
+        check_type: Literal["has", "needs"],
+        expansion: str,
+    ) -> list[str]:
+        """List the mounts of an expansion a user has or needs.
+
+        Returns `["none"]` rather than an empty list.
+        """
+
+    @abstractmethod
+    async def update_user_items(
+        self: Self,
+        action: Literal["add", "remove"],
+        user: int,
+        item_names: str,
+        actor: None | int = None,
+        expansion: None | str = None,
+    ) -> bool:
+        """Mark a mount as owned or not owned by the user with a discord ID.
+
+        Returns whether the mount was found.
+        """
+
+    @abstractmethod
+    async def update_user_expansion(
+        self: Self,
+        action: Literal["add", "remove"],
+        user: int,
+        expansion: str,
+        actor: None | int = None,
+    ) -> int:
+        """Mark every mount of an expansion as owned or not owned by a user.
+
+        Returns the number of mounts whose status changed.
+        """
+
+    @abstractmethod
+    async def update_users_item(
+        self: Self,
+        action: Literal["add", "remove"],
+        users: Iterable[Identity],
+        item_id: str,
+        actor: int,
+    ) -> int:
+        """Mark a mount as owned or not owned by several users at once.
+
+        Returns the number of users whose status changed.
+        """
+
+    @abstractmethod
+    async def add_new_item(self: Self, expansion: str, name: str) -> None:
+        """Add a mount, not owned by any user.
+
+        Raises
+        ------
+        ValueError
+            If a mount of the expansion already has the name, ignoring
+            case and surrounding spaces.
+
+        """
+
+    @abstractmethod
+    async def edit_item_name(
+        self: Self,
+        old_name: str,
+        new_name: str,
+        expansion: None | str = None,
+    ) -> bool:
+        """Rename a mount, returning whether it was found.
+
+        Raises
+        ------
+        ValueError
+            If another mount of the expansion already has the new name,
+            ignoring case and surrounding spaces.
+
+        """
+
+    @abstractmethod
+    async def delete_item(self: Self, name: str, expansion: None | str = None) -> bool:
+        """Delete a mount and its statuses, returning whether it was found."""
+
+    @abstractmethod
+    async def delete_user(self: Self, name: str) -> None:
+        """Delete a user and their statuses."""
+
+    @abstractmethod
+    async def rename_user(self: Self, from_name: str, to_name: str) -> None:
+        """Change the name of a user, doing nothing if there is none."""
+
+    @abstractmethod
+    async def find_missing_users(self: Self, user_names: list[str]) -> list[str]:
+        """Get the names from a list that are not users."""
+
+    @abstractmethod
+    async def get_party_need_masks(
+        self: Self,
+        user_names: list[str],
+    ) -> dict[tuple[str, str], int]:
+        """Get need bitmasks of a party keyed by (item_expac, item_name).
+
+        Bit i of each mask is set when the i-th user needs the mount.
+        """
+
+    @abstractmethod
+    async def summarize_needed_mounts(self: Self) -> pl.DataFrame:
+        """Count the users needing each mount.
+
+        Returns a frame with columns item_expac, item_name and
+        need_count, sorted from most to least needed.
+        """
+
+    @abstractmethod
+    async def summarize_party_needs(
+        self: Self,
+        user_names: list[str],
+        per_expansion: int = -1,
+    ) -> pl.DataFrame:
+        """Rank the mounts of each expansion by how many party members need them.
+
+        Returns a frame with columns item_expac, item_name and
+        need_count, holding the top `per_expansion` mounts needed by a
+        member in each expansion, or all of them if negative. Expansions
+        come in catalog order, and their mounts from most to least
+        needed, then in catalog order.
+        """
+
+    @abstractmethod
+    async def list_item_needers(
+        self: Self,
+        item_name: str,
+        expansion: None | str = None,
+    ) -> dict[str, list[str]]:
+        """Get the sorted names of the users needing a mount, by expansion.
+
+        Expansions come sorted by name, and expansions where nobody
+        needs the mount are left out.
+        """
+
+    @abstractmethod
+    async def summarize_weekly_progress(
+        self: Self,
+        user_name: None | str = None,
+        expansion: None | str = None,
+        weeks: int = 8,
+    ) -> pl.DataFrame:
+        """Summarize net mounts gained per week, ending with the current week.
+
+        Returns a frame with columns week (date of the week's Monday)
+        and gained, with one row per week with any progress, sorted by
+        week. Progress is summed over every user and expansion unless
+        `user_name` or `expansion` is given.
+        """
+
+    @abstractmethod
+    async def list_leaderboard(
+        self: Self,
+        expansion: None | str = None,
+        limit: int = 10,
+    ) -> pl.DataFrame:
+        """Get the `limit` users with the highest share of mounts owned.
+
+        Returns a frame with columns user_name, owned and total, sorted
+        by share of mounts owned, then by mounts owned, over every
+        expansion or only `expansion`. Users with no mounts to own are
+        left out.
+        """
+
+    async def compact_status_events(self: Self) -> int:
+        """Roll new status events up into aggregates, returning their number.
+
+        Backends summarizing progress straight from their events have
+        nothing to compact.
+        """
+        return 0
+
+    async def warm_caches(self: Self) -> None:  # noqa: B027
+        """Load caches ahead of first use, for backends that have any."""
+
+    async def close(self: Self) -> None:  # noqa: B027
+        """Release connections and flush writes on shutdown."""
+
+
+def open_storage(backend: None | StorageBackend = None) -> Storage:
+    """Create a storage backend with the configured paths.
+
+    Parameters
+    ----------
+    backend : None | StorageBackend
+        Backend to create, the configured one if none. SQLite is the
+        bot's default, memory keeps everything in dicts and bitsets and
+        is lost on exit, and DuckDB needs the optional duckdb
+        dependency.
+
+    """
+    if backend is None:
+        backend = get_config().database.backend
+    # Backends import this module, so they are imported on demand
+    if backend == "sqlite":
+        from src.ocular.operations import DataBase  # noqa: PLC0415
+
+        return DataBase()
+    if backend == "memory":
+        from src.ocular.memory import MemoryStorage  # noqa: PLC0415
+
+        return MemoryStorage()
+    if backend == "duckdb":
+        from src.ocular.duckdb_storage import DuckDBStorage  # noqa: PLC0415
+
+        return DuckDBStorage()
+    msg = "backend must be one of ['sqlite', 'memory', 'duckdb']"
+    raise ValueError(msg)
+
+
+
+# Backends holding their data or connection, shared by every caller
+shared_storage: dict[str, Storage] = {}
+
+
+def get_storage() -> Storage:
+    """Get the storage backend set in the config, as used by the cogs.
+
+    SQLite keeps its caches per database path, so a new `DataBase` is
+    created per call. Memory and DuckDB backends are created once.
+    """
+    backend = get_config().database.backend
+    if backend == "sqlite":
+        return open_storage(backend)
+    if backend not in shared_storage:
+        shared_storage[backend] = open_storage(backend)
+    return shared_storage[backend]
@@ -0,0 +1,86 @@
+"""Interactive views shared by the bot's cogs."""
+
+from collections.abc import Awaitable, Callable
+from typing import Self
+
+import discord
+
+from src.ocular.storage import PAGE_SIZE
+
+
+class KeysetPaginator(discord.ui.View):
+    """Embed view paging through a sorted list of names.
+
+    Pages are fetched on demand with keyset pagination: each page is
+    requested with the last name of the page before it, so the cost of a
+    page does not depend on how far into the list it is.
+    """
+
+    def __init__(
+        self: Self,
+        title: str,
+        description: str,
+        fetch_page: Callable[[str, int], Awaitable[list[str]]],
+    ) -> None:
+        """Page through names returned by a keyset query.
+
+        Parameters
+        ----------
+        title : str
+            Title of the embed.
+        description : str
+            Text shown above the list of names.
+        fetch_page : Callable[[str, int], Awaitable[list[str]]]
+            Coroutine function taking the last name of the previous page
+            and a row limit, returning the next names in sort order.
+
+        """
+        super().__init__(timeout=90, disable_on_timeout=True)
+        self.title = title
+        self.description = description
+        self.fetch_page = fetch_page
+        # Key each visited page starts after, so going back is one query
+        self.page_keys = [""]
+        self.names = []
+
+    async def load_page(self: Self) -> discord.Embed:
+        """Fetch the current page and return its embed."""
+        # Fetch one extra row to know if there is a next page
+        names = await self.fetch_page(self.page_keys[-1], PAGE_SIZE + 1)
+        self.names = names[:PAGE_SIZE]
+        self.previous_page.disabled = len(self.page_keys) == 1
+        self.next_page.disabled = len(names) <= PAGE_SIZE
+        return self.build_embed()
+
+    def build_embed(self: Self) -> discord.Embed:
+        """Build the embed for the current page."""
+        names = self.names if len(self.names) != 0 else ["none"]
+        embed = discord.Embed(
+            title=self.title,
+            description=f"{self.description} \n - {'\n - '.join(names)}",
+            color=discord.Colour.blue(),
+        )
+        embed.set_footer(text=f"Page {len(self.page_keys)}")
+        return embed
+
+    @discord.ui.button(label="Previous", style=discord.ButtonStyle.secondary)
+    async def previous_page(
+        self: Self,
+        button: discord.ui.Button,  # noqa: ARG002
+        interaction: discord.Interaction,
+    ) -> None:
+        """Show the previous page."""
+        self.page_keys.pop()
+        embed = await self.load_page()
+        await interaction.response.edit_message(embed=embed, view=self)
+
+    @discord.ui.button(label="Next", style=discord.ButtonStyle.secondary)
+    async def next_page(
+        self: Self,
+        button: discord.ui.Button,  # noqa: ARG002
+        interaction: discord.Interaction,
+    ) -> None:
+        """Show the next page."""
+        self.page_keys.append(self.names[-1])
+        embed = await self.load_page()
+        await interaction.response.edit_message(embed=embed, view=self)
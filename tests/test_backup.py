@@ -0,0 +1,77 @@
+"""Tests for the ocular bot's database backups."""
+import asyncio
+import sqlite3
+from pathlib import Path
+from typing import Self
+
+import pytest
+
+from src.ocular import backup
+from src.ocular.backup import backup_database
+from src.ocular.operations import DataBase
+
+
+class TestBackup:
+    """Class with test methods for database backups."""
+
+    @pytest.mark.asyncio
+    async def test_backup_database(self: Self, tmp_path: Path) -> None:
+        """Test backups copy the database and rotate old copies."""
+        database = DataBase()
+        database.db_path = tmp_path.joinpath("bot.db")
+        await database.init_tables()
+        await database.append_new_user(name="a", discord_id=0)
+        await database.append_new_status(discord_id=0)
+        await database.update_user_items("add", 0, "ifrit")
+        backup_dir = tmp_path.joinpath("backups")
+        paths = [
+            await backup_database(database.db_path, backup_dir, pages=1, retain=2)
+            for _ in range(3)
+        ]
+        assert sorted(backup_dir.iterdir()) == paths[1:]
+        with sqlite3.connect(paths[-1]) as db:
+            owned = db.execute("SELECT SUM(has_item) FROM status").fetchone()[0]
+        assert owned == 1
+
+    @pytest.mark.asyncio
+    async def test_backup_during_writes(self: Self, tmp_path: Path) -> None:
+        """Test backups finish while writes land between their steps."""
+        database = DataBase()
+        database.db_path = tmp_path.joinpath("bot.db")
+        await database.init_tables()
+        await database.append_new_user(name="a", discord_id=0)
+        await database.append_new_status(discord_id=0)
+        mounts = await database.list_item_names()
+
+        async def write() -> None:
+            for name in mounts:
+                await database.update_user_items("add", 0, name)
+
+        backup_path, _ = await asyncio.wait_for(
+            asyncio.gather(
+                backup_database(database.db_path, pages=1, pause=0),
+                write(),
+            ),
+            timeout=30,
+        )
+        assert backup_path.exists()
+
+    @pytest.mark.asyncio
+    async def test_failed_backup_cleanup(
+        self: Self,
+        tmp_path: Path,
+        monkeypatch: pytest.MonkeyPatch,
+    ) -> None:
+        """Test a backup failing its integrity check leaves no files behind."""
+        database = DataBase()
+        database.db_path = tmp_path.joinpath("bot.db")
+        await database.init_tables()
+
+        async def corrupt(path: Path) -> list[str]:  # noqa: ARG001
+            return ["page 1 is never used"]
+
+        monkeypatch.setattr(backup, "check_integrity", corrupt)
+        backup_dir = tmp_path.joinpath("backups")
+        with pytest.raises(sqlite3.DatabaseError, match="integrity"):
+            await backup_database(database.db_path, backup_dir)
+        assert list(backup_dir.iterdir()) == []
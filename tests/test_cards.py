@@ -0,0 +1,63 @@
+"""Tests for the ocular bot's progress cards."""
+import asyncio
+from dataclasses import replace
+from pathlib import Path
+from typing import Self
+
+import pytest
+
+from src.ocular.cards import CardRenderer, card_key, render_card
+from src.ocular.config import CacheConfig, ConfigStore, get_config
+
+pytest.importorskip("PIL")
+
+CELLS = [("ifrit", True), ("titan", False), ("garuda", True)]
+
+
+@pytest.fixture(autouse=True)
+def card_cache(monkeypatch: pytest.MonkeyPatch, tmp_path: Path) -> Path:
+    """Cache cards under a temporary directory, one card in memory."""
+    card_dir = tmp_path.joinpath("cards")
+    cache = CacheConfig(card_size=1, card_dir=str(card_dir), card_files=2)
+    monkeypatch.setattr(ConfigStore, "current", replace(get_config(), cache=cache))
+    return card_dir
+
+
+class TestCards:
+    """Class with test methods for progress cards."""
+
+    def test_card_key(self: Self) -> None:
+        """Test cards are keyed by the ownership state they show."""
+        key = card_key("a realm reborn", CELLS)
+        assert key == card_key("a realm reborn", list(CELLS))
+        assert key != card_key("heavensward", CELLS)
+        assert key != card_key("a realm reborn", [*CELLS[:2], ("garuda", False)])
+
+    def test_render_card(self: Self) -> None:
+        """Test cards render as PNG images, long names included."""
+        card = render_card("A Realm Reborn mounts", [*CELLS, ("x" * 200, False)])
+        assert card.startswith(b"\x89PNG")
+        assert render_card("Empty", []).startswith(b"\x89PNG")
+
+    @pytest.mark.asyncio
+    async def test_get_card(self: Self, card_cache: Path) -> None:
+        """Test cards are rendered once, then served from memory or disk."""
+        renderer = CardRenderer()
+        try:
+            cards = await asyncio.gather(
+                renderer.get_card("a realm reborn", CELLS),
+                renderer.get_card("a realm reborn", CELLS),
+            )
+            assert cards[0] == cards[1]
+            assert len(list(card_cache.glob("*.png"))) == 1
+            assert await renderer.get_card("a realm reborn", CELLS) is cards[0]
+            await renderer.get_card("heavensward", CELLS)
+            assert len(renderer.memory) == 1
+            # Evicted from memory, the first card is read back from disk
+            renderer.close()
+            assert await renderer.get_card("a realm reborn", CELLS) == cards[0]
+            assert renderer.pool is None
+            await renderer.get_card("stormblood", CELLS)
+            assert len(list(card_cache.glob("*.png"))) == 2  # noqa: PLR2004
+        finally:
+            renderer.close()
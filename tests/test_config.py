@@ -0,0 +1,51 @@
+"""Tests for the ocular bot's configuration loading."""
+from pathlib import Path
+from typing import Self
+
+import pytest
+
+from src.ocular.config import CONFIG_PATH, Config, ConfigStore, load_config
+
+
+class TestConfig:
+    """Class with test methods for configuration loading."""
+
+    def test_load_config(self: Self, tmp_path: Path) -> None:
+        """Test the shipped file loads and partial files take defaults."""
+        assert load_config("config.yml").database == Config().database
+        path = tmp_path.joinpath("config.yml")
+        path.write_text("cache:\n  identity_size: 10\n")
+        config = load_config(path)
+        assert config.cache.identity_size == 10  # noqa: PLR2004
+        assert config.batch == Config().batch
+        path.write_text("database:\n  pragmas:\n    cache_size: -20000\n")
+        assert load_config(path).database.pragmas == {"cache_size": -20000}
+
+    @pytest.mark.parametrize(
+        ("text", "error"),
+        [
+            ("cache:\n  identity_sise: 10\n", ValueError),
+            ("cache:\n  identity_size: ten\n", TypeError),
+            ("database:\n  read_replica: 1\n", TypeError),
+            ("database:\n  backend: postgres\n", ValueError),
+            ("database:\n  pragmas:\n    synchronous: OFF; DROP\n", ValueError),
+            ("database:\n  pragmas:\n    cache_size: -2 OR 1\n", ValueError),
+        ],
+    )
+    def test_invalid_config(
+        self: Self,
+        tmp_path: Path,
+        text: str,
+        error: type[Exception],
+    ) -> None:
+        """Test invalid files are rejected and reloads keep the current config."""
+        path = tmp_path.joinpath("config.yml")
+        path.write_text("executor_workers: 2\n")
+        ConfigStore.load(path)
+        path.write_text(text)
+        try:
+            with pytest.raises(error):
+                ConfigStore.reload()
+            assert ConfigStore.current.executor_workers == 2  # noqa: PLR2004
+        finally:
+            ConfigStore.current, ConfigStore.path = Config(), CONFIG_PATH
@@ -0,0 +1,91 @@
+"""Tests for the ocular bot's command time budgets."""
+import asyncio
+from collections.abc import Awaitable, Callable
+from dataclasses import replace
+from typing import Self
+
+import pytest
+
+from src.ocular import deadline, metrics
+from src.ocular.config import CommandConfig, ConfigStore, get_config
+from src.ocular.deadline import TIMEOUT_MESSAGE, budget, run_with_deadline
+from tests.test_lifecycle import FakeContext
+
+
+@pytest.fixture(autouse=True)
+def short_budgets(monkeypatch: pytest.MonkeyPatch) -> None:
+    """Shorten command budgets and reset metrics and estimates."""
+    commands = CommandConfig(defer_after=0.02, timeout=0.1)
+    config = replace(get_config(), commands=commands)
+    monkeypatch.setattr(ConfigStore, "current", config)
+    monkeypatch.setattr(deadline, "latency_estimates", {})
+    metrics.reset()
+
+
+def sleeper(seconds: float) -> Callable[[FakeContext], Awaitable[None]]:
+    """Make a command invoker sleeping for some seconds."""
+
+    async def invoke(ctx: FakeContext) -> None:
+        await asyncio.sleep(seconds)
+        await ctx.respond("done", ephemeral=True)
+
+    return invoke
+
+
+class TestDeadline:
+    """Class with test methods for command time budgets."""
+
+    @pytest.mark.asyncio
+    async def test_fast_command(self: Self) -> None:
+        """Test fast commands are neither deferred nor cancelled."""
+        ctx = FakeContext()
+        await run_with_deadline(ctx, sleeper(0))
+        assert ctx.deferred == []
+        assert ctx.responses == [("done", True)]
+        assert metrics.snapshot() == {}
+
+    @pytest.mark.asyncio
+    async def test_slow_command(self: Self) -> None:
+        """Test slow commands are deferred, then deferred up front."""
+        ctx = FakeContext()
+        await run_with_deadline(ctx, sleeper(0.05))
+        assert ctx.deferred == [True]
+        assert ctx.responses == [("done", True)]
+        assert deadline.latency_estimates["test"] > get_config().commands.defer_after
+        ctx = FakeContext()
+        await run_with_deadline(ctx, sleeper(0))
+        assert ctx.deferred == [True]
+        assert metrics.snapshot() == {"deferred": {"test": 2}}
+
+    @pytest.mark.asyncio
+    async def test_public_command(self: Self) -> None:
+        """Test commands replying publicly are deferred publicly."""
+
+        @budget(public=True)
+        async def callback() -> None:
+            pass
+
+        ctx = FakeContext(callback)
+        await run_with_deadline(ctx, sleeper(0.05))
+        assert ctx.deferred == [False]
+
+    @pytest.mark.asyncio
+    async def test_overrun_command(self: Self) -> None:
+        """Test commands overrunning their budget are cancelled."""
+        ctx = FakeContext()
+        await run_with_deadline(ctx, sleeper(1))
+        assert ctx.deferred == [True]
+        assert ctx.responses == [(TIMEOUT_MESSAGE, True)]
+        assert metrics.snapshot()["deadline_missed"] == {"test": 1}
+
+    @pytest.mark.asyncio
+    async def test_command_budget(self: Self) -> None:
+        """Test a command's own budget overrides the default."""
+
+        @budget(0.2)
+        async def callback() -> None:
+            pass
+
+        ctx = FakeContext(callback)
+        await run_with_deadline(ctx, sleeper(0.15))
+        assert ctx.responses == [("done", True)]
@@ -0,0 +1,84 @@
+"""Tests for the ocular bot's database export module."""
+import csv
+from pathlib import Path
+from typing import Self
+
+import polars as pl
+import pytest
+
+from src.ocular.export import CsvTableWriter, export_snapshot
+from src.ocular.operations import DataBase
+
+
+class TestExport:
+    """Class with test methods for the database export."""
+
+    @pytest.mark.asyncio
+    async def test_export_snapshot(self: Self, tmp_path: Path) -> None:
+        """Test tables are exported in chunks to CSV and Parquet."""
+        database = DataBase()
+        database.db_path = tmp_path.joinpath("bot.db")
+        await database.init_tables()
+        for discord_id, name in enumerate(["a", "b", "c"]):
+            await database.append_new_user(name=name, discord_id=discord_id)
+            await database.append_new_status(discord_id=discord_id)
+        await database.update_user_items("add", 1, "ifrit")
+        status = await database.read_table_polars("status")
+        paths = await export_snapshot(database, tmp_path.joinpath("csv"), "csv")
+        names = [path.name for path in paths]
+        assert names == ["users.csv", "mounts.csv", "status.csv"]
+        with paths[2].open(newline="") as file:
+            assert len(list(csv.reader(file))) == status.shape[0] + 1
+        paths = await export_snapshot(
+            database,
+            tmp_path.joinpath("parquet"),
+            chunk_size=50,
+        )
+        exported = pl.read_parquet(paths[2])
+        assert len(list(paths[2].iterdir())) > 1
+        assert exported.sort(["user_id", "item_id"]).equals(
+            status.sort(["user_id", "item_id"]),
+        )
+
+    @pytest.mark.asyncio
+    async def test_export_wide(self: Self, tmp_path: Path) -> None:
+        """Test the ownership matrix has one row per user and mount column."""
+        database = DataBase()
+        database.db_path = tmp_path.joinpath("bot.db")
+        await database.init_tables()
+        for discord_id, name in enumerate(["a", "b", "c"]):
+            await database.append_new_user(name=name, discord_id=discord_id)
+            await database.append_new_status(discord_id=discord_id)
+        await database.update_user_items("add", 1, "ifrit")
+        paths = await export_snapshot(
+            database,
+            tmp_path.joinpath("wide"),
+            wide=True,
+            chunk_size=2,
+        )
+        matrix = pl.read_parquet(paths[0]).sort("user_name")
+        assert matrix.shape == (3, len(await database.list_item_names()) + 1)
+        ifrit = matrix.select("a realm reborn: ifrit").to_series().to_list()
+        assert ifrit == [0, 1, 0]
+
+    @pytest.mark.asyncio
+    async def test_export_failure_closes_file(
+        self: Self,
+        tmp_path: Path,
+        monkeypatch: pytest.MonkeyPatch,
+    ) -> None:
+        """Test a failing export still closes the file it was writing."""
+        database = DataBase()
+        database.db_path = tmp_path.joinpath("bot.db")
+        await database.init_tables()
+        writers = []
+
+        def fail(writer: CsvTableWriter, rows: list[tuple]) -> None:  # noqa: ARG001
+            writers.append(writer)
+            msg = "disk full"
+            raise OSError(msg)
+
+        monkeypatch.setattr(CsvTableWriter, "write", fail)
+        with pytest.raises(OSError, match="disk full"):
+            await export_snapshot(database, tmp_path.joinpath("csv"), "csv")
+        assert writers[0].file.closed
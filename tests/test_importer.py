@@ -0,0 +1,61 @@
+"""Tests for the ocular bot's bulk import readers."""
+import json
+from pathlib import Path
+from typing import Self
+
+import polars as pl
+import pytest
+
+from src.ocular import importer
+from src.ocular.importer import iter_collection_rows
+
+ROWS = [
+    (1, "alice", ["ifrit", "titan"]),
+    (2, "bob", []),
+    (3, "carol", ["garuda"]),
+]
+
+
+class TestImporter:
+    """Class with test methods for the bulk import readers."""
+
+    def test_iter_csv_rows(self: Self, tmp_path: Path) -> None:
+        """Test reading a CSV file with a header and ragged rows."""
+        path = tmp_path.joinpath("users.csv")
+        path.write_text(
+            "discord_id,name,mounts\n1,alice,ifrit,titan\n2,bob\n3,carol,garuda,\n",
+        )
+        assert list(iter_collection_rows(path)) == ROWS
+
+    def test_iter_json_rows(
+        self: Self,
+        tmp_path: Path,
+        monkeypatch: pytest.MonkeyPatch,
+    ) -> None:
+        """Test reading JSON arrays and lines split across read chunks."""
+        monkeypatch.setattr(importer, "READ_CHUNK_SIZE", 7)
+        objects = [
+            {"discord_id": discord_id, "name": name, "mounts": mounts}
+            for discord_id, name, mounts in ROWS
+        ]
+        path = tmp_path.joinpath("users.json")
+        path.write_text(json.dumps(objects, indent=2))
+        assert list(iter_collection_rows(path)) == ROWS
+        path = tmp_path.joinpath("users.jsonl")
+        path.write_text("\n".join(json.dumps(obj) for obj in objects))
+        assert list(iter_collection_rows(path)) == ROWS
+        path.write_text('{"discord_id": 1, "name"')
+        with pytest.raises(ValueError, match="Could not decode"):
+            list(iter_collection_rows(path))
+
+    def test_iter_parquet_rows(
+        self: Self,
+        tmp_path: Path,
+        monkeypatch: pytest.MonkeyPatch,
+    ) -> None:
+        """Test reading a Parquet file in several batches."""
+        monkeypatch.setattr(importer, "PARQUET_BATCH_SIZE", 2)
+        path = tmp_path.joinpath("users.parquet")
+        schema = ["discord_id", "name", "mounts"]
+        pl.DataFrame(ROWS, schema=schema, orient="row").write_parquet(path)
+        assert list(iter_collection_rows(path)) == ROWS
@@ -0,0 +1,93 @@
+"""Tests for the ocular bot's shutdown."""
+import asyncio
+from collections.abc import Callable
+from pathlib import Path
+from types import SimpleNamespace
+from typing import Self
+
+import discord
+import pytest
+
+from src.ocular.lifecycle import DRAINING_MESSAGE, OcularBot
+from src.ocular.operations import DataBase
+
+
+class FakeResponse:
+    """Interaction response recording whether it was sent."""
+
+    def __init__(self: Self) -> None:
+        """Create an unsent response."""
+        self.done = False
+
+    def is_done(self: Self) -> bool:
+        """Check if the response was sent."""
+        return self.done
+
+
+class FakeContext:
+    """Application context recording responses and defers."""
+
+    def __init__(self: Self, callback: Callable = print) -> None:
+        """Create a context of a command without responses."""
+        self.command = SimpleNamespace(qualified_name="test", callback=callback)
+        self.author = SimpleNamespace(id=0, name="a")
+        self.guild_id = None
+        self.response = FakeResponse()
+        self.responses = []
+        self.deferred = []
+
+    async def respond(self: Self, message: str, *, ephemeral: bool) -> None:
+        """Record a response."""
+        self.response.done = True
+        self.responses.append((message, ephemeral))
+
+    async def defer(self: Self, *, ephemeral: bool) -> None:
+        """Record a defer."""
+        self.response.done = True
+        self.deferred.append(ephemeral)
+
+
+class TestLifecycle:
+    """Class with test methods for draining and shutting down."""
+
+    @pytest.mark.asyncio
+    async def test_drain(self: Self, monkeypatch: pytest.MonkeyPatch) -> None:
+        """Test draining waits for running commands and turns new ones away."""
+        release = asyncio.Event()
+        finished = []
+
+        async def invoke(bot: discord.Bot, ctx: FakeContext) -> None:  # noqa: ARG001
+            await release.wait()
+            finished.append(ctx)
+
+        monkeypatch.setattr(discord.Bot, "invoke_application_command", invoke)
+        bot = OcularBot()
+        running = FakeContext()
+        command = asyncio.create_task(bot.invoke_application_command(running))
+        await asyncio.sleep(0)
+        assert bot.in_flight == 1
+        assert not await bot.drain(grace=0.01)
+        late = FakeContext()
+        await bot.invoke_application_command(late)
+        assert late.responses == [(DRAINING_MESSAGE, True)]
+        release.set()
+        assert await bot.drain(grace=1)
+        await command
+        assert finished == [running]
+        assert bot.in_flight == 0
+
+    @pytest.mark.asyncio
+    async def test_checkpoint(self: Self, tmp_path: Path) -> None:
+        """Test checkpointing empties the write-ahead log."""
+        database = DataBase()
+        database.db_path = tmp_path.joinpath("bot.db")
+        await database.init_tables()
+        # An open connection keeps the log from being checkpointed on close
+        async with database.connect():
+            await database.append_new_user(name="a", discord_id=0)
+            await database.append_new_status(discord_id=0)
+            wal_path = tmp_path.joinpath("bot.db-wal")
+            assert wal_path.stat().st_size > 0
+            await database.checkpoint()
+            assert wal_path.stat().st_size == 0
+        assert await database.check_user_exists("user_name", "a")
@@ -1,10 +1,16 @@
 """Tests for the ocular bot's DB operations module."""
+import asyncio
+import json
+from dataclasses import replace
 from pathlib import Path
 from typing import Self
 
+import aiosqlite
 import polars as pl
 import pytest
 
+from src.ocular import queries
+from src.ocular.config import CacheConfig, ConfigStore, get_config
 from src.ocular.operations import DataBase
 
 
@@ -12,36 +18,86 @@ class TestOperations:
     """Class with test methods for the DB operations."""
 
     @pytest.mark.asyncio
-    async def test_init_trial_table(self: Self) -> None:
-        """Test trial table initialization."""
-        tempdb = Path("./data/temp.db")
+    async def test_init_trial_table(self: Self, tmp_path: Path) -> None:
+        """Test trial mounts are seeded from the catalog."""
         database = DataBase()
-        database.db_path = tempdb
+        database.db_path = tmp_path.joinpath("bot.db")
         await database.init_tables()
-        table = pl.DataFrame(await database.get_trial_table())
+        trials = json.loads(Path(database.catalog_path).read_text())["trials"]
+        table = await database.read_table_polars("mounts")
         assert isinstance(table, pl.DataFrame)
-        assert table.shape == (table.select("item_id").max().item()+1, 2)
-        assert table.columns == ["item_id", "item_name"]
-        assert table.dtypes == [pl.Int64, pl.String]
+        assert table.columns == ["item_id", "item_name", "item_expac"]
+        assert table.dtypes == [pl.String, pl.String, pl.String]
         assert table.select("item_id").is_unique().all()
-        assert table.select("item_name").is_unique().all()
-        tempdb.unlink()
+        assert pl.DataFrame(trials).join(table, on="item_id").shape[0] == len(trials)
 
     @pytest.mark.asyncio
-    async def test_init_raid_table(self: Self) -> None:
-        """Test raid table initialization."""
-        tempdb = Path("./data/temp.db")
+    async def test_init_raid_table(self: Self, tmp_path: Path) -> None:
+        """Test raid mounts are seeded from the catalog."""
         database = DataBase()
-        database.db_path = tempdb
+        database.db_path = tmp_path.joinpath("bot.db")
         await database.init_tables()
-        table = pl.DataFrame(await database.get_raid_table())
-        assert isinstance(table, pl.DataFrame)
-        assert table.shape == (table.select("item_id").max().item()+1, 2)
-        assert table.columns == ["item_id", "item_name"]
-        assert table.dtypes == [pl.Int64, pl.String]
-        assert table.select("item_id").is_unique().all()
-        assert table.select("item_name").is_unique().all()
-        tempdb.unlink()
+        raids = json.loads(Path(database.catalog_path).read_text())["raids"]
+        table = await database.read_table_polars("mounts")
+        assert pl.DataFrame(raids).join(table, on="item_id").shape[0] == len(raids)
+
+    @pytest.mark.asyncio
+    async def test_sync_mount_catalog(self: Self, tmp_path: Path) -> None:
+        """Test catalog changes are synced and unchanged catalogs skipped."""
+        database = DataBase()
+        database.db_path = tmp_path.joinpath("bot.db")
+        await database.init_tables()
+        await database.append_new_user(name="a", discord_id=0)
+        await database.append_new_status(discord_id=0)
+        await database.update_user_items("add", 0, "titan")
+        assert not await database.sync_mount_catalog()
+        catalog = json.loads(Path(database.catalog_path).read_text())
+        deleted = catalog["trials"].pop(0)
+        catalog["trials"][0]["item_name"] = "titan ex"
+        catalog["trials"].append(
+            {"item_id": "new", "item_name": "new trial", "item_expac": "dawntrail"},
+        )
+        database.catalog_path = tmp_path.joinpath("mounts.json")
+        database.catalog_path.write_text(json.dumps(catalog))
+        assert await database.sync_mount_catalog()
+        assert not await database.sync_mount_catalog()
+        mounts = await database.read_table_polars("mounts")
+        status = await database.read_table_polars("status")
+        assert mounts.shape[0] == status.shape[0]
+        assert deleted["item_id"] not in mounts.select("item_id").to_series()
+        assert await database.list_user_items(0, "has", "a realm reborn") == [
+            "titan ex",
+        ]
+        assert "new trial" in await database.list_user_items(0, "needs", "dawntrail")
+
+    @pytest.mark.asyncio
+    async def test_sync_keeps_created_mounts(self: Self, tmp_path: Path) -> None:
+        """Test catalog syncs leave mounts created outside the catalog alone."""
+        database = DataBase()
+        database.db_path = tmp_path.joinpath("bot.db")
+        await database.init_tables()
+        await database.append_new_user(name="a", discord_id=0)
+        await database.append_new_status(discord_id=0)
+        await database.add_new_item("dawntrail", "created trial")
+        await database.add_new_item("dawntrail", "Clashing Trial")
+        await database.update_user_items("add", 0, "created trial")
+        await database.update_user_items("add", 0, "clashing trial")
+        catalog = json.loads(Path(database.catalog_path).read_text())
+        catalog["trials"][0]["item_name"] = "ifrit ex"
+        catalog["trials"].append(
+            {"item_id": "new", "item_name": "clashing trial", "item_expac": "dawntrail"},  # noqa: E501
+        )
+        database.catalog_path = tmp_path.joinpath("mounts.json")
+        database.catalog_path.write_text(json.dumps(catalog))
+        assert await database.sync_mount_catalog()
+        assert await database.list_user_items(0, "has", "dawntrail") == [
+            "created trial",
+            "Clashing Trial",
+        ]
+        assert await database.get_item_id("clashing trial") != ("new",)
+        status = await database.read_table_polars("status")
+        mounts = await database.read_table_polars("mounts")
+        assert mounts.shape[0] == status.shape[0]
 
     def test_create_user_entry(self: Self) -> None:
         """Test user ID creation."""
@@ -49,3 +105,417 @@ class TestOperations:
         usr_id = database.create_user_row(name="test", discord_id=0)
         assert isinstance(usr_id, tuple)
         assert len(usr_id[0]) == 3  # noqa: PLR2004
+
+    @pytest.mark.asyncio
+    async def test_list_user_names_page(self: Self, tmp_path: Path) -> None:
+        """Test keyset pagination over the users table."""
+        database = DataBase()
+        database.db_path = tmp_path.joinpath("bot.db")
+        await database.init_tables()
+        names = [f"user{i:02d}" for i in range(30)]
+        for discord_id, name in enumerate(reversed(names)):
+            await database.append_new_user(name=name, discord_id=discord_id)
+        first_page = await database.list_user_names_page()
+        assert first_page == names[:25]
+        second_page = await database.list_user_names_page(after=first_page[-1])
+        assert second_page == names[25:]
+        assert await database.list_user_names_page(after=names[-1]) == []
+
+    @pytest.mark.asyncio
+    async def test_list_item_names_page(self: Self, tmp_path: Path) -> None:
+        """Test keyset pagination over one expansion's mounts."""
+        database = DataBase()
+        database.db_path = tmp_path.joinpath("bot.db")
+        await database.init_tables()
+        expected = sorted(await database.list_item_names("a realm reborn"))
+        page = await database.list_item_names_page("a realm reborn", limit=2)
+        assert page == expected[:2]
+        page = await database.list_item_names_page(
+            "a realm reborn",
+            after=page[-1],
+            limit=2,
+        )
+        assert page == expected[2:4]
+
+    @pytest.mark.asyncio
+    async def test_summarize_party_needs(self: Self, tmp_path: Path) -> None:
+        """Test ranking the mounts needed by a party."""
+        database = DataBase()
+        database.db_path = tmp_path.joinpath("bot.db")
+        await database.init_tables()
+        for discord_id, name in enumerate(["a", "b", "c"]):
+            await database.append_new_user(name=name, discord_id=discord_id)
+            await database.append_new_status(discord_id=discord_id)
+        await database.update_user_items("add", 0, "ifrit")
+        await database.update_user_items("add", 1, "ifrit")
+        await database.update_user_items("add", 1, "titan")
+        assert await database.find_missing_users(["a", "x", "b"]) == ["x"]
+        summary = await database.summarize_party_needs(["a", "b"])
+        n_mounts = len(await database.list_item_names())
+        assert summary.columns == ["item_expac", "item_name", "need_count"]
+        assert summary.shape[0] == n_mounts - 1
+        assert "ifrit" not in summary.select("item_name").to_series().to_list()
+        assert summary.filter(item_name="titan").select("need_count").item() == 1
+        assert summary.select("need_count").to_series().max() == 2  # noqa: PLR2004
+        summary = await database.summarize_party_needs(["a", "b"], per_expansion=1)
+        expansions = await database.list_expansions()
+        assert summary.select("item_expac").to_series().to_list() == expansions
+        assert summary.select("need_count").to_series().to_list() == [2] * len(
+            expansions,
+        )
+        need_masks = await database.get_party_need_masks(["a", "b", "c"])
+        assert len(need_masks) == n_mounts
+        assert need_masks["a realm reborn", "ifrit"] == 0b100  # noqa: PLR2004
+        assert need_masks["a realm reborn", "titan"] == 0b101  # noqa: PLR2004
+
+    @pytest.mark.asyncio
+    async def test_list_item_needers(self: Self, tmp_path: Path) -> None:
+        """Test the needers of a mount follow status writes and deletes."""
+        database = DataBase()
+        database.db_path = tmp_path.joinpath("bot.db")
+        await database.init_tables()
+        for discord_id, name in enumerate(["a", "b", "c"]):
+            await database.append_new_user(name=name, discord_id=discord_id)
+            await database.append_new_status(discord_id=discord_id)
+        assert await database.list_item_needers("ifrit") == {
+            "a realm reborn": ["a", "b", "c"],
+        }
+        await database.update_user_items("add", 1, "ifrit")
+        await database.delete_user("c")
+        assert await database.list_item_needers("ifrit") == {"a realm reborn": ["a"]}
+        assert await database.list_item_needers("ifrit", "heavensward") == {}
+        await database.add_new_item("heavensward", "ultima weapon")
+        needers = await database.list_item_needers("ultima weapon", "heavensward")
+        assert needers == {"heavensward": ["a", "b"]}
+        await database.update_user_items("add", 0, "ifrit")
+        assert await database.list_item_needers("ifrit", "a realm reborn") == {}
+
+    @pytest.mark.asyncio
+    async def test_status_events(self: Self, tmp_path: Path) -> None:
+        """Test status changes are logged and compacted into weekly progress."""
+        database = DataBase()
+        database.db_path = tmp_path.joinpath("bot.db")
+        await database.init_tables()
+        for discord_id, name in enumerate(["a", "b"]):
+            await database.append_new_user(name=name, discord_id=discord_id)
+            await database.append_new_status(discord_id=discord_id)
+        await database.update_user_items("add", 0, "ifrit")
+        await database.update_user_items("add", 0, "ifrit")
+        await database.update_user_items("add", 1, "titan", actor=0)
+        await database.update_user_items("remove", 1, "titan", actor=0)
+        events = await database.db_read_table(queries.ALL_STATUS_EVENTS)
+        assert [event["actor_role"] for event in events] == ["self", "admin", "admin"]
+        assert [event["has_item"] for event in events] == [1, 1, 0]
+        assert await database.compact_status_events() == 3  # noqa: PLR2004
+        assert await database.compact_status_events() == 0
+        progress = await database.summarize_weekly_progress()
+        assert progress.select("gained").to_series().to_list() == [1]
+        progress = await database.summarize_weekly_progress(user_name="b")
+        assert progress.select("gained").to_series().to_list() == [0]
+        progress = await database.summarize_weekly_progress(expansion="heavensward")
+        assert progress.is_empty()
+
+    @pytest.mark.asyncio
+    async def test_update_user_expansion(self: Self, tmp_path: Path) -> None:
+        """Test expansion updates are logged and keep completion current."""
+        database = DataBase()
+        database.db_path = tmp_path.joinpath("bot.db")
+        await database.init_tables()
+        await database.append_new_user(name="a", discord_id=0)
+        await database.append_new_status(discord_id=0)
+        n_arr = len(await database.list_item_names("a realm reborn"))
+        await database.update_user_items("add", 0, "ifrit")
+        changed = await database.update_user_expansion("add", 0, "a realm reborn", 9)
+        assert changed == n_arr - 1
+        events = await database.db_read_table(queries.ALL_STATUS_EVENTS)
+        assert len(events) == n_arr
+        assert {event["actor_role"] for event in events[1:]} == {"admin"}
+        leaders = await database.list_leaderboard("a realm reborn")
+        assert leaders.rows() == [("a", n_arr, n_arr)]
+        await database.update_user_expansion("remove", 0, "a realm reborn")
+        leaders = await database.list_leaderboard("a realm reborn")
+        assert leaders.rows() == [("a", 0, n_arr)]
+
+    @pytest.mark.asyncio
+    async def test_update_users_item(self: Self, tmp_path: Path) -> None:
+        """Test a mount is updated for a group of users in one write."""
+        database = DataBase()
+        database.db_path = tmp_path.joinpath("bot.db")
+        await database.init_tables()
+        for discord_id, name in enumerate(["a", "b", "c"]):
+            await database.append_new_user(name=name, discord_id=discord_id)
+            await database.append_new_status(discord_id=discord_id)
+        await database.update_user_items("add", 1, "ifrit")
+        users = await database.resolve_users(["a", "d"], [1, 1, 5])
+        assert sorted(user.user_name for user in users) == ["a", "b"]
+        item_id = await database.get_item_id("ifrit", "a realm reborn")
+        assert await database.update_users_item("add", users, item_id[0], 0) == 1
+        assert await database.list_item_needers("ifrit") == {"a realm reborn": ["c"]}
+        events = await database.db_read_table(queries.ALL_STATUS_EVENTS)
+        assert [event["actor_role"] for event in events] == ["self", "self"]
+        assert await database.update_users_item("remove", users, item_id[0], 9) == 2  # noqa: PLR2004
+        with pytest.raises(ValueError, match="action"):
+            await database.update_users_item("swap", users, item_id[0], 9)
+
+    @pytest.mark.asyncio
+    async def test_list_leaderboard(self: Self, tmp_path: Path) -> None:
+        """Test completion counters follow status and mount writes."""
+        database = DataBase()
+        database.db_path = tmp_path.joinpath("bot.db")
+        await database.init_tables()
+        n_mounts = len(await database.list_item_names())
+        n_arr = len(await database.list_item_names("a realm reborn"))
+        for discord_id, name in enumerate(["a", "b", "c"]):
+            await database.append_new_user(name=name, discord_id=discord_id)
+            await database.append_new_status(discord_id=discord_id)
+        await database.update_user_items("add", 1, "ifrit")
+        await database.update_user_items("add", 1, "titan")
+        await database.update_user_items("add", 2, "ifrit")
+        leaders = await database.list_leaderboard(limit=2)
+        assert leaders.rows() == [("b", 2, n_mounts), ("c", 1, n_mounts)]
+        leaders = await database.list_leaderboard("a realm reborn")
+        assert leaders.rows()[0] == ("b", 2, n_arr)
+        await database.delete_item("ifrit")
+        await database.add_new_item("a realm reborn", "ultima weapon")
+        await database.delete_user("a")
+        leaders = await database.list_leaderboard("a realm reborn")
+        assert leaders.rows() == [("b", 1, n_arr), ("c", 0, n_arr)]
+        # Counters rebuilt from the status table match the incremental ones
+        await database.db_execute_literal("DROP TABLE completion")
+        await database.init_tables()
+        assert (await database.list_leaderboard("a realm reborn")).equals(leaders)
+
+    @pytest.mark.asyncio
+    async def test_leaderboard_mount_move(self: Self, tmp_path: Path) -> None:
+        """Test moving an expansion's only mount drops its completion rows."""
+        database = DataBase()
+        database.db_path = tmp_path.joinpath("bot.db")
+        await database.init_tables()
+        n_hw = len(await database.list_item_names("heavensward"))
+        for discord_id, name in enumerate(["a", "b"]):
+            await database.append_new_user(name=name, discord_id=discord_id)
+            await database.append_new_status(discord_id=discord_id)
+        await database.add_new_item("old expansion", "lone mount")
+        await database.update_user_items("add", 1, "lone mount")
+        leaders = await database.list_leaderboard("old expansion")
+        assert leaders.rows() == [("b", 1, 1), ("a", 0, 1)]
+        await database.db_execute_literal(
+            """
+            UPDATE mounts SET item_expac = 'heavensward'
+            WHERE item_name = 'lone mount'
+            """,
+        )
+        assert (await database.list_leaderboard("old expansion")).is_empty()
+        leaders = await database.list_leaderboard("heavensward")
+        assert leaders.rows() == [("b", 1, n_hw + 1), ("a", 0, n_hw + 1)]
+        async with aiosqlite.connect(database.db_path) as db:
+            cs = await db.execute("SELECT * FROM completion WHERE total = 0")
+            assert await cs.fetchall() == []
+
+    @pytest.mark.asyncio
+    async def test_mount_names(self: Self, tmp_path: Path) -> None:
+        """Test mount names are unique per expansion ignoring case."""
+        database = DataBase()
+        database.db_path = tmp_path.joinpath("bot.db")
+        await database.init_tables()
+        await database.append_new_user(name="a", discord_id=0)
+        await database.append_new_status(discord_id=0)
+        arr, hw = "a realm reborn", "heavensward"
+        assert await database.update_user_items("add", 0, "Ifrit", expansion=arr)
+        assert not await database.update_user_items("add", 0, "ifrit", expansion=hw)
+        assert await database.list_user_items(0, "has", "a realm reborn") == ["ifrit"]
+        with pytest.raises(ValueError, match="already taken"):
+            await database.add_new_item("a realm reborn", "IFRIT ")
+        await database.add_new_item("heavensward", "Ifrit")
+        with pytest.raises(ValueError, match="not unique"):
+            await database.get_item_id("ifrit")
+        assert await database.edit_item_name("IFRIT", "ifrit ii", "heavensward")
+        items = await database.find_items("Ifrit II")
+        assert [item["item_expac"] for item in items] == ["heavensward"]
+        # Databases from before the normalized name get it backfilled
+        await database.db_execute_literal("DROP INDEX mounts_norm_name_expac")
+        await database.db_execute_literal("ALTER TABLE mounts DROP COLUMN norm_name")
+        await database.init_tables()
+        assert len(await database.get_item_id("IFRIT II")) == 1
+
+    @pytest.mark.asyncio
+    async def test_dedupe_mounts(self: Self, tmp_path: Path) -> None:
+        """Test case-variant mounts are merged before names are made unique."""
+        database = DataBase()
+        database.db_path = tmp_path.joinpath("bot.db")
+        await database.init_tables()
+        for discord_id, name in enumerate(["a", "b"]):
+            await database.append_new_user(name=name, discord_id=discord_id)
+            await database.append_new_status(discord_id=discord_id)
+        await database.db_execute_literal("DROP INDEX mounts_norm_name_expac")
+        await database.add_new_item("a realm reborn", "Ifrit ")
+        await database.db_execute_literal(
+            """
+            UPDATE status SET has_item = 1
+            WHERE item_id IN (SELECT item_id FROM mounts WHERE item_name = 'Ifrit ')
+                AND user_id IN (SELECT user_id FROM users WHERE user_name = 'a')
+            """,
+        )
+        await database.init_tables()
+        arr = "a realm reborn"
+        assert len(await database.get_item_id("ifrit", arr)) == 1
+        assert await database.list_user_items(0, "has", arr) == ["ifrit"]
+        assert await database.list_user_items(1, "has", arr) == ["none"]
+        with pytest.raises(ValueError, match="already taken"):
+            await database.add_new_item(arr, "IFRIT")
+
+    @pytest.mark.asyncio
+    async def test_import_collections(self: Self, tmp_path: Path) -> None:
+        """Test bulk imports add users, mark mounts and report unknowns."""
+        database = DataBase()
+        database.db_path = tmp_path.joinpath("bot.db")
+        await database.init_tables()
+        await database.append_new_user(name="a", discord_id=0)
+        await database.append_new_status(discord_id=0)
+        rows = [
+            (0, "a", ["Ifrit", "nope"]),
+            (1, "b", ["titan"]),
+            (2, "a", ["titan"]),
+            (3, "c", []),
+        ]
+        report = await database.import_collections(rows, actor=9, chunk_size=2)
+        assert report.users_added == 2  # noqa: PLR2004
+        assert report.users_matched == 1
+        assert report.mounts_added == 2  # noqa: PLR2004
+        assert report.unknown_mounts == {"nope": 1}
+        assert report.skipped_names == ["a"]
+        assert await database.list_user_items(0, "has", "a realm reborn") == ["ifrit"]
+        assert await database.list_user_items(1, "has", "a realm reborn") == ["titan"]
+        n_mounts = len(await database.list_item_names())
+        status = await database.read_table_polars("status")
+        assert status.shape[0] == 3 * n_mounts
+        events = await database.db_read_table(queries.ALL_STATUS_EVENTS)
+        assert len(events) == 2  # noqa: PLR2004
+        report = await database.import_collections(rows, actor=9)
+        assert report.mounts_added == 0
+        await database.add_new_item("heavensward", "titan")
+        rows = [(3, "c", ["titan", "Heavensward : Titan"])]
+        report = await database.import_collections(rows, actor=9)
+        assert report.ambiguous_mounts == {"titan": 1}
+        assert await database.list_user_items(3, "has", "heavensward") == ["titan"]
+        assert await database.list_user_items(3, "has", "a realm reborn") == ["none"]
+
+    @pytest.mark.asyncio
+    async def test_read_replica(self: Self, tmp_path: Path) -> None:
+        """Test reads come from the replica and writes reach both copies."""
+        database = DataBase()
+        database.db_path = tmp_path.joinpath("bot.db")
+        await database.init_tables()
+        await database.append_new_user(name="a", discord_id=0)
+        await database.append_new_status(discord_id=0)
+        await database.open_replica()
+        try:
+            await database.update_user_items("add", 0, "ifrit")
+            assert await database.list_user_items(0, "has", "a realm reborn") == [
+                "ifrit",
+            ]
+            async with aiosqlite.connect(database.db_path) as db:
+                await db.execute("UPDATE status SET has_item = 0")
+                await db.commit()
+            # Writes bypassing the database class only reach the replica on reload
+            assert await database.list_user_items(0, "has", "a realm reborn") == [
+                "ifrit",
+            ]
+            await database.refresh_replica()
+            items = await database.list_user_items(0, "has", "a realm reborn")
+            assert items == ["none"]
+        finally:
+            await database.close_replica()
+
+    @pytest.mark.asyncio
+    async def test_replica_cancelled_write(self: Self, tmp_path: Path) -> None:
+        """Test writes cancelled after reaching disk still reach the replica."""
+        database = DataBase()
+        database.db_path = tmp_path.joinpath("bot.db")
+        await database.init_tables()
+        await database.append_new_user(name="a", discord_id=0)
+        await database.append_new_status(discord_id=0)
+        await database.open_replica()
+        try:
+            lock = database.replica_locks[str(database.db_path)]
+            async with lock:
+                write = asyncio.create_task(
+                    database.db_write(
+                        lambda db: db.execute("UPDATE status SET has_item = 1"),
+                    ),
+                )
+                # Cancel once committed, while waiting to update the replica
+                while not lock._waiters:  # noqa: ASYNC110, SLF001
+                    await asyncio.sleep(0)
+                write.cancel()
+                with pytest.raises(asyncio.CancelledError):
+                    await write
+            items = await database.list_user_items(0, "need", "a realm reborn")
+            assert items == ["none"]
+
+            async def fail(db: aiosqlite.Connection) -> None:
+                if db in database.replicas.values():
+                    raise aiosqlite.OperationalError
+                await db.execute("UPDATE status SET has_item = 0")
+
+            # A write failing on the replica alone reloads it from disk
+            await database.db_write(fail)
+            items = await database.list_user_items(0, "has", "a realm reborn")
+            assert items == ["none"]
+        finally:
+            await database.close_replica()
+
+    @pytest.mark.asyncio
+    async def test_register_user(self: Self, tmp_path: Path) -> None:
+        """Test concurrent registrations add one user and old duplicates go."""
+        database = DataBase()
+        database.db_path = tmp_path.joinpath("bot.db")
+        await database.init_tables()
+        outcomes = await asyncio.gather(
+            *(database.register_user("a", 0) for _ in range(5)),
+        )
+        assert sorted(outcomes) == ["added", *(["registered"] * 4)]
+        status = await database.read_table_polars("status")
+        assert status.shape[0] == len(await database.list_item_names())
+        # Duplicates left by registrations from before the unique indexes
+        await database.db_execute_literal("DROP INDEX users_name_key")
+        await database.db_execute_literal("DROP INDEX users_discord_id_key")
+        await database.append_new_user(name="a", discord_id=1)
+        await database.append_new_status(discord_id=1)
+        await database.init_indexes()
+        assert await database.get_user_discord_id("a") == [0]
+        status = await database.read_table_polars("status")
+        assert status.shape[0] == len(await database.list_item_names())
+
+    @pytest.mark.asyncio
+    async def test_identity_cache(
+        self: Self,
+        tmp_path: Path,
+        monkeypatch: pytest.MonkeyPatch,
+    ) -> None:
+        """Test cached identities stay coherent with user writes."""
+        database = DataBase()
+        database.db_path = tmp_path.joinpath("bot.db")
+        await database.init_tables()
+        assert not await database.check_user_exists("user_discord_id", 0)
+        assert await database.register_user("a", 0) == "added"
+        await database.append_new_user(name="b", discord_id=1)
+        await database.rename_user("b", "c")
+        await database.delete_user("a")
+
+        async def no_reads(*_: object) -> None:
+            msg = "Lookup was not cached"
+            raise AssertionError(msg)
+
+        monkeypatch.setattr(database, "db_read_qmark", no_reads)
+        assert not await database.check_user_exists("user_discord_id", 0)
+        assert not await database.check_user_exists("user_name", "b")
+        assert await database.get_user_discord_id("c") == [1]
+        user_id = await database.get_user_from_discord_id(1)
+        assert await database.check_user_exists("user_id", user_id)
+        config = replace(get_config(), cache=CacheConfig(identity_size=2))
+        monkeypatch.setattr(ConfigStore, "current", config)
+        database.identity_cache.put(("user_name", "d"), None)
+        assert len(database.identity_cache.entries) == 2  # noqa: PLR2004
+        with pytest.raises(AssertionError, match="not cached"):
+            await database.get_user_discord_id("c")
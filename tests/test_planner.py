@@ -0,0 +1,29 @@
+"""Tests for the ocular bot's farm planner module."""
+from typing import Self
+
+from src.ocular.planner import plan_farm
+
+
+class TestPlanner:
+    """Class with test methods for the farm planner."""
+
+    def test_plan_farm_prefers_most_needed(self: Self) -> None:
+        """Test that each week runs the mounts needed by the most members."""
+        need_masks = {
+            ("heavensward", "ravana"): 0b111,
+            ("heavensward", "bismarck"): 0b011,
+            ("stormblood", "susano"): 0b001,
+            ("stormblood", "lakshmi"): 0b000,
+        }
+        plan = plan_farm(need_masks, runs_per_week=2, weeks=3, drop_rate=0.5)
+        assert [run.week for run in plan] == [1, 1, 2, 2, 3, 3]
+        assert [run.item_name for run in plan[:2]] == ["ravana", "bismarck"]
+        assert plan[0].expected_gain == 1.5  # noqa: PLR2004
+        assert all(run.item_name != "lakshmi" for run in plan)
+
+    def test_plan_farm_runs_duty_once_per_week(self: Self) -> None:
+        """Test that a duty is never scheduled twice in the same week."""
+        need_masks = {("endwalker", "zodiark"): 0b1111}
+        plan = plan_farm(need_masks, runs_per_week=3, weeks=2)
+        assert len(plan) == 2  # noqa: PLR2004
+        assert plan[1].expected_gain < plan[0].expected_gain
@@ -0,0 +1,44 @@
+"""Tests for the ocular bot's named SQL statements."""
+import re
+import sqlite3
+from pathlib import Path
+from typing import Self
+
+import pytest
+
+from src.ocular.operations import DataBase
+from src.ocular.queries import STATEMENTS, Statement
+
+
+def plan_params(statement: Statement) -> tuple | dict:
+    """Get null parameters for every placeholder of a statement."""
+    names = re.findall(r":(\w+)", statement.sql)
+    if len(names) != 0:
+        return dict.fromkeys(names)
+    return (None,) * statement.sql.count("?")
+
+
+class TestQueries:
+    """Class with test methods for named SQL statements."""
+
+    @pytest.mark.asyncio
+    @pytest.mark.parametrize("name", sorted(STATEMENTS))
+    async def test_query_plan(self: Self, name: str, tmp_path: Path) -> None:
+        """Test statements only scan the tables they are expected to."""
+        statement = STATEMENTS[name]
+        database = DataBase()
+        database.db_path = tmp_path.joinpath("bot.db")
+        await database.init_tables()
+        with sqlite3.connect(database.db_path) as db:
+            cs = db.execute(
+                f"EXPLAIN QUERY PLAN {statement.sql}",
+                plan_params(statement),
+            )
+            details = [row[3] for row in cs.fetchall()]
+        scanned = {
+            match.group(1)
+            for detail in details
+            if (match := re.match(r"SCAN (\w+)", detail)) is not None
+        }
+        unexpected = scanned - set(statement.scans) - {"json_each"}
+        assert unexpected == set(), details
@@ -0,0 +1,94 @@
+"""Tests for the ocular bot's rate limits and admission control."""
+from dataclasses import replace
+from typing import Self
+
+import pytest
+
+from src.ocular import metrics
+from src.ocular.config import ConfigStore, LimitConfig, get_config
+from src.ocular.lifecycle import OcularBot
+from src.ocular.ratelimit import REJECTION_MESSAGES, AdmissionControl, TokenBucket
+from tests.test_lifecycle import FakeContext
+
+
+@pytest.fixture(autouse=True)
+def tight_limits(monkeypatch: pytest.MonkeyPatch) -> None:
+    """Set small limits that do not refill during a test, and reset metrics."""
+    limits = LimitConfig(
+        user_rate=0,
+        user_burst=3,
+        guild_rate=0,
+        guild_burst=5,
+        autocomplete_rate=0,
+        autocomplete_burst=1,
+        heavy_commands=["heavy"],
+        heavy_concurrency=1,
+    )
+    config = replace(get_config(), limits=limits)
+    monkeypatch.setattr(ConfigStore, "current", config)
+    metrics.reset()
+
+
+class TestRateLimit:
+    """Class with test methods for rate limits and admission control."""
+
+    def test_token_bucket(self: Self) -> None:
+        """Test buckets allow a burst, then refill at their rate."""
+        bucket = TokenBucket(rate=10, burst=2)
+        assert bucket.take()
+        assert bucket.take()
+        assert not bucket.take()
+        bucket.updated -= 0.1
+        assert bucket.take()
+        assert not bucket.take()
+
+    def test_user_and_guild_limits(self: Self) -> None:
+        """Test users and guilds are limited separately."""
+        admission = AdmissionControl()
+        results = [admission.admit("light", 1, 10) for _ in range(4)]
+        assert results == [None, None, None, "user"]
+        results = [admission.admit("light", 2, 10) for _ in range(3)]
+        assert results == [None, None, "guild"]
+        assert admission.admit("light", 3, None) is None
+        assert metrics.snapshot() == {
+            "rejected_user": {"light": 1},
+            "rejected_guild": {"light": 1},
+        }
+
+    def test_heavy_commands(self: Self) -> None:
+        """Test heavy commands share a capped number of slots."""
+        admission = AdmissionControl()
+        assert admission.admit("heavy", 1, None) is None
+        assert admission.admit("heavy", 2, None) == "busy"
+        assert admission.admit("light", 3, None) is None
+        admission.release("light")
+        admission.release("heavy")
+        assert admission.admit("heavy", 3, None) is None
+        assert metrics.snapshot() == {"rejected_busy": {"heavy": 1}}
+
+    def test_autocomplete(self: Self) -> None:
+        """Test autocomplete has its own bucket."""
+        admission = AdmissionControl()
+        assert admission.admit_autocomplete("light", 1)
+        assert not admission.admit_autocomplete("light", 1)
+        assert admission.admit("light", 1, None) is None
+
+    def test_prune(self: Self) -> None:
+        """Test pruning drops only buckets that have refilled."""
+        admission = AdmissionControl()
+        admission.admit("light", 1, None)
+        admission.admit_autocomplete("light", 1)
+        admission.buckets["user", 2] = TokenBucket(rate=0, burst=3)
+        admission.prune()
+        assert set(admission.buckets) == {("user", 1), ("autocomplete", 1)}
+
+    @pytest.mark.asyncio
+    async def test_bot_sheds_load(self: Self) -> None:
+        """Test the bot replies to rejected commands without running them."""
+        bot = OcularBot()
+        for _ in range(get_config().limits.user_burst):
+            bot.admission.admit("light", 0, None)
+        ctx = FakeContext()
+        await bot.invoke_application_command(ctx)
+        assert ctx.responses == [(REJECTION_MESSAGES["user"], True)]
+        assert bot.in_flight == 0
@@ -0,0 +1,244 @@
+"""Conformance tests run against every storage backend."""
+from datetime import UTC, datetime, timedelta
+from pathlib import Path
+from typing import Self
+
+import pytest
+import pytest_asyncio
+
+from src.ocular.config import Config, ConfigStore, DatabaseConfig
+from src.ocular.memory import MemoryStorage
+from src.ocular.operations import DataBase
+from src.ocular.storage import Storage, get_storage, open_storage
+
+
+@pytest_asyncio.fixture(params=["sqlite", "memory", "duckdb"])
+async def storage(request: pytest.FixtureRequest, tmp_path: Path) -> Storage:
+    """Create a backend with three users, a owning ifrit and titan."""
+    if request.param == "duckdb":
+        pytest.importorskip("duckdb")
+    storage = open_storage(request.param)
+    if request.param != "memory":
+        storage.db_path = tmp_path.joinpath(f"bot.{request.param}")
+    await storage.init_tables()
+    for discord_id, name in enumerate(["a", "b", "c"]):
+        await storage.append_new_user(name=name, discord_id=discord_id)
+        await storage.append_new_status(discord_id=discord_id)
+    await storage.update_user_items("add", 0, "ifrit")
+    await storage.update_user_items("add", 0, "titan")
+    await storage.update_user_items("add", 1, "titan")
+    return storage
+
+
+class TestStorage:
+    """Class with conformance test methods for storage backends."""
+
+    @pytest.mark.asyncio
+    async def test_users(self: Self, storage: Storage) -> None:
+        """Test users can be looked up and deleted."""
+        assert await storage.check_user_exists("user_name", "b")
+        assert await storage.check_user_exists("user_discord_id", 2)
+        assert not await storage.check_user_exists("user_name", "d")
+        assert await storage.get_user_discord_id("c") == [2]
+        assert await storage.get_user_discord_id("d") == []
+        user_id = await storage.get_user_from_discord_id(1)
+        assert await storage.check_user_exists("user_id", user_id)
+        assert await storage.find_missing_users(["a", "d", "c", "e"]) == ["d", "e"]
+        await storage.delete_user("b")
+        assert await storage.find_missing_users(["a", "b"]) == ["b"]
+        summary = await storage.summarize_needed_mounts()
+        assert summary.filter(item_name="ifrit").item(0, "need_count") == 1
+
+    @pytest.mark.asyncio
+    async def test_unknown_user(self: Self, storage: Storage) -> None:
+        """Test lookups and writes for unknown discord IDs raise ValueError."""
+        await storage.delete_user("b")
+        with pytest.raises(ValueError, match="discord ID 1"):
+            await storage.get_user_from_discord_id(1)
+        with pytest.raises(ValueError, match="discord ID 9"):
+            await storage.list_user_items(9, "has", "a realm reborn")
+        with pytest.raises(ValueError, match="discord ID 9"):
+            await storage.update_user_items("add", 9, "ifrit")
+        with pytest.raises(ValueError, match="discord ID 9"):
+            await storage.update_user_expansion("add", 9, "a realm reborn")
+
+    @pytest.mark.asyncio
+    async def test_user_items(self: Self, storage: Storage) -> None:
+        """Test mounts can be marked as owned and not owned."""
+        expansion = "a realm reborn"
+        assert await storage.list_user_items(0, "has", expansion) == ["ifrit", "titan"]
+        assert await storage.list_user_items(2, "has", expansion) == ["none"]
+        await storage.update_user_items("remove", 0, "ifrit")
+        await storage.update_user_items("remove", 2, "ifrit")
+        assert await storage.list_user_items(0, "has", expansion) == ["titan"]
+        needs = await storage.list_user_items(0, "needs", expansion)
+        assert "ifrit" in needs
+        assert "titan" not in needs
+        with pytest.raises(ValueError, match="action"):
+            await storage.update_user_items("swap", 0, "ifrit")
+
+    @pytest.mark.asyncio
+    async def test_user_expansion(self: Self, storage: Storage) -> None:
+        """Test every mount of an expansion can be marked at once."""
+        expansion = "a realm reborn"
+        n_mounts = len(await storage.list_item_names(expansion))
+        assert await storage.update_user_expansion("add", 0, expansion) == n_mounts - 2
+        assert await storage.update_user_expansion("add", 0, expansion) == 0
+        assert await storage.list_user_items(0, "needs", expansion) == ["none"]
+        assert await storage.list_user_items(0, "has", "heavensward") == ["none"]
+        assert await storage.update_user_expansion("remove", 1, expansion) == 1
+        assert await storage.list_user_items(1, "has", expansion) == ["none"]
+        with pytest.raises(ValueError, match="action"):
+            await storage.update_user_expansion("swap", 0, expansion)
+
+    @pytest.mark.asyncio
+    async def test_items(self: Self, storage: Storage) -> None:
+        """Test mounts can be listed, added, renamed and deleted."""
+        expansions = await storage.list_expansions()
+        assert expansions[0] == "a realm reborn"
+        names = await storage.list_item_names()
+        assert names[:2] == ["ifrit", "titan"]
+        assert sum(
+            [len(await storage.list_item_names(expac)) for expac in expansions],
+        ) == len(names)
+        assert len(await storage.get_item_id("ifrit")) == 1
+        ifrit = await storage.get_item_id("ifrit")
+        assert await storage.get_item_id(" IFRIT ") == ifrit
+        assert await storage.get_item_id("ifrit", "heavensward") == ()
+        assert await storage.get_item_id("nope") == ()
+        await storage.add_new_item("new expansion", "new mount")
+        await storage.add_new_item("other expansion", "new mount")
+        with pytest.raises(ValueError, match="not unique"):
+            await storage.get_item_id("new mount")
+        assert await storage.delete_item("new mount", "other expansion")
+        assert not await storage.delete_item("new mount", "other expansion")
+        assert await storage.list_expansions() == [*expansions, "new expansion"]
+        assert await storage.list_user_items(0, "needs", "new expansion") == [
+            "new mount",
+        ]
+        with pytest.raises(ValueError, match="already taken"):
+            await storage.add_new_item("new expansion", " NEW MOUNT")
+        await storage.add_new_item("new expansion", "other mount")
+        with pytest.raises(ValueError, match="already taken"):
+            await storage.edit_item_name("other mount", "New Mount", "new expansion")
+        await storage.delete_item("other mount")
+        await storage.edit_item_name("new mount", "renamed mount")
+        assert await storage.list_item_names("new expansion") == ["renamed mount"]
+        assert list(await storage.find_items("Renamed Mount")) == [
+            {
+                "item_id": (await storage.get_item_id("renamed mount"))[0],
+                "item_name": "renamed mount",
+                "item_expac": "new expansion",
+            },
+        ]
+        await storage.delete_item("renamed mount")
+        assert await storage.list_item_names() == names
+
+    @pytest.mark.asyncio
+    async def test_needs(self: Self, storage: Storage) -> None:
+        """Test party need masks and needed mount counts agree."""
+        need_masks = await storage.get_party_need_masks(["c", "a", "b"])
+        assert need_masks["a realm reborn", "ifrit"] == 0b101  # noqa: PLR2004
+        assert need_masks["a realm reborn", "titan"] == 0b001
+        assert need_masks["a realm reborn", "garuda"] == 0b111  # noqa: PLR2004
+        summary = await storage.summarize_needed_mounts()
+        assert summary.columns == ["item_expac", "item_name", "need_count"]
+        counts = dict(zip(summary["item_name"], summary["need_count"], strict=False))
+        assert (counts["ifrit"], counts["titan"], counts["garuda"]) == (2, 1, 3)
+        assert summary["need_count"].is_sorted(descending=True)
+
+    @pytest.mark.asyncio
+    async def test_register_user(self: Self, storage: Storage) -> None:
+        """Test registration is idempotent and rejects taken names and IDs."""
+        assert await storage.register_user("d", 3) == "added"
+        assert await storage.register_user("d", 3) == "registered"
+        assert await storage.register_user("d", 4) == "name_taken"
+        assert await storage.register_user("e", 3) == "id_taken"
+        assert await storage.find_missing_users(["d", "e"]) == ["e"]
+        expansion = "a realm reborn"
+        assert await storage.list_user_items(3, "has", expansion) == ["none"]
+        await storage.update_user_items("add", 3, "ifrit")
+        assert await storage.list_user_items(3, "has", expansion) == ["ifrit"]
+
+    @pytest.mark.asyncio
+    async def test_pages(self: Self, storage: Storage) -> None:
+        """Test user and mount names are paged in name order."""
+        assert await storage.list_user_names_page(limit=2) == ["a", "b"]
+        assert await storage.list_user_names_page("b") == ["c"]
+        expansion = "a realm reborn"
+        names = sorted(await storage.list_item_names(expansion))
+        first_page = await storage.list_item_names_page(expansion, limit=2)
+        assert first_page == names[:2]
+        assert await storage.list_item_names_page(expansion, names[1]) == names[2:]
+
+    @pytest.mark.asyncio
+    async def test_users_item(self: Self, storage: Storage) -> None:
+        """Test users can be resolved, renamed and updated together."""
+        identities = await storage.resolve_users(["a", "d"], [1, 0])
+        assert sorted(identity.user_name for identity in identities) == ["a", "b"]
+        (ifrit,) = await storage.get_item_id("ifrit")
+        assert await storage.update_users_item("add", identities, ifrit, actor=0) == 1
+        expansion = "a realm reborn"
+        assert await storage.list_user_items(1, "has", expansion) == ["ifrit", "titan"]
+        with pytest.raises(ValueError, match="action"):
+            await storage.update_users_item("swap", identities, ifrit, actor=0)
+        await storage.rename_user("b", "bee")
+        await storage.rename_user("d", "dee")
+        assert await storage.find_missing_users(["b", "bee", "dee"]) == ["b", "dee"]
+        assert await storage.get_user_discord_id("bee") == [1]
+
+    @pytest.mark.asyncio
+    async def test_party_needs(self: Self, storage: Storage) -> None:
+        """Test party needs are ranked per expansion and needers listed."""
+        summary = await storage.summarize_party_needs(["a", "b", "c"], 1)
+        assert summary.row(0) == ("a realm reborn", "garuda", 3)
+        assert summary["item_expac"].to_list() == await storage.list_expansions()
+        summary = await storage.summarize_party_needs(["a", "b"])
+        assert summary.columns == ["item_expac", "item_name", "need_count"]
+        assert summary.row(0) == ("a realm reborn", "garuda", 2)
+        counts = dict(zip(summary["item_name"], summary["need_count"], strict=False))
+        assert counts["ifrit"] == 1
+        assert "titan" not in counts
+        assert await storage.list_item_needers("IFRIT") == {
+            "a realm reborn": ["b", "c"],
+        }
+        assert await storage.list_item_needers("ifrit", "heavensward") == {}
+
+    @pytest.mark.asyncio
+    async def test_leaderboard(self: Self, storage: Storage) -> None:
+        """Test users are ranked by share of mounts owned."""
+        expansion = "a realm reborn"
+        leaderboard = await storage.list_leaderboard(expansion)
+        assert leaderboard["user_name"].to_list() == ["a", "b", "c"]
+        assert leaderboard["owned"].to_list() == [2, 1, 0]
+        n_mounts = len(await storage.list_item_names(expansion))
+        assert set(leaderboard["total"]) == {n_mounts}
+        leaderboard = await storage.list_leaderboard(limit=1)
+        assert leaderboard.row(0)[:2] == ("a", 2)
+        assert (await storage.list_leaderboard("no expansion")).height == 0
+
+    @pytest.mark.asyncio
+    async def test_weekly_progress(self: Self, storage: Storage) -> None:
+        """Test mounts gained and lost are summed into this week's progress."""
+        await storage.update_user_items("remove", 0, "ifrit")
+        await storage.update_user_items("remove", 2, "ifrit")
+        await storage.compact_status_events()
+        today = datetime.now(UTC).date()
+        monday = (today - timedelta(days=today.weekday())).isoformat()
+        progress = await storage.summarize_weekly_progress()
+        assert progress.columns == ["week", "gained"]
+        assert progress.rows() == [(monday, 2)]
+        assert (await storage.summarize_weekly_progress("a")).rows() == [(monday, 1)]
+        assert (await storage.summarize_weekly_progress("c")).height == 0
+        progress = await storage.summarize_weekly_progress(expansion="heavensward")
+        assert progress.height == 0
+
+    def test_get_storage(self: Self) -> None:
+        """Test the configured backend is used, memory storage being shared."""
+        ConfigStore.current = Config(database=DatabaseConfig(backend="memory"))
+        try:
+            assert isinstance(get_storage(), MemoryStorage)
+            assert get_storage() is get_storage()
+        finally:
+            ConfigStore.current = Config()
+        assert isinstance(get_storage(), DataBase)